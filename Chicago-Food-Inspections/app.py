@@ -1,66 +1,455 @@
 
-from flask import Flask, render_template, request, redirect, url_for, jsonify, flash
+from flask import (Flask, Response, abort, render_template, request, redirect, url_for, jsonify,
+                   flash, g, get_flashed_messages, has_app_context, has_request_context,
+                   make_response, send_from_directory, session, stream_template)
+from werkzeug.security import safe_join
+from werkzeug.wsgi import ClosingIterator
 import sqlite3
 import os
+import base64
+import csv
+import io
+import itertools
+import zlib
+import hashlib
+import hmac
+import json
+import math
+import mimetypes
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
 import re
-from datetime import datetime
+from datetime import date, datetime, timedelta
 import logging
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, Iterable, Iterator, List, Tuple
+
+from applog import configure_logging
+from assets import CDN_LINKED, VENDOR, load_manifest
+from cache import ResultCache
+from compression import SUFFIXES, compress, negotiate
+from import_chicago_data import import_data, is_local_path
+from jobs import MODES, ImportJobs, JobConflict
+from metrics import Metrics
+from migrate import migrate, stamp
+from slowlog import SlowQueryLog
+from config import get_config
+from backends import app_database_path, connect, create_pool, database_url
+from db import (ConnectionPool, InstrumentedConnection, pragmas_from_config,
+                rebuild_listing_counts, rebuild_search_index, replace_violations)
 
 # ==================== CONFIGURATION ====================
 
 BASE_DIR = os.path.dirname(__file__)
-DB_PATH = os.path.join(BASE_DIR, "app.db")
-SCHEMA_PATH = os.path.join(BASE_DIR, "schema.sql")
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log'),
-        logging.StreamHandler()
-    ]
-)
+
 logger = logging.getLogger(__name__)
 
 # ==================== FLASK APP SETUP ====================
 
 app = Flask(__name__)
+app.config.from_object(get_config())
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 app.config['DEBUG'] = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
 
+def log_context() -> Dict:
+    """Request fields added to every log record (see applog.py)."""
+    if not has_request_context():
+        return {}
+    return {"endpoint": request.endpoint, "method": request.method, "path": request.path}
+
+configure_logging(app.config, log_context)
+
 # ==================== DATABASE HELPERS ====================
 
+_pool: Optional[ConnectionPool] = None
+_read_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+# WSGI environ flag set by asgi.py on read-route requests: get_db() then hands
+# out a read-only connection from a separate pool.
+READ_ONLY_ENVIRON_KEY = 'chicago.read_only'
+
+def get_pool() -> ConnectionPool:
+    """Return the connection pool, (re)building it if the database URL changed."""
+    global _pool
+    url = database_url(app.config)
+    with _pool_lock:
+        if _pool is None or _pool.url != url:
+            sqlite_path()
+            if _pool is not None:
+                _pool.close_all()
+            _pool = create_pool(url, pragmas_from_config(app.config), app.config['SQLITE_POOL_SIZE'])
+        return _pool
+
+def get_read_pool() -> ConnectionPool:
+    """Return the pool of read-only connections used by asgi.py's readers."""
+    global _read_pool
+    url = database_url(app.config)
+    with _pool_lock:
+        if _read_pool is None or _read_pool.url != url:
+            sqlite_path()
+            if _read_pool is not None:
+                _read_pool.close_all()
+            _read_pool = create_pool(url, pragmas_from_config(app.config), app.config['ASYNC_READERS'],
+                                     read_only=True)
+        return _read_pool
+
+def request_pool() -> ConnectionPool:
+    """The pool for this request: read-only connections on asgi.py's read routes."""
+    read_only = has_request_context() and request.environ.get(READ_ONLY_ENVIRON_KEY)
+    return get_read_pool() if read_only else get_pool()
+
+def sqlite_path() -> str:
+    """The SQLite database file (raises ValueError for any other DATABASE_URL)."""
+    return app_database_path(app.config)
+
+# Refuse an unsupported DATABASE_URL now, not with a 500 on every request
+sqlite_path()
+
 def get_db() -> sqlite3.Connection:
     """
     Get database connection with Row factory for dict-like access.
+
+    Inside an app context the connection is checked out of the pool once and
+    returned by close_db() at teardown, so routes never close it themselves.
+    Outside one (CLI, background jobs) the caller owns a fresh connection and
+    must close it.
     
     Returns:
         sqlite3.Connection: Database connection with foreign keys enabled
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON;")
-        return conn
+        if not has_app_context():
+            return connect(database_url(app.config), pragmas_from_config(app.config))
+        if 'db' not in g:
+            g.db_pool = request_pool()
+            conn = g.db_pool.acquire()
+            slow_ms = app.config['SLOW_QUERY_MS']
+            if slow_ms > 0:
+                conn = InstrumentedConnection(conn, log_slow_query, slow_ms / 1000.0)
+            elif app.config['METRICS_ENABLED']:
+                conn = InstrumentedConnection(conn)
+            g.db = conn
+        return g.db
     except sqlite3.Error as e:
-        logger.error(f"Database connection error: {e}")
+        logger.error("Database connection error: %s", e)
         raise
 
+@app.teardown_appcontext
+def close_db(exc: Optional[BaseException]) -> None:
+    """Return the request's connection to the pool (rolling back on error)."""
+    conn = g.pop('db', None)
+    if conn is not None and not g.pop('db_held', False):
+        g.pop('db_pool', get_pool()).release(getattr(conn, 'raw', conn))
+
+def hold_db(body: Iterable) -> Iterable:
+    """
+    Keep the request's connection checked out until a streamed body is sent.
+
+    Teardown runs as soon as the view returns, before the server reads the
+    body, so close_db() skips a held connection; it goes back to the pool
+    when the server closes the response.
+    """
+    conn = g.get('db')
+    if conn is None:
+        return body
+    pool = g.db_pool
+    g.db_held = True
+    return ClosingIterator(body, lambda: pool.release(getattr(conn, 'raw', conn)))
+
+# ==================== CACHE HELPERS ====================
+
+_cache: Optional[ResultCache] = None
+_cache_settings: Optional[Tuple] = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> ResultCache:
+    """Return the result cache, (re)building it if its settings or the database changed."""
+    global _cache, _cache_settings
+    settings = (database_url(app.config), app.config['RESULT_CACHE_SIZE'],
+                app.config['RESULT_CACHE_TTL'])
+    with _cache_lock:
+        if _cache is None or _cache_settings != settings:
+            _cache = ResultCache(settings[1], settings[2])
+            _cache_settings = settings
+        return _cache
+
+def cached(key: Tuple, compute, depends_on_all: bool = True, version: Optional[str] = None):
+    """
+    Return compute() through the result cache (None results are not cached).
+
+    With a version (e.g. an ETag read from the database), a value cached
+    under another version is recomputed, so a write this process did not
+    see (another worker, the importer) is never served under new validators.
+    """
+    cache = get_cache()
+    entry = cache.get(key)
+    if entry is None or entry[0] != version:
+        generation = cache.generation
+        value = compute()
+        cache.put(key, (version, value) if value is not None else None, generation, depends_on_all)
+        return value
+    return entry[1]
+
+def data_changed(*license_numbers: str) -> None:
+    """Call after a committed write: stales listings and drops those facility pages."""
+    get_cache().bump(*[("facility", lic) for lic in license_numbers])
+
+# ==================== METRICS ====================
+
+metrics = Metrics()
+
+@app.before_request
+def start_timer() -> None:
+    """Stamp the request start for the latency histogram."""
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_metrics(response):
+    """
+    Record latency, status and SQL usage for the finished request.
+
+    Streamed bodies (the exports) are timed up to the first byte.
+    """
+    if app.config['METRICS_ENABLED'] and 'request_start' in g:
+        conn = g.get('db')
+        metrics.observe_request(
+            request.endpoint or "unmatched", request.method, response.status_code,
+            time.perf_counter() - g.request_start,
+            getattr(conn, 'queries', 0), getattr(conn, 'seconds', 0.0))
+    return response
+
+@app.after_request
+def log_request(response):
+    """Access log: one `request` event per response, sampled via LOG_SAMPLE_RATES."""
+    if 'request_start' in g:
+        elapsed_ms = (time.perf_counter() - g.request_start) * 1000
+        logger.info("%s %s %s %.1f ms", request.method, request.path, response.status_code, elapsed_ms,
+                    extra={"event": "request", "status": response.status_code,
+                           "duration_ms": round(elapsed_ms, 3)})
+    return response
+
+# ==================== SLOW QUERY LOG ====================
+
+_slow_log: Optional[SlowQueryLog] = None
+_slow_log_settings: Optional[Tuple] = None
+_slow_log_lock = threading.Lock()
+
+def get_slow_log() -> SlowQueryLog:
+    """Return the slow-query log, (re)building it if its settings changed."""
+    global _slow_log, _slow_log_settings
+    settings = (str(app.config['SLOW_QUERY_LOG']), app.config['SLOW_QUERY_MS'],
+                app.config['SLOW_QUERY_LOG_MAX_BYTES'], app.config['SLOW_QUERY_LOG_BACKUPS'],
+                tuple(app.config['SLOW_QUERY_LARGE_TABLES']))
+    with _slow_log_lock:
+        if _slow_log is None or _slow_log_settings != settings:
+            if _slow_log is not None:
+                _slow_log.close()
+            _slow_log = SlowQueryLog(*settings)
+            _slow_log_settings = settings
+        return _slow_log
+
+def log_slow_query(conn: sqlite3.Connection, sql: str, params, seconds: float) -> None:
+    """InstrumentedConnection callback: write the statement and its plan to the slow log."""
+    try:
+        context = {}
+        if has_request_context():
+            context = {"endpoint": request.endpoint, "method": request.method,
+                       "path": request.full_path.rstrip("?")}
+        entry = get_slow_log().record(conn, sql, params, seconds, **context)
+        if entry["flagged"]:
+            logger.warning("Slow query %s (%.0f ms) scans %s on %s", entry['shape'],
+                           entry['duration_ms'], ", ".join(entry['scans']), context.get('endpoint'),
+                           extra={"event": "slow_query"})
+    except Exception as e:  # never fail the request over logging
+        logger.error("Slow query log error: %s", e)
+
+# ==================== CONDITIONAL RESPONSES ====================
+
+def make_etag(*parts) -> str:
+    """Strong ETag over the values a response was rendered from."""
+    return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """updated_at column value -> datetime (None stays None)."""
+    return datetime.fromisoformat(value) if value else None
+
+def facility_validators(conn: sqlite3.Connection,
+                        license_number: str) -> Optional[Tuple[str, Optional[datetime]]]:
+    """
+    ETag and Last-Modified for a facility page, from two index seeks.
+
+    Returns:
+        Optional[Tuple[str, Optional[datetime]]]: (etag, last_modified), or
+        None if the facility does not exist
+    """
+    row = conn.execute("""
+        SELECT f.updated_at, i.latest, i.n
+        FROM facilities f,
+             (SELECT MAX(updated_at) AS latest, COUNT(*) AS n
+              FROM inspections WHERE license_number = ?) i
+        WHERE f.license_number = ?
+    """, (license_number, license_number)).fetchone()
+    if not row:
+        return None
+    latest = max(filter(None, (row[0], row[1])))
+    return make_etag("facility", license_number, row[0], row[1], row[2]), parse_timestamp(latest)
+
+def data_validators(conn: sqlite3.Connection, *extra) -> Tuple[str, Optional[datetime]]:
+    """ETag and Last-Modified for responses computed from all inspections."""
+    row = conn.execute("""
+        SELECT (SELECT MAX(updated_at) FROM inspections),
+               (SELECT MAX(updated_at) FROM facilities),
+               (SELECT SUM(n) FROM inspection_counts)
+    """).fetchone()
+    latest = max(filter(None, (row[0], row[1])), default=None)
+    return make_etag("data", *row, *extra), parse_timestamp(latest)
+
+def not_modified(etag: str, last_modified: Optional[datetime]):
+    """
+    Return a 304 response if the request's validators match, else None.
+
+    If-None-Match wins over If-Modified-Since (RFC 9110) and uses weak
+    comparison, so the W/ ETag of a compressed response still matches.
+    Pending flash messages always get a full page so they are shown.
+    """
+    if session.get('_flashes'):
+        return None
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified:
+        fresh = last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    return with_validators(make_response("", 304), etag, last_modified)
+
+def with_validators(response, etag: str, last_modified: Optional[datetime]):
+    """Attach ETag/Last-Modified and ask clients to revalidate every time."""
+    response = make_response(response)
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
 def init_db() -> None:
     """Initialize database from schema.sql file."""
+    conn = None
     try:
-        with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+        with open(app.config['SCHEMA_PATH'], "r", encoding="utf-8") as f:
             sql = f.read()
-        conn = get_db()
+        conn = connect(database_url(app.config), pragmas_from_config(app.config))
         conn.executescript(sql)
         conn.commit()
-        conn.close()
+        stamp(conn, str(app.config['MIGRATIONS_DIR']))
+        get_cache().clear()
         logger.info("Database initialized successfully")
     except Exception as e:
-        logger.error(f"Database initialization error: {e}")
+        logger.error("Database initialization error: %s", e)
+        raise
+    finally:
+        if conn:
+            conn.close()
+
+def migrate_db() -> None:
+    """Apply pending schema migrations (keeps data; see migrate.py)."""
+    conn = None
+    try:
+        conn = connect(database_url(app.config), pragmas_from_config(app.config))
+        applied = migrate(conn, str(app.config['MIGRATIONS_DIR']))
+        if applied:
+            get_cache().clear()
+            total = sum(seconds for _, seconds in applied)
+            logger.info("Applied %d migration(s) in %.2fs", len(applied), total)
+    except Exception as e:
+        logger.error("Migration error: %s", e)
         raise
+    finally:
+        if conn:
+            conn.close()
+
+# ==================== COMPRESSION ====================
+
+@app.after_request
+def compress_response(response):
+    """
+    gzip/brotli-compress buffered text responses the client accepts.
+
+    Streamed bodies (exports compress themselves) and files (/static,
+    /assets) pass through untouched. A strong ETag becomes weak, since the
+    compressed bytes differ from the identity representation; 304s get the
+    same weak ETag the full response would have had.
+    """
+    if not app.config['COMPRESS_ENABLED']:
+        return response
+    if response.status_code == 304:
+        if negotiate(request.accept_encodings):
+            weaken_etag(response)
+        return response
+    if (response.direct_passthrough
+            or response.is_streamed or response.status_code != 200
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in app.config['COMPRESS_MIMETYPES']):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.accept_encodings)
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < app.config['COMPRESS_MIN_SIZE']:
+        return response
+    response.set_data(compress(data, encoding, app.config['COMPRESS_LEVEL'],
+                               app.config['COMPRESS_BROTLI_QUALITY']))
+    response.headers['Content-Encoding'] = encoding
+    weaken_etag(response)
+    return response
+
+def weaken_etag(response) -> None:
+    """Turn a strong ETag into a weak one (W/"...")."""
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+# ==================== STATIC ASSETS ====================
+
+_manifest: Tuple[Optional[float], Dict[str, str]] = (None, {})
+_missing_vendor_files = set()
+
+def asset_manifest() -> Dict[str, str]:
+    """The assets.py build manifest, reloaded when a new build lands."""
+    global _manifest
+    path = os.path.join(app.config['ASSET_DIR'], 'manifest.json')
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return {}
+    if _manifest[0] != mtime:
+        _manifest = (mtime, load_manifest(str(app.config['ASSET_DIR'])))
+    return _manifest[1]
+
+@app.template_global()
+def asset_url(filename: str) -> str:
+    """
+    URL of a static file for templates.
+
+    Built files get their fingerprinted /assets/ URL; otherwise the plain
+    /static/ URL. A third-party file missing from static/vendor/ is linked
+    from its pinned CDN URL if it is not committed yet (CDN_LINKED) or
+    ASSET_CDN_FALLBACK is on.
+    """
+    hashed = asset_manifest().get(filename)
+    if hashed:
+        return url_for('hashed_asset', filename=hashed)
+    if filename in VENDOR and not os.path.exists(os.path.join(app.static_folder, filename)):
+        if filename in CDN_LINKED or app.config['ASSET_CDN_FALLBACK']:
+            return VENDOR[filename]
+        if filename not in _missing_vendor_files:
+            _missing_vendor_files.add(filename)
+            logger.warning("static/%s is missing; run `python assets.py --vendor`", filename)
+    return url_for('static', filename=filename)
 
 # ==================== VALIDATION HELPERS ====================
 
@@ -154,6 +543,776 @@ def validate_inspection_data(data: Dict) -> Tuple[bool, str]:
     
     return True, ""
 
+# ==================== SEARCH HELPERS ====================
+
+# bm25() column weights for facilities_fts: dba_name, address, facility_type
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+
+_SEARCH_TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+def build_fts_query(q: str) -> Optional[str]:
+    """
+    Translate a search box string into an FTS5 MATCH expression.
+
+    Quoted text becomes a phrase query; every other word becomes a prefix
+    query, so "sun din" matches "Sunrise Diner". Terms are ANDed together.
+    Everything is quoted before it reaches FTS5, so user input can never
+    produce a syntax error.
+
+    Returns:
+        Optional[str]: MATCH expression, or None if q has no searchable terms
+    """
+    terms = []
+    for phrase, word in _SEARCH_TOKEN_RE.findall(q):
+        if phrase:
+            if re.search(r'\w', phrase):
+                terms.append('"' + phrase.replace('"', '""') + '"')
+        else:
+            word = word.strip('*')
+            if re.search(r'\w', word):
+                terms.append('"' + word.replace('"', '""') + '"*')
+    return " ".join(terms) if terms else None
+
+def fts_join(alias: str = "f") -> str:
+    """SQL fragment joining the ranked FTS matches onto a facilities alias."""
+    weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+    return f"""
+        JOIN (SELECT rowid AS fts_rowid, bm25(facilities_fts, {weights}) AS score
+              FROM facilities_fts WHERE facilities_fts MATCH ?) s
+          ON s.fts_rowid = {alias}.rowid
+    """
+
+# ==================== PAGINATION HELPERS ====================
+#
+# The listing is ordered by (inspection_date DESC, inspection_id DESC), served
+# by idx_inspections_date_id, followed by facilities that have never been
+# inspected (only shown when no result/risk filter is set), ordered by
+# license_number. Cursors name a row in that order so next/prev pages seek
+# straight to it instead of walking and discarding OFFSET rows.
+#
+# The facilities view has one row per facility instead: inspected facilities
+# by their latest inspection (last_inspection_date DESC, license_number DESC,
+# served by idx_facilities_last_date from the trigger-maintained last_*
+# columns), then the same never-inspected tail. Result/risk filters apply to
+# the latest inspection.
+
+LISTING_VIEWS = ("inspections", "facilities")
+
+LISTING_COLUMNS = """
+    f.license_number, f.dba_name, f.facility_type, f.zip,
+    i.inspection_id, i.inspection_date, i.result, i.risk
+"""
+
+# The facilities view's rows, named like LISTING_COLUMNS for the template
+LATEST_COLUMNS = """
+    f.license_number, f.dba_name, f.facility_type, f.zip,
+    f.last_inspection_id AS inspection_id, f.last_inspection_date AS inspection_date,
+    f.last_result AS result, f.last_risk AS risk, f.inspection_count
+"""
+
+def encode_cursor(row: sqlite3.Row, view: str = "inspections") -> str:
+    """Encode a listing row's sort key as an opaque, URL-safe token."""
+    if row["inspection_id"] is None:
+        key = ["f", row["license_number"]]
+    elif view == "facilities":
+        key = ["l", row["inspection_date"], row["license_number"]]
+    else:
+        key = ["i", row["inspection_date"], row["inspection_id"]]
+    raw = json.dumps(key, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(token: str, view: str = "inspections") -> Optional[List]:
+    """Decode a cursor token; returns None for missing, malformed or other-view tokens."""
+    if not token:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(key, list):
+        return None
+    if len(key) == 3 and isinstance(key[1], str):
+        if view == "inspections" and key[0] == "i" and isinstance(key[2], int):
+            return key
+        if view == "facilities" and key[0] == "l" and isinstance(key[2], str):
+            return key
+    if len(key) == 2 and key[0] == "f" and isinstance(key[1], str):
+        return key
+    return None
+
+def listing_filters(match: Optional[str], result: str, risk: str,
+                    view: str = "inspections") -> Tuple[str, str, List]:
+    """
+    Build the shared join/where fragments for the home() filters.
+
+    Returns:
+        Tuple[str, str, List]: (join_sql, where_sql, params)
+    """
+    result_col, risk_col = ("f.last_result", "f.last_risk") if view == "facilities" else ("i.result", "i.risk")
+    join, where, params = "", "", []
+    if match:
+        join = fts_join("f")
+        params.append(match)
+    if result != "All":
+        where += f" AND {result_col} = ?"
+        params.append(result)
+    if risk != "All":
+        where += f" AND {risk_col} = ?"
+        params.append(risk)
+    return join, where, params
+
+def dated_rows_source(join: str, where: str, view: str) -> str:
+    """FROM/WHERE of the listing's dated part: one row per inspection, or per inspected facility."""
+    if view == "facilities":
+        return f"FROM facilities f {join} WHERE f.last_inspection_date IS NOT NULL {where}"
+    return f"""FROM inspections i
+        JOIN facilities f ON f.license_number = i.license_number
+        {join} WHERE 1=1 {where}"""
+
+def _inspection_rows(conn, join, where, params, forward, key, limit, offset=0):
+    """Inspection rows after (forward) or before (backward) a cursor key."""
+    sql = f"""
+        SELECT {LISTING_COLUMNS}
+        FROM inspections i
+        JOIN facilities f ON f.license_number = i.license_number
+        {join}
+        WHERE 1=1 {where}
+    """
+    params = list(params)
+    if key:
+        sql += " AND (i.inspection_date, i.inspection_id) {} (?, ?)".format("<" if forward else ">")
+        params += [key[1], key[2]]
+    if forward:
+        sql += " ORDER BY i.inspection_date DESC, i.inspection_id DESC"
+    else:
+        sql += " ORDER BY i.inspection_date, i.inspection_id"
+    sql += " LIMIT ? OFFSET ?"
+    return conn.execute(sql, params + [limit, offset])
+
+def _latest_rows(conn, join, where, params, forward, key, limit, offset=0):
+    """Inspected facilities (by latest inspection) after (forward) or before a cursor key."""
+    sql = f"SELECT {LATEST_COLUMNS} {dated_rows_source(join, where, 'facilities')}"
+    params = list(params)
+    if key:
+        sql += " AND (f.last_inspection_date, f.license_number) {} (?, ?)".format("<" if forward else ">")
+        params += [key[1], key[2]]
+    if forward:
+        sql += " ORDER BY f.last_inspection_date DESC, f.license_number DESC"
+    else:
+        sql += " ORDER BY f.last_inspection_date, f.license_number"
+    sql += " LIMIT ? OFFSET ?"
+    return conn.execute(sql, params + [limit, offset])
+
+def _uninspected_rows(conn, join, params, forward, license_number, limit, offset=0):
+    """Never-inspected facilities after/before a license_number."""
+    sql = f"""
+        SELECT f.license_number, f.dba_name, f.facility_type, f.zip,
+               NULL AS inspection_id, NULL AS inspection_date, NULL AS result, NULL AS risk,
+               0 AS inspection_count
+        FROM facilities f
+        {join}
+        WHERE NOT EXISTS (SELECT 1 FROM inspections i WHERE i.license_number = f.license_number)
+    """
+    params = list(params)
+    if license_number is not None:
+        sql += " AND f.license_number {} ?".format(">" if forward else "<")
+        params.append(license_number)
+    sql += " ORDER BY f.license_number" + ("" if forward else " DESC")
+    sql += " LIMIT ? OFFSET ?"
+    return conn.execute(sql, params + [limit, offset])
+
+def listing_rows(conn: sqlite3.Connection, match: Optional[str], result: str, risk: str,
+                 limit: int, after: Optional[List] = None, offset: int = 0,
+                 view: str = "inspections") -> Iterator[sqlite3.Row]:
+    """
+    Yield up to `limit` rows of the date-ordered listing, forward from a
+    cursor key (`after`) or an `offset`.
+
+    Rows come straight off the SQLite cursors, dated rows first and then the
+    never-inspected tail, so nothing is materialized.
+    """
+    join, where, params = listing_filters(match, result, risk, view)
+    join_params = params[:1] if match else []
+    with_uninspected = result == "All" and risk == "All"
+    dated_rows = _latest_rows if view == "facilities" else _inspection_rows
+
+    if after and after[0] == "f":
+        if with_uninspected:
+            yield from _uninspected_rows(conn, join, join_params, True, after[1], limit)
+        return
+    count = 0
+    for row in dated_rows(conn, join, where, params, True, after, limit, offset):
+        count += 1
+        yield row
+    if count < limit and with_uninspected:
+        skip = 0
+        if offset and not count:
+            # The offset ran past every dated row; carry the remainder over.
+            inspected = conn.execute(
+                f"SELECT COUNT(*) {dated_rows_source(join, where, view)}", params).fetchone()[0]
+            skip = max(0, offset - inspected)
+        yield from _uninspected_rows(conn, join, join_params, True, None, limit - count, skip)
+
+def fetch_listing_page(conn: sqlite3.Connection, match: Optional[str], result: str, risk: str,
+                       per_page: int, after: Optional[List] = None, before: Optional[List] = None,
+                       offset: int = 0, view: str = "inspections") -> Tuple[List[sqlite3.Row], bool, bool]:
+    """
+    Fetch one page of the date-ordered listing.
+
+    Pass a decoded cursor as `after` (next page) or `before` (previous page)
+    for an index seek, or an `offset` for plain page-number navigation.
+
+    Returns:
+        Tuple[List[sqlite3.Row], bool, bool]: (rows, has_prev, has_next)
+    """
+    join, where, params = listing_filters(match, result, risk, view)
+    join_params = params[:1] if match else []
+    with_uninspected = result == "All" and risk == "All"
+    dated_rows = _latest_rows if view == "facilities" else _inspection_rows
+
+    if before and (before[0] != "f" or with_uninspected):
+        # Walk backwards from the cursor, then flip into display order.
+        rows = []
+        if before[0] == "f":
+            rows = _uninspected_rows(conn, join, join_params, False, before[1], per_page + 1).fetchall()
+        if len(rows) <= per_page:
+            key = before if before[0] != "f" else None
+            rows += dated_rows(conn, join, where, params, False, key, per_page + 1 - len(rows)).fetchall()
+        if len(rows) <= per_page:
+            # Ran into the start of the listing; show a full first page instead.
+            return fetch_listing_page(conn, match, result, risk, per_page, view=view)
+        return rows[:per_page][::-1], True, True
+
+    rows = list(listing_rows(conn, match, result, risk, per_page + 1, after, offset, view))
+    return rows[:per_page], bool(after or offset), len(rows) > per_page
+
+def ranked_rows(conn: sqlite3.Connection, match: str, result: str, risk: str,
+                limit: int, offset: int = 0, view: str = "inspections"):
+    """Cursor over search results ordered by bm25 relevance."""
+    join, where, params = listing_filters(match, result, risk, view)
+    if view == "facilities":
+        return conn.execute(f"""
+            SELECT {LATEST_COLUMNS}
+            FROM facilities f
+            {join}
+            WHERE 1=1 {where}
+            ORDER BY s.score, f.last_inspection_date DESC, f.license_number DESC
+            LIMIT ? OFFSET ?
+        """, params + [limit, offset])
+    return conn.execute(f"""
+        SELECT {LISTING_COLUMNS}
+        FROM facilities f
+        {join}
+        LEFT JOIN inspections i ON i.license_number = f.license_number
+        WHERE 1=1 {where}
+        ORDER BY s.score, i.inspection_date DESC, i.inspection_id DESC
+        LIMIT ? OFFSET ?
+    """, params + [limit, offset])
+
+def fetch_ranked_page(conn: sqlite3.Connection, match: str, result: str, risk: str,
+                      per_page: int, offset: int = 0,
+                      view: str = "inspections") -> Tuple[List[sqlite3.Row], bool, bool]:
+    """
+    Fetch one page of search results ordered by bm25 relevance.
+
+    Returns:
+        Tuple[List[sqlite3.Row], bool, bool]: (rows, has_prev, has_next)
+    """
+    rows = ranked_rows(conn, match, result, risk, per_page + 1, offset, view).fetchall()
+    return rows[:per_page], offset > 0, len(rows) > per_page
+
+class ListingRows:
+    """
+    One page of listing rows for index.html, with its pager state.
+
+    Built from a fetched list (cacheable), or from an iterator of up to
+    per_page + 1 rows straight off the cursor for streamed pages. A streamed
+    page can be iterated once, while the template renders; has_next and
+    next_cursor are only known after that, which is why the pager comes
+    after the table.
+    """
+
+    def __init__(self, rows: Iterable[sqlite3.Row], per_page: int, has_prev: bool,
+                 view: str, sort: str, has_next: Optional[bool] = None):
+        self.per_page = per_page
+        self.has_prev = has_prev
+        self.view = view
+        self.sort = sort
+        self.streamed = has_next is None
+        if self.streamed:
+            self._rows = iter(rows)
+            self.first = next(self._rows, None)  # so an empty page is known up front
+            self.last = None
+            self.has_next = False
+        else:
+            self._rows = list(rows)
+            self.first = self._rows[0] if self._rows else None
+            self.last = self._rows[-1] if self._rows else None
+            self.has_next = has_next
+
+    def __bool__(self) -> bool:
+        return self.first is not None
+
+    def __iter__(self) -> Iterator[sqlite3.Row]:
+        if not self.streamed:
+            yield from self._rows
+            return
+        if self.first is None:
+            return
+        rows, self._rows = itertools.chain((self.first,), self._rows), iter(())
+        for count, row in enumerate(rows):
+            if count == self.per_page:
+                self.has_next = True
+                break
+            self.last = row
+            yield row
+
+    @property
+    def prev_cursor(self) -> Optional[str]:
+        if self.first is None or not self.has_prev or self.sort != "date":
+            return None
+        return encode_cursor(self.first, self.view)
+
+    @property
+    def next_cursor(self) -> Optional[str]:
+        if self.last is None or not self.has_next or self.sort != "date":
+            return None
+        return encode_cursor(self.last, self.view)
+
+# ==================== COUNT HELPERS ====================
+
+_exact_counts: Dict[Tuple, Tuple[float, int]] = {}
+_exact_counts_pending = set()
+_exact_counts_lock = threading.Lock()
+_count_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="exact-count")
+
+def counter_total(conn: sqlite3.Connection, result: str, risk: str, view: str = "inspections") -> int:
+    """Exact listing total from the trigger-maintained counters (no text filter)."""
+    table = "facility_counts" if view == "facilities" else "inspection_counts"
+    sql = f"SELECT COALESCE(SUM(n), 0) FROM {table} WHERE 1=1"
+    params = []
+    if result != "All":
+        sql += " AND result = ?"
+        params.append(result)
+    if risk != "All":
+        sql += " AND risk = ?"
+        params.append(risk)
+    total = conn.execute(sql, params).fetchone()[0]
+    if result == "All" and risk == "All":
+        total += conn.execute(
+            "SELECT n FROM listing_counters WHERE name = 'uninspected_facilities'"
+        ).fetchone()[0]
+    return total
+
+def scan_total(conn: sqlite3.Connection, match: Optional[str], result: str, risk: str,
+               view: str = "inspections", limit: int = -1) -> int:
+    """
+    Count listing rows by walking them, stopping after `limit` rows.
+
+    A limit of -1 counts everything.
+    """
+    join, where, params = listing_filters(match, result, risk, view)
+    total = conn.execute(f"""
+        SELECT COUNT(*) FROM (
+            SELECT 1 {dated_rows_source(join, where, view)}
+            LIMIT ?)
+    """, params + [limit]).fetchone()[0]
+    if result == "All" and risk == "All" and (limit < 0 or total < limit):
+        total += conn.execute(f"""
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM facilities f
+                {join}
+                WHERE NOT EXISTS (SELECT 1 FROM inspections i WHERE i.license_number = f.license_number)
+                LIMIT ?)
+        """, params[:1] + [limit - total if limit >= 0 else -1]).fetchone()[0]
+    return total
+
+def _compute_exact_count(key: Tuple) -> None:
+    """Background job: count a search exactly and remember it for a while."""
+    try:
+        with get_pool().connection() as conn:
+            n = scan_total(conn, *key)
+        with _exact_counts_lock:
+            if len(_exact_counts) >= 1000:
+                _exact_counts.pop(next(iter(_exact_counts)))
+            _exact_counts[key] = (time.monotonic(), n)
+    except Exception as e:
+        logger.error("Background count error: %s", e)
+    finally:
+        with _exact_counts_lock:
+            _exact_counts_pending.discard(key)
+
+def listing_total(conn: sqlite3.Connection, match: Optional[str], result: str,
+                  risk: str, view: str = "inspections") -> Tuple[int, bool]:
+    """
+    Total for the home() listing without scanning the whole join.
+
+    Without a text filter the counters give an exact answer in O(1). With one,
+    counting stops at COUNT_CAP; if BACKGROUND_EXACT_COUNTS is on, an exact
+    count is queued and served to later requests for the same search.
+
+    Returns:
+        Tuple[int, bool]: (total, is_exact)
+    """
+    if not match:
+        return counter_total(conn, result, risk, view), True
+
+    key = (match, result, risk, view)
+    with _exact_counts_lock:
+        cached = _exact_counts.get(key)
+    if cached and time.monotonic() - cached[0] < app.config['EXACT_COUNT_TTL']:
+        return cached[1], True
+
+    cap = app.config['COUNT_CAP']
+    total = scan_total(conn, match, result, risk, view, limit=cap + 1)
+    if total <= cap:
+        return total, True
+
+    if app.config['BACKGROUND_EXACT_COUNTS']:
+        with _exact_counts_lock:
+            if key not in _exact_counts_pending:
+                _exact_counts_pending.add(key)
+                _count_executor.submit(_compute_exact_count, key)
+    return cap, False
+
+# ==================== CHART HELPERS ====================
+
+CHART_GRAINS = ("month", "day")
+CHART_GROUPS = ("result", "risk", "facility_type", "zip")
+MAX_CHART_POINTS = 1000
+
+def parse_period(value: str, grain: str, end: bool = False) -> Optional[str]:
+    """
+    Normalize a YYYY-MM or YYYY-MM-DD bound to the grain's period format.
+
+    A month given for a day-grain range covers the whole month, so as an end
+    bound it becomes the month's last day.
+    """
+    for fmt in ('%Y-%m-%d', '%Y-%m'):
+        try:
+            day = datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+        if grain == 'month':
+            return day.strftime('%Y-%m')
+        if fmt == '%Y-%m' and end:
+            day = (day.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        return day.isoformat()
+    return None
+
+def period_labels(grain: str, start: str, end: str) -> List[str]:
+    """Every period from start to end inclusive, or [] if there would be too many."""
+    if grain == 'month':
+        year, month = map(int, start.split('-'))
+        end_year, end_month = map(int, end.split('-'))
+        if (end_year * 12 + end_month) - (year * 12 + month) >= MAX_CHART_POINTS:
+            return []
+        labels = []
+        while (year, month) <= (end_year, end_month):
+            labels.append(f"{year:04d}-{month:02d}")
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return labels
+    first, last = date.fromisoformat(start), date.fromisoformat(end)
+    if (last - first).days >= MAX_CHART_POINTS:
+        return []
+    return [(first + timedelta(days=n)).isoformat() for n in range((last - first).days + 1)]
+
+def rollup_series(conn: sqlite3.Connection, grain: str, start: str, end: str,
+                  group_by: Optional[str] = None) -> Dict:
+    """
+    Fail/total series for a period range, read from inspection_rollups.
+
+    The cost depends on the number of periods and groups, not on how many
+    inspections they summarize. Periods without inspections are zero-filled.
+
+    Returns:
+        Dict: labels, fails and total lists, plus per-group series under
+        "groups" when group_by is set
+    """
+    labels = period_labels(grain, start, end)
+    slot = {label: n for n, label in enumerate(labels)}
+    group_col = group_by if group_by in CHART_GROUPS else "''"
+    rows = conn.execute(f"""
+        SELECT period, {group_col} AS grp,
+               SUM(CASE WHEN result = 'Fail' THEN n ELSE 0 END) AS fails,
+               SUM(n) AS total
+        FROM inspection_rollups
+        WHERE grain = ? AND period BETWEEN ? AND ?
+        GROUP BY period, grp
+    """, (grain, start, end)).fetchall()
+
+    fails, total = [0] * len(labels), [0] * len(labels)
+    groups: Dict[str, Dict[str, List[int]]] = {}
+    for r in rows:
+        n = slot[r["period"]]
+        fails[n] += r["fails"]
+        total[n] += r["total"]
+        if group_by and r["total"]:
+            series = groups.setdefault(r["grp"], {"fails": [0] * len(labels), "total": [0] * len(labels)})
+            series["fails"][n] = r["fails"]
+            series["total"][n] = r["total"]
+
+    data = {"labels": labels, "fails": fails, "total": total}
+    if group_by:
+        data["group_by"] = group_by
+        data["groups"] = [{"key": key, **series} for key, series in sorted(groups.items())]
+    return data
+
+# ==================== NEARBY HELPERS ====================
+
+EARTH_RADIUS_M = 6371008.8  # mean radius
+NEARBY_DEFAULT_RADIUS_M = 1000
+NEARBY_MAX_RADIUS_M = 5000
+NEARBY_START_RADIUS_M = 250
+NEARBY_MAX_RESULTS = 200
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+def bounding_box(lat: float, lon: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """
+    Smallest lat/lon box containing the circle (not wrapped at the antimeridian).
+
+    Returns:
+        (min_lat, max_lat, min_lon, max_lon)
+    """
+    angle = radius_m / EARTH_RADIUS_M
+    dlat = math.degrees(angle)
+    cos_lat = math.cos(math.radians(lat))
+    if lat + dlat >= 90 or lat - dlat <= -90 or math.sin(angle) >= cos_lat:
+        dlon = 180.0  # the circle reaches a pole
+    else:
+        dlon = math.degrees(math.asin(math.sin(angle) / cos_lat))
+    return max(lat - dlat, -90.0), min(lat + dlat, 90.0), lon - dlon, lon + dlon
+
+def load_nearby(conn: sqlite3.Connection, lat: float, lon: float, radius_m: float,
+                limit: int) -> List[Dict]:
+    """
+    The `limit` nearest facilities within radius_m of (lat, lon), with their latest inspection.
+
+    facilities_geo narrows each search to a bounding box, so exact distances
+    are only computed for the facilities inside it. The search starts at
+    NEARBY_START_RADIUS_M and doubles until `limit` facilities are within
+    it (or it reaches radius_m): those are then the nearest overall, and a
+    wide radius downtown costs about as much as a narrow one. Details (with
+    the latest inspection from the last_* columns) are only read for the
+    facilities returned.
+
+    Returns:
+        List of facility dicts, nearest first, with distance_m and
+        last_inspection_date, last_result and last_risk (None if never
+        inspected)
+    """
+    search = min(NEARBY_START_RADIUS_M, radius_m)
+    while True:
+        min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, search)
+        within = []
+        for rowid, f_lat, f_lon in conn.execute("""
+            SELECT f.rowid, f.latitude, f.longitude
+            FROM facilities_geo g
+            JOIN facilities f ON f.rowid = g.id
+            WHERE g.max_lat >= ? AND g.min_lat <= ? AND g.max_lon >= ? AND g.min_lon <= ?
+        """, (min_lat, max_lat, min_lon, max_lon)):
+            distance = haversine_m(lat, lon, f_lat, f_lon)
+            if distance <= search:
+                within.append((distance, rowid))
+        if len(within) >= limit or search >= radius_m:
+            break
+        search = min(search * 2, radius_m)
+    within = sorted(within)[:limit]
+    if not within:
+        return []
+
+    rows = {r["rowid"]: r for r in conn.execute(f"""
+        SELECT f.rowid, f.license_number, f.dba_name, f.facility_type, f.address, f.zip,
+               f.latitude, f.longitude, f.inspection_count, f.last_inspection_date,
+               f.last_result, f.last_risk
+        FROM facilities f
+        WHERE f.rowid IN ({",".join("?" * len(within))})
+    """, [rowid for _, rowid in within])}
+
+    facilities = []
+    for distance, rowid in within:
+        facility = dict(rows[rowid])
+        del facility["rowid"]
+        facility["distance_m"] = round(distance, 1)
+        facilities.append(facility)
+    return facilities
+
+# ==================== EXPORT HELPERS ====================
+
+# fields= name -> column; order here is the default column order
+EXPORT_FIELDS = {
+    "inspection_id": "i.inspection_id",
+    "inspection_date": "i.inspection_date",
+    "inspection_type": "i.inspection_type",
+    "result": "i.result",
+    "risk": "i.risk",
+    "violations": "i.violations_text",
+    "license_number": "f.license_number",
+    "dba_name": "f.dba_name",
+    "facility_type": "f.facility_type",
+    "address": "f.address",
+    "city": "f.city",
+    "state": "f.state",
+    "zip": "f.zip",
+}
+EXPORT_BATCH_ROWS = 1000  # rows fetched and encoded per chunk
+
+def parse_export_fields(value: str) -> Optional[List[str]]:
+    """fields= value -> list of field names (all by default), or None if any is unknown."""
+    fields = [name.strip() for name in value.split(",") if name.strip()] or list(EXPORT_FIELDS)
+    return fields if all(name in EXPORT_FIELDS for name in fields) else None
+
+def export_rows(match: Optional[str], result: str, risk: str, fields: List[str],
+                pool: Optional[ConnectionPool] = None) -> Iterator[List[tuple]]:
+    """
+    Yield the filtered inspections, newest first, in batches of rows.
+
+    Uses its own connection from `pool` (default: the read-write pool), since
+    the request's is returned before a streamed body finishes, and steps the
+    cursor with fetchmany, so only one batch is in memory at a time.
+    """
+    join, where, params = listing_filters(match, result, risk)
+    sql = f"""
+        SELECT {", ".join(EXPORT_FIELDS[name] for name in fields)}
+        FROM inspections i
+        JOIN facilities f ON f.license_number = i.license_number
+        {join}
+        WHERE 1=1 {where}
+        ORDER BY i.inspection_date DESC, i.inspection_id DESC
+    """
+    with (pool or get_pool()).connection() as conn:
+        cursor = conn.execute(sql, params)
+        try:
+            while True:
+                batch = cursor.fetchmany(EXPORT_BATCH_ROWS)
+                if not batch:
+                    break
+                yield batch
+        finally:
+            cursor.close()
+
+def encode_csv(fields: List[str], batches: Iterator[List[tuple]]) -> Iterator[str]:
+    """CSV text chunks: a header line, then one chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def encode_ndjson(fields: List[str], batches: Iterator[List[tuple]]) -> Iterator[str]:
+    """NDJSON text chunks: one JSON object per row, one chunk per batch."""
+    for batch in batches:
+        yield "".join(json.dumps(dict(zip(fields, row))) + "\n" for row in batch)
+
+def gzip_stream(chunks: Iterator[str], flush: bool = False) -> Iterator[bytes]:
+    """gzip-compress a text stream chunk by chunk (flush=True sends each chunk at once)."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if flush:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_response(encoder, mimetype: str, filename: str):
+    """Shared body of the /export.* routes."""
+    fields = parse_export_fields(request.args.get("fields", ""))
+    if fields is None:
+        return jsonify({"error": f"fields must be a comma-separated subset of: {', '.join(EXPORT_FIELDS)}"}), 400
+    q = request.args.get("q", "").strip()
+    result = request.args.get("result", "All")
+    risk = request.args.get("risk", "All")
+
+    # The generator runs after the request context is gone: pick its pool now
+    body = encoder(fields, export_rows(build_fts_query(q), result, risk, fields, request_pool()))
+    headers = {"Content-Disposition": f"attachment; filename={filename}", "Vary": "Accept-Encoding"}
+    if "gzip" in request.accept_encodings:
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+    logger.info("Export %s: q=%r result=%s risk=%s fields=%s", filename, q, result, risk, ",".join(fields),
+                extra={"event": "export"})
+    return Response(body, mimetype=mimetype, headers=headers)
+
+# ==================== ADMIN HELPERS ====================
+
+def admin_required(view):
+    """
+    Require `Authorization: Bearer <ADMIN_TOKEN>` (JSON 401 otherwise).
+
+    The admin endpoints are disabled (403) while ADMIN_TOKEN is unset.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = app.config['ADMIN_TOKEN']
+        if not token:
+            return jsonify({"error": "Admin endpoints are disabled; set ADMIN_TOKEN"}), 403
+        auth = request.authorization
+        supplied = auth.token if auth is not None and auth.type == "bearer" else None
+        if not supplied or not hmac.compare_digest(supplied.encode(), token.encode()):
+            response = jsonify({"error": "Missing or invalid admin token"})
+            response.status_code = 401
+            response.headers['WWW-Authenticate'] = 'Bearer realm="admin"'
+            return response
+        return view(*args, **kwargs)
+    return wrapper
+
+def open_db() -> sqlite3.Connection:
+    """A fresh, unpooled connection the caller closes (for background threads)."""
+    return connect(database_url(app.config), pragmas_from_config(app.config))
+
+def run_import(**kwargs):
+    """import_data() into the app's database (import_jobs' worker)."""
+    return import_data(db_path=sqlite_path(), pragmas=pragmas_from_config(app.config),
+                       batch_size=app.config['IMPORT_JOB_BATCH_SIZE'], **kwargs)
+
+import_jobs = ImportJobs(open_db, run_import, on_success=lambda: get_cache().clear())
+
+def import_request() -> Tuple[str, str, Optional[int], bool]:
+    """
+    Parse a POST /admin/import body (JSON or form fields).
+
+    Returns:
+        Tuple[str, str, Optional[int], bool]: (mode, source, limit, bulk)
+
+    Raises:
+        ValueError: With the message for the 400 response
+    """
+    body = request.get_json(silent=True) or request.form
+    mode = body.get("mode", "sample")
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of: {', '.join(MODES)}")
+    kind = body.get("source", "file")
+    sources = app.config['IMPORT_SOURCES']
+    if kind not in sources:
+        raise ValueError(f"source must be one of: {', '.join(sources)}")
+    source = sources[kind]
+    if is_local_path(source) and not os.path.exists(source):
+        raise ValueError(f"CSV file {os.path.basename(source)} not found; download it or use source=stream")
+
+    limit = None
+    if mode == "sample":
+        try:
+            limit = int(body.get("limit", app.config['IMPORT_SAMPLE_ROWS']))
+        except (TypeError, ValueError):
+            raise ValueError("limit must be an integer")
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+    elif body.get("limit") is not None:
+        raise ValueError("limit only applies to mode=sample")
+    bulk = str(body.get("bulk", False)).lower() in ("true", "1", "on")
+    return mode, source, limit, bulk
+
 # ==================== ROUTES ====================
 
 @app.route("/init")
@@ -165,10 +1324,100 @@ def init():
         logger.info("Database reinitialized via /init endpoint")
         return redirect(url_for('home'))
     except Exception as e:
-        logger.error(f"Init error: {e}")
+        logger.error("Init error: %s", e)
         flash(f'Error initializing database: {str(e)}', 'error')
         return redirect(url_for('home'))
 
+def load_listing(match: Optional[str], result: str, risk: str, sort: str, page: int,
+                 per_page: int, after_token: str, before_token: str,
+                 view: str = "inspections", stream: bool = False) -> Dict:
+    """
+    Run the home() listing queries.
+
+    With stream=True, forward pages are not fetched here: "rows" is a
+    ListingRows over the open cursor, read while the template renders.
+
+    Returns:
+        Dict: template variables for the rows, pager and total
+    """
+    conn = get_db()
+    after = decode_cursor(after_token, view)
+    before = decode_cursor(before_token, view)
+    offset = (page - 1) * per_page
+
+    if sort == "relevance":
+        # Search results are small, ranked sets; page numbers are enough here.
+        if stream:
+            rows = ListingRows(ranked_rows(conn, match, result, risk, per_page + 1, offset, view),
+                               per_page, offset > 0, view, sort)
+        else:
+            page_rows, has_prev, has_next = fetch_ranked_page(
+                conn, match, result, risk, per_page, offset, view)
+            rows = ListingRows(page_rows, per_page, has_prev, view, sort, has_next)
+    elif before:
+        # Previous pages are read backwards, so they are always fetched.
+        page_rows, has_prev, has_next = fetch_listing_page(
+            conn, match, result, risk, per_page, before=before, view=view)
+        rows = ListingRows(page_rows, per_page, has_prev, view, sort, has_next)
+        if not has_prev:
+            page = 1
+    else:
+        # A cursor seeks; without one, plain page numbers (bookmarks, shallow pages).
+        if after:
+            offset = 0
+        if stream:
+            rows = ListingRows(listing_rows(conn, match, result, risk, per_page + 1, after, offset, view),
+                               per_page, bool(after or offset), view, sort)
+        else:
+            page_rows, has_prev, has_next = fetch_listing_page(
+                conn, match, result, risk, per_page, after=after, offset=offset, view=view)
+            rows = ListingRows(page_rows, per_page, has_prev, view, sort, has_next)
+
+    total, total_exact = listing_total(conn, match, result, risk, view)
+    return {
+        "rows": rows,
+        "view": view,
+        "sort": sort,
+        "page": page,
+        "per_page": per_page,
+        "total_pages": (total + per_page - 1) // per_page,
+        "total": total,
+        "total_exact": total_exact,
+    }
+
+def stream_page(template_name: str, **context) -> Response:
+    """
+    Render a template as a streamed response, gzip-compressed if accepted.
+
+    Template output is sent in STREAM_CHUNK_SIZE pieces, each flushed
+    through gzip right away, so the first bytes leave before the rows are
+    all read. The request's connection stays checked out until the body is
+    done (the template reads from its cursors), and flashed messages are
+    consumed up front, since the session cookie is sent before the
+    template runs.
+    """
+    get_flashed_messages()
+    body = chunked(stream_template(template_name, **context), app.config['STREAM_CHUNK_SIZE'])
+    headers = {}
+    if app.config['COMPRESS_ENABLED']:
+        headers["Vary"] = "Accept-Encoding"
+        if negotiate(request.accept_encodings, ("gzip",)):
+            body = gzip_stream(body, flush=True)
+            headers["Content-Encoding"] = "gzip"
+    return Response(hold_db(body), mimetype="text/html", headers=headers)
+
+def chunked(chunks: Iterator[str], size: int) -> Iterator[str]:
+    """Join small text chunks into pieces of at least `size` characters."""
+    buffer, length = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
+
 @app.route("/")
 def home():
     """Display main page with search, filters, and results."""
@@ -176,98 +1425,88 @@ def home():
         q = request.args.get("q", "").strip()
         result = request.args.get("result", "All")
         risk = request.args.get("risk", "All")
+        sort = request.args.get("sort", "date")
+        view = request.args.get("view", "inspections")
+        if view not in LISTING_VIEWS:
+            view = "inspections"
         page = max(1, int(request.args.get("page", 1)))
-        per_page = 50
-        offset = (page - 1) * per_page
+        per_page = min(max(1, int(request.args.get("per_page", app.config['ITEMS_PER_PAGE']))),
+                       app.config['MAX_ITEMS_PER_PAGE'])
+        match = build_fts_query(q)
+        if not match:
+            sort = "date"
+        after_token = request.args.get("after", "")
+        before_token = request.args.get("before", "")
 
-        sql = """
-        SELECT f.license_number, f.dba_name, f.facility_type, f.zip,
-               i.inspection_id, i.inspection_date, i.result, i.risk
-        FROM facilities f
-        LEFT JOIN inspections i ON i.license_number = f.license_number
-        WHERE 1=1
-        """
-        params = []
-
-        if q:
-            sql += " AND (LOWER(f.dba_name) LIKE ? OR LOWER(f.address) LIKE ?)"
-            params += [f"%{q.lower()}%", f"%{q.lower()}%"]
-        if result != "All":
-            sql += " AND (i.result = ?)"
-            params.append(result)
-        if risk != "All":
-            sql += " AND (i.risk = ?)"
-            params.append(risk)
-
-        sql += " ORDER BY i.inspection_date DESC LIMIT ? OFFSET ?"
-        params.extend([per_page, offset])
+        if per_page > app.config['STREAM_MIN_ROWS']:
+            # Large pages go from the cursor straight into the response
+            # rather than through memory and the result cache.
+            listing = load_listing(match, result, risk, sort, page, per_page,
+                                   after_token, before_token, view, stream=True)
+            return stream_page("index.html", q=q, result=result, risk=risk,
+                               default_per_page=app.config['ITEMS_PER_PAGE'], **listing)
 
-        conn = get_db()
-        rows = conn.execute(sql, params).fetchall()
-        
-        # Get total count for pagination
-        count_sql = """
-        SELECT COUNT(DISTINCT f.license_number || '-' || COALESCE(i.inspection_id, ''))
-        FROM facilities f
-        LEFT JOIN inspections i ON i.license_number = f.license_number
-        WHERE 1=1
-        """
-        count_params = []
-        if q:
-            count_sql += " AND (LOWER(f.dba_name) LIKE ? OR LOWER(f.address) LIKE ?)"
-            count_params += [f"%{q.lower()}%", f"%{q.lower()}%"]
-        if result != "All":
-            count_sql += " AND (i.result = ?)"
-            count_params.append(result)
-        if risk != "All":
-            count_sql += " AND (i.risk = ?)"
-            count_params.append(risk)
-        
-        total = conn.execute(count_sql, count_params).fetchone()[0]
-        total_pages = (total + per_page - 1) // per_page
-        
-        conn.close()
+        # Every term is quoted and FTS5 folds case, so the lowercased MATCH
+        # expression identifies the result set.
+        key = ("home", view, match.lower() if match else None, result, risk, sort, page, per_page,
+               after_token, before_token)
+        listing = cached(key, lambda: load_listing(match, result, risk, sort, page, per_page,
+                                                   after_token, before_token, view))
         
         return render_template(
             "index.html", 
-            rows=rows, 
             q=q, 
             result=result, 
             risk=risk,
-            page=page,
-            total_pages=total_pages,
-            total=total
+            default_per_page=app.config['ITEMS_PER_PAGE'],
+            **listing
         )
     except Exception as e:
-        logger.error(f"Home route error: {e}")
+        logger.error("Home route error: %s", e)
         flash(f'Error loading data: {str(e)}', 'error')
-        return render_template("index.html", rows=[], q="", result="All", risk="All", page=1, total_pages=1, total=0)
+        per_page = app.config['ITEMS_PER_PAGE']
+        return render_template("index.html", rows=ListingRows([], per_page, False, "inspections", "date", False),
+                               q="", result="All", risk="All", view="inspections", sort="date",
+                               page=1, per_page=per_page, default_per_page=per_page,
+                               total_pages=1, total=0, total_exact=True)
+
+def load_facility(license_number: str) -> Optional[Tuple[sqlite3.Row, List[sqlite3.Row]]]:
+    """Fetch a facility and its inspections, newest first (None if not found)."""
+    conn = get_db()
+    f = conn.execute(
+        "SELECT * FROM facilities WHERE license_number=?",
+        (license_number,)
+    ).fetchone()
+    if not f:
+        return None
+    ins = conn.execute("""
+        SELECT * FROM inspections
+        WHERE license_number=?
+        ORDER BY inspection_date DESC
+    """, (license_number,)).fetchall()
+    return f, ins
 
 @app.route("/facility/<license_number>")
 def facility_detail(license_number: str):
     """Display facility details and inspection history."""
     try:
-        conn = get_db()
-        f = conn.execute(
-            "SELECT * FROM facilities WHERE license_number=?",
-            (license_number,)
-        ).fetchone()
+        validators = facility_validators(get_db(), license_number)
+        detail = None
+        if validators:
+            response = not_modified(*validators)
+            if response:
+                return response
+            detail = cached(("facility", license_number), lambda: load_facility(license_number),
+                            depends_on_all=False, version=validators[0])
         
-        if not f:
-            conn.close()
+        if not detail:
             flash('Facility not found', 'error')
             return redirect(url_for('home'))
         
-        ins = conn.execute("""
-            SELECT * FROM inspections
-            WHERE license_number=?
-            ORDER BY inspection_date DESC
-        """, (license_number,)).fetchall()
-        
-        conn.close()
-        return render_template("detail.html", f=f, inspections=ins)
+        f, ins = detail
+        return with_validators(render_template("detail.html", f=f, inspections=ins), *validators)
     except Exception as e:
-        logger.error(f"Facility detail error: {e}")
+        logger.error("Facility detail error: %s", e)
         flash(f'Error loading facility: {str(e)}', 'error')
         return redirect(url_for('home'))
 
@@ -294,7 +1533,6 @@ def create_facility():
         ).fetchone()
         
         if existing:
-            conn.close()
             flash('License number already exists', 'error')
             return redirect(url_for('home'))
         
@@ -304,25 +1542,25 @@ def create_facility():
         """, (data["license_number"], data["dba_name"], data["facility_type"], data["address"],
               data["city"], data["state"], data["zip"], data["phone"] or None))
         conn.commit()
-        conn.close()
+        data_changed(data["license_number"])
         
-        logger.info(f"Created facility: {data['license_number']}")
+        logger.info("Created facility: %s", data['license_number'],
+                    extra={"event": "facility_created", "license_number": data['license_number']})
         flash(f'Facility "{data["dba_name"]}" created successfully!', 'success')
         return redirect(url_for('facility_detail', license_number=data['license_number']))
     
     except sqlite3.IntegrityError as e:
-        logger.error(f"Integrity error creating facility: {e}")
+        logger.error("Integrity error creating facility: %s", e)
         flash('Database error: Duplicate or invalid data', 'error')
         return redirect(url_for('home'))
     except Exception as e:
-        logger.error(f"Error creating facility: {e}")
+        logger.error("Error creating facility: %s", e)
         flash(f'Error creating facility: {str(e)}', 'error')
         return redirect(url_for('home'))
 
 @app.route("/facility/<license_number>/edit", methods=["GET", "POST"])
 def edit_facility(license_number: str):
     """Edit an existing facility."""
-    conn = None
     try:
         if request.method == "GET":
             conn = get_db()
@@ -330,7 +1568,6 @@ def edit_facility(license_number: str):
                 "SELECT * FROM facilities WHERE license_number=?",
                 (license_number,)
             ).fetchone()
-            conn.close()
             
             if not facility:
                 flash('Facility not found', 'error')
@@ -365,16 +1602,15 @@ def edit_facility(license_number: str):
             """, (data["dba_name"], data["facility_type"], data["address"], data["city"],
                   data["state"], data["zip"], data["phone"] or None, license_number))
             conn.commit()
-            conn.close()
+            data_changed(license_number)
             
-            logger.info(f"Updated facility: {license_number}")
+            logger.info("Updated facility: %s", license_number,
+                        extra={"event": "facility_updated", "license_number": license_number})
             flash('Facility updated successfully!', 'success')
             return redirect(url_for('facility_detail', license_number=license_number))
     
     except Exception as e:
-        if conn:
-            conn.close()
-        logger.error(f"Error editing facility: {e}")
+        logger.error("Error editing facility: %s", e)
         flash(f'Error updating facility: {str(e)}', 'error')
         return redirect(url_for('facility_detail', license_number=license_number))
 
@@ -391,16 +1627,17 @@ def delete_facility(license_number: str):
         if facility:
             conn.execute("DELETE FROM facilities WHERE license_number=?", (license_number,))
             conn.commit()
-            logger.info(f"Deleted facility: {license_number}")
+            data_changed(license_number)
+            logger.info("Deleted facility: %s", license_number,
+                        extra={"event": "facility_deleted", "license_number": license_number})
             flash(f'Facility "{facility["dba_name"]}" deleted successfully', 'success')
         else:
             flash('Facility not found', 'error')
         
-        conn.close()
         return redirect(url_for('home'))
     
     except Exception as e:
-        logger.error(f"Error deleting facility: {e}")
+        logger.error("Error deleting facility: %s", e)
         flash(f'Error deleting facility: {str(e)}', 'error')
         return redirect(url_for('home'))
 
@@ -418,31 +1655,32 @@ def create_inspection():
             return redirect(url_for('facility_detail', license_number=data.get('license_number', '')))
         
         conn = get_db()
-        conn.execute("""
+        cur = conn.execute("""
             INSERT INTO inspections(license_number,inspection_date,inspection_type,risk,result,violations_text)
             VALUES(?,?,?,?,?,?)
         """, (data["license_number"], data["inspection_date"], data["inspection_type"],
               data["risk"], data["result"], data["violations_text"] or None))
+        replace_violations(conn, cur.lastrowid, data["violations_text"])
         conn.commit()
-        conn.close()
+        data_changed(data["license_number"])
         
-        logger.info(f"Created inspection for facility: {data['license_number']}")
+        logger.info("Created inspection for facility: %s", data['license_number'],
+                    extra={"event": "inspection_created", "license_number": data['license_number']})
         flash('Inspection added successfully!', 'success')
         return redirect(url_for('facility_detail', license_number=data["license_number"]))
     
     except sqlite3.IntegrityError as e:
-        logger.error(f"Integrity error creating inspection: {e}")
+        logger.error("Integrity error creating inspection: %s", e)
         flash('Error: Invalid facility license number', 'error')
         return redirect(url_for('home'))
     except Exception as e:
-        logger.error(f"Error creating inspection: {e}")
+        logger.error("Error creating inspection: %s", e)
         flash(f'Error creating inspection: {str(e)}', 'error')
         return redirect(url_for('facility_detail', license_number=data.get('license_number', '')))
 
 @app.route("/inspection/<int:inspection_id>/edit", methods=["GET", "POST"])
 def edit_inspection(inspection_id: int):
     """Edit an existing inspection."""
-    conn = None
     try:
         if request.method == "GET":
             conn = get_db()
@@ -450,7 +1688,6 @@ def edit_inspection(inspection_id: int):
                 "SELECT * FROM inspections WHERE inspection_id=?",
                 (inspection_id,)
             ).fetchone()
-            conn.close()
             
             if not inspection:
                 flash('Inspection not found', 'error')
@@ -480,7 +1717,6 @@ def edit_inspection(inspection_id: int):
                              (inspection_id,)).fetchone()
             
             if not row:
-                conn.close()
                 flash('Inspection not found', 'error')
                 return redirect(url_for('home'))
             
@@ -490,19 +1726,19 @@ def edit_inspection(inspection_id: int):
                 WHERE inspection_id=?
             """, (data["inspection_date"], data["inspection_type"], data["risk"],
                   data["result"], data["violations_text"] or None, inspection_id))
+            replace_violations(conn, inspection_id, data["violations_text"])
             conn.commit()
+            data_changed(row["license_number"])
             
             license_number = row["license_number"]
-            conn.close()
             
-            logger.info(f"Updated inspection: {inspection_id}")
+            logger.info("Updated inspection: %s", inspection_id,
+                        extra={"event": "inspection_updated", "inspection_id": inspection_id})
             flash('Inspection updated successfully!', 'success')
             return redirect(url_for('facility_detail', license_number=license_number))
     
     except Exception as e:
-        if conn:
-            conn.close()
-        logger.error(f"Error editing inspection: {e}")
+        logger.error("Error editing inspection: %s", e)
         flash(f'Error updating inspection: {str(e)}', 'error')
         return redirect(url_for('home'))
 
@@ -519,58 +1755,269 @@ def delete_inspection(inspection_id: int):
         if row:
             conn.execute("DELETE FROM inspections WHERE inspection_id=?", (inspection_id,))
             conn.commit()
+            data_changed(row["license_number"])
             license_number = row["license_number"]
-            conn.close()
             
-            logger.info(f"Deleted inspection: {inspection_id}")
+            logger.info("Deleted inspection: %s", inspection_id,
+                        extra={"event": "inspection_deleted", "inspection_id": inspection_id})
             flash('Inspection deleted successfully', 'success')
             return redirect(url_for('facility_detail', license_number=license_number))
         
-        conn.close()
         flash('Inspection not found', 'error')
         return redirect(url_for('home'))
     
     except Exception as e:
-        logger.error(f"Error deleting inspection: {e}")
+        logger.error("Error deleting inspection: %s", e)
         flash(f'Error deleting inspection: {str(e)}', 'error')
         return redirect(url_for('home'))
 
 @app.route("/chart/monthly-fails.json")
 def chart_monthly_fails():
-    """API endpoint for monthly fail chart data."""
+    """
+    API endpoint for fail/total chart data.
+
+    Query args: granularity (month|day, default month), from/to (YYYY-MM or
+    YYYY-MM-DD, default the last 6 months) and group_by (result, risk,
+    facility_type or zip).
+    """
+    empty = {"labels": [], "fails": [], "total": []}
+    grain = request.args.get("granularity", "month").strip() or "month"
+    group_by = request.args.get("group_by", "").strip() or None
+    if grain not in CHART_GRAINS:
+        return jsonify({"error": f"granularity must be one of {', '.join(CHART_GRAINS)}", **empty}), 400
+    if group_by and group_by not in CHART_GROUPS:
+        return jsonify({"error": f"group_by must be one of {', '.join(CHART_GROUPS)}", **empty}), 400
+
+    today = date.today()
+    six_months_ago = today.replace(year=today.year - (today.month <= 6),
+                                   month=(today.month - 7) % 12 + 1, day=1)
+    start = parse_period(request.args.get("from", "").strip() or six_months_ago.isoformat(), grain)
+    end = parse_period(request.args.get("to", "").strip() or today.isoformat(), grain, end=True)
+    if not start or not end or start > end:
+        return jsonify({"error": "from/to must be YYYY-MM or YYYY-MM-DD with from <= to", **empty}), 400
+    if not period_labels(grain, start, end):
+        return jsonify({"error": f"Range too long (max {MAX_CHART_POINTS} points)", **empty}), 400
+
     try:
         conn = get_db()
-        rows = conn.execute("""
-            SELECT strftime('%Y-%m', inspection_date) AS ym,
-                   SUM(CASE WHEN result='Fail' THEN 1 ELSE 0 END) AS fails,
-                   COUNT(*) AS total
-            FROM inspections
-            WHERE inspection_date >= date('now','-6 months')
-            GROUP BY ym ORDER BY ym
-        """).fetchall()
-        conn.close()
-        
+        validators = data_validators(conn, grain, start, end, group_by)
+        response = not_modified(*validators)
+        if response:
+            return response
+        return with_validators(jsonify(rollup_series(conn, grain, start, end, group_by)), *validators)
+    except Exception as e:
+        logger.error("Chart data error: %s", e)
+        return jsonify({"error": str(e), **empty}), 500
+
+@app.route("/export.csv")
+def export_csv():
+    """Stream the filtered inspections as CSV (same q/result/risk as home())."""
+    return export_response(encode_csv, "text/csv", "inspections.csv")
+
+@app.route("/export.ndjson")
+def export_ndjson():
+    """Stream the filtered inspections as newline-delimited JSON."""
+    return export_response(encode_ndjson, "application/x-ndjson", "inspections.ndjson")
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus scrape endpoint."""
+    cache = get_cache().stats()
+    extra = [
+        ("result_cache_hits_total", "counter", "Result cache hits.", cache["hits"]),
+        ("result_cache_misses_total", "counter", "Result cache misses.", cache["misses"]),
+        ("result_cache_evictions_total", "counter", "Result cache LRU evictions.", cache["evictions"]),
+        ("result_cache_entries", "gauge", "Entries in the result cache.", cache["size"]),
+        ("db_pool_idle_connections", "gauge", "Idle pooled SQLite connections.", get_pool().idle()),
+    ]
+    return Response(metrics.render(extra), mimetype="text/plain; version=0.0.4")
+
+@app.route("/cache/stats.json")
+def cache_stats():
+    """API endpoint for result cache hit/miss/eviction counters."""
+    return jsonify(get_cache().stats())
+
+@app.route("/violations/top.json")
+def top_violations():
+    """
+    API endpoint for the most frequent violation codes.
+
+    Query args: from/to (YYYY-MM-DD, default the last 12 months), zip
+    (optional) and limit (default 10, max 100).
+    """
+    date_to = request.args.get("to", "").strip() or datetime.now().strftime('%Y-%m-%d')
+    date_from = request.args.get("from", "").strip()
+    zip_code = request.args.get("zip", "").strip()
+    if not date_from and validate_date(date_to):
+        to_day = datetime.strptime(date_to, '%Y-%m-%d')
+        date_from = to_day.replace(year=to_day.year - 1, day=min(to_day.day, 28)).strftime('%Y-%m-%d')
+    if not (validate_date(date_from) and validate_date(date_to)):
+        return jsonify({"error": "from/to must be YYYY-MM-DD", "codes": []}), 400
+    if zip_code and not validate_zip(zip_code):
+        return jsonify({"error": "Invalid zip", "codes": []}), 400
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), 100)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer", "codes": []}), 400
+
+    try:
+        conn = get_db()
+        zip_join = "JOIN facilities f ON f.license_number = i.license_number AND f.zip = ?" if zip_code else ""
+        params = ([zip_code] if zip_code else []) + [date_from, date_to, limit]
+        rows = conn.execute(f"""
+            SELECT v.code, MAX(v.description) AS description, MAX(v.critical) AS critical,
+                   COUNT(*) AS violations, COUNT(DISTINCT i.license_number) AS facilities
+            FROM inspections i
+            JOIN violations v ON v.inspection_id = i.inspection_id
+            {zip_join}
+            WHERE i.inspection_date BETWEEN ? AND ?
+            GROUP BY v.code
+            ORDER BY violations DESC, v.code
+            LIMIT ?
+        """, params).fetchall()
+
+        return jsonify({
+            "from": date_from,
+            "to": date_to,
+            "zip": zip_code or None,
+            "codes": [dict(r) for r in rows]
+        })
+    except Exception as e:
+        logger.error("Top violations error: %s", e)
+        return jsonify({"error": str(e), "codes": []}), 500
+
+@app.route("/nearby")
+def nearby():
+    """
+    API endpoint for facilities near a point, nearest first.
+
+    Query args: lat and lon (WGS84 degrees, required), radius in meters
+    (default 1000, max 5000) and limit (default 50, max 200).
+    """
+    empty = {"facilities": []}
+    try:
+        lat = float(request.args.get("lat", ""))
+        lon = float(request.args.get("lon", ""))
+    except ValueError:
+        return jsonify({"error": "lat and lon are required numbers", **empty}), 400
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return jsonify({"error": "lat must be within [-90, 90] and lon within [-180, 180]", **empty}), 400
+    try:
+        radius = float(request.args.get("radius", NEARBY_DEFAULT_RADIUS_M))
+        limit = min(max(int(request.args.get("limit", 50)), 1), NEARBY_MAX_RESULTS)
+    except ValueError:
+        return jsonify({"error": "radius must be a number and limit an integer", **empty}), 400
+    if not 0 < radius <= NEARBY_MAX_RADIUS_M:
+        return jsonify({"error": f"radius must be in meters, at most {NEARBY_MAX_RADIUS_M}", **empty}), 400
+
+    try:
+        facilities = load_nearby(get_db(), lat, lon, radius, limit)
         return jsonify({
-            "labels": [r["ym"] for r in rows],
-            "fails":  [r["fails"] for r in rows],
-            "total":  [r["total"] for r in rows]
+            "lat": lat,
+            "lon": lon,
+            "radius_m": radius,
+            "count": len(facilities),
+            "facilities": facilities
         })
     except Exception as e:
-        logger.error(f"Chart data error: {e}")
-        return jsonify({"error": str(e), "labels": [], "fails": [], "total": []}), 500
+        logger.error("Nearby search error: %s", e)
+        return jsonify({"error": str(e), **empty}), 500
+
+@app.route("/assets/<path:filename>")
+def hashed_asset(filename):
+    """
+    Serve a fingerprinted file from the assets.py build, cached as immutable.
+
+    Serves the pre-compressed .br/.gz copy the client accepts, if built.
+    """
+    directory = str(app.config['ASSET_DIR'])
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    offered = [encoding for encoding in SUFFIXES if os.path.isfile(path + SUFFIXES[encoding])]
+    encoding = negotiate(request.accept_encodings, offered)
+    response = send_from_directory(
+        directory, filename + SUFFIXES[encoding] if encoding else filename,
+        mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+        max_age=app.config['ASSET_MAX_AGE'])
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if offered:
+        response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.route("/admin/import", methods=["POST"])
+@admin_required
+def start_import():
+    """
+    Queue an import from the configured CSV file or the portal stream.
+
+    Body (JSON or form): mode (sample|full, default sample), source
+    (file|stream, default file), limit (rows, sample only; default
+    IMPORT_SAMPLE_ROWS) and bulk (drop indexes and triggers while loading;
+    default false, as the site keeps serving).
+
+    Returns 202 with the job and its URL in Location, or 409 with the
+    running job if there is one.
+    """
+    try:
+        mode, source, limit, bulk = import_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        job = import_jobs.submit(mode, source, limit, bulk)
+    except JobConflict as e:
+        return jsonify({"error": str(e), "job": e.job}), 409
+    except Exception as e:
+        logger.error("Import job error: %s", e)
+        return jsonify({"error": str(e)}), 500
+    response = jsonify({"job": job})
+    response.status_code = 202
+    response.headers['Location'] = url_for('import_status', job_id=job["id"])
+    return response
+
+@app.route("/admin/import")
+@admin_required
+def current_import():
+    """Progress of the running import job, or else the last one."""
+    try:
+        return jsonify({"job": import_jobs.current()})
+    except Exception as e:
+        logger.error("Import job error: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/admin/import/<int:job_id>")
+@admin_required
+def import_status(job_id):
+    """
+    Progress of one import job: state, rows, rows_per_sec, percent, eta_s
+    (see jobs.describe()).
+    """
+    try:
+        job = import_jobs.get(job_id)
+    except Exception as e:
+        logger.error("Import job error: %s", e)
+        return jsonify({"error": str(e)}), 500
+    if job is None:
+        return jsonify({"error": f"No import job {job_id}"}), 404
+    return jsonify({"job": job})
 
 # ==================== ERROR HANDLERS ====================
 
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors."""
+    if request.endpoint in ('static', 'hashed_asset'):
+        return error  # a missing file, not a page: no redirect or flash
     flash('Page not found', 'error')
     return redirect(url_for('home'))
 
 @app.errorhandler(500)
 def internal_error(error):
     """Handle 500 errors."""
-    logger.error(f"Internal server error: {error}")
+    logger.error("Internal server error: %s", error)
     flash('An internal error occurred. Please try again.', 'error')
     return redirect(url_for('home'))
 
@@ -578,9 +2025,11 @@ def internal_error(error):
 
 if __name__ == "__main__":
     # Initialize database if it doesn't exist
-    if not os.path.exists(DB_PATH):
+    if not os.path.exists(sqlite_path()):
         logger.info("Database not found, initializing...")
         init_db()
+    elif app.config['MIGRATE_ON_STARTUP']:
+        migrate_db()
     
     # Run the app
     port = int(os.environ.get('PORT', 1818))
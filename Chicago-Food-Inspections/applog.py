@@ -0,0 +1,226 @@
+"""
+Non-blocking JSON logging for app.py.
+
+Request threads only build a LogRecord and put it on an in-memory queue
+(QueueHandler); a QueueListener thread formats it and writes it. A stalled
+disk or a slow terminal then delays the listener, not requests:
+
+- Messages are formatted lazily. Callers pass %-style arguments
+  (logger.info("Deleted facility: %s", lic)), and the handler does not
+  pre-format records as the stock QueueHandler does. Interpolation and
+  JSON encoding run on the listener thread.
+- The file is JSON lines, rotated by size: ts, level, logger, msg, the
+  request's endpoint/method/path, and any `extra=` fields.
+- Info-level records that carry an `event` extra are sampled per event
+  (LOG_SAMPLE_RATES, fraction kept). Kept records note their sample_rate so
+  counts can be scaled back up. Warnings and errors are never sampled.
+- The queue is bounded. When it is full, records are dropped and counted
+  rather than blocking the request, and a warning reports the count once
+  there is room again.
+
+Set LOG_ASYNC = False to attach the same handlers directly (synchronous
+writes, e.g. when debugging the logging itself).
+"""
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Callable, Dict, List, Optional
+
+# Attributes every LogRecord has; anything else came from `extra=`
+RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+CONSOLE_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: fixed keys first, then the extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SizeRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler that rotates once the file has reached maxBytes.
+
+    The stock check formats every record a second time to measure it; this
+    one only looks at the file position, so a file can end one record past
+    the limit.
+    """
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.maxBytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        return self.stream.tell() >= self.maxBytes
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of the info-level records of each sampled event."""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = dict(rates)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(getattr(record, "event", None))
+        if rate is None or rate >= 1:
+            return True
+        if random.random() >= rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class ContextFilter(logging.Filter):
+    """Copy per-request fields onto records while still on the request thread."""
+
+    def __init__(self, context: Callable[[], Dict[str, Any]]):
+        super().__init__()
+        self.context = context
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in self.context().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class AsyncQueueHandler(QueueHandler):
+    """
+    QueueHandler that enqueues records unformatted and never blocks.
+
+    The queue is in-process, so records need not be made picklable; message
+    arguments are interpolated later, on the listener thread.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+            return
+        if self.dropped:
+            with self._dropped_lock:
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                warning = logging.LogRecord(__name__, logging.WARNING, __file__, 0,
+                                            "Dropped %d log records (log queue full)", (dropped,), None)
+                try:
+                    self.queue.put_nowait(warning)
+                except queue.Full:
+                    with self._dropped_lock:
+                        self.dropped += dropped
+
+
+class BoundedQueueListener(QueueListener):
+    """QueueListener whose stop() waits for room in a full bounded queue."""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+class DirectHandler(logging.Handler):
+    """Hand records straight to the outputs on the calling thread (LOG_ASYNC off)."""
+
+    def __init__(self, outputs: List[logging.Handler]):
+        super().__init__()
+        self.outputs = outputs
+
+    def emit(self, record: logging.LogRecord) -> None:
+        for handler in self.outputs:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+_listener: Optional[QueueListener] = None
+_handlers: List[logging.Handler] = []
+
+
+def configure_logging(config: Dict[str, Any],
+                      context: Optional[Callable[[], Dict[str, Any]]] = None) -> Optional[QueueListener]:
+    """
+    (Re)configure the root logger from LOG_* settings.
+
+    Args:
+        config: Mapping with LOG_LEVEL, LOG_FILE, LOG_MAX_BYTES, LOG_BACKUPS,
+                LOG_CONSOLE, LOG_SAMPLE_RATES, LOG_ASYNC and LOG_QUEUE_SIZE
+                (e.g. app.config)
+        context: Called on the request thread for fields to add to each record
+
+    Returns:
+        The started QueueListener, or None when LOG_ASYNC is off
+    """
+    global _listener, _handlers
+    shutdown()
+
+    file_handler = SizeRotatingFileHandler(str(config["LOG_FILE"]), maxBytes=config["LOG_MAX_BYTES"],
+                                           backupCount=config["LOG_BACKUPS"], encoding="utf-8", delay=True)
+    file_handler.setFormatter(JsonFormatter())
+    outputs: List[logging.Handler] = [file_handler]
+    if config["LOG_CONSOLE"]:
+        console_handler = logging.StreamHandler(sys.stderr)
+        console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        outputs.append(console_handler)
+
+    if config["LOG_ASYNC"]:
+        _listener = BoundedQueueListener(queue.Queue(config["LOG_QUEUE_SIZE"]), *outputs,
+                                         respect_handler_level=True)
+        _listener.start()
+        front = AsyncQueueHandler(_listener.queue)
+    else:
+        front = DirectHandler(outputs)
+    front.addFilter(SamplingFilter(config["LOG_SAMPLE_RATES"]))
+    if context is not None:
+        front.addFilter(ContextFilter(context))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(front)
+    root.setLevel(config["LOG_LEVEL"])
+    _handlers = outputs
+    return _listener
+
+
+def shutdown() -> None:
+    """Flush queued records and close the outputs (also runs at exit)."""
+    global _listener, _handlers
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    for handler in _handlers:
+        handler.close()
+    _handlers = []
+
+
+atexit.register(shutdown)
@@ -0,0 +1,237 @@
+"""
+ASGI entry point: app.py served from an event loop over bounded thread pools.
+
+Under a threaded WSGI server every open request holds a worker thread for
+its whole life, including the time spent waiting on the client. Bursty
+dashboard traffic exhausts the workers long before the CPU is busy. Here the
+event loop owns the connections, and only the blocking part of a request
+(SQLite and template rendering) runs on a thread:
+
+- Read routes (home, facility_detail, chart_monthly_fails, nearby, the
+  exports) run on ASYNC_READERS threads. Each request gets a read-only
+  connection from app.get_read_pool(), so at most ASYNC_READERS SQLite
+  readers run at once, however many clients are connected.
+- Everything else (writes, static files, /metrics) runs on ASYNC_WORKERS
+  threads over the normal pool, so a burst of reads never queues writes.
+- Once ASYNC_MAX_PENDING reads are queued or running, further reads get a
+  503 with Retry-After instead of piling up.
+
+Views are the same Flask views as under WSGI; streamed bodies (exports) are
+pulled one chunk at a time on the reader pool, so a slow download holds a
+thread only while a chunk is being produced.
+
+Run with any ASGI server, e.g.:
+    uvicorn asgi:application --workers 2
+"""
+
+import asyncio
+import contextvars
+import io
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from werkzeug.exceptions import HTTPException
+
+from app import READ_ONLY_ENVIRON_KEY, app, migrate_db, sqlite_path
+
+logger = logging.getLogger(__name__)
+
+READ_ENDPOINTS = frozenset({"home", "facility_detail", "chart_monthly_fails", "nearby",
+                            "export_csv", "export_ndjson"})
+READ_METHODS = frozenset({"GET", "HEAD"})
+
+
+def build_environ(scope: Dict[str, Any], body: bytes) -> Dict[str, Any]:
+    """PEP 3333 environ for an ASGI HTTP scope."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    root_path = scope.get("root_path", "")
+    path = scope["path"]
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": root_path.encode("utf-8").decode("latin-1"),
+        "PATH_INFO": path.encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1] or 80),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        # The body is already buffered, so its length is known even for
+        # chunked uploads.
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", ()):
+        name = raw_name.decode("latin-1").lower()
+        value = raw_value.decode("latin-1")
+        if name == "content-length":
+            continue
+        if name == "content-type":
+            key = "CONTENT_TYPE"
+        else:
+            key = "HTTP_" + name.upper().replace("-", "_")
+        if key in environ:
+            value = environ[key] + ("; " if key == "HTTP_COOKIE" else ",") + value
+        environ[key] = value
+    return environ
+
+
+async def read_body(receive: Callable) -> bytes:
+    """The whole request body (read routes have none; forms are small)."""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+class StartResponse:
+    """WSGI start_response that records the status line and headers for ASGI."""
+
+    def __init__(self):
+        self.status = 500
+        self.headers: List[Tuple[bytes, bytes]] = []
+        self.written: List[bytes] = []
+
+    def __call__(self, status: str, headers: List[Tuple[str, str]], exc_info=None):
+        self.status = int(status.split(" ", 1)[0])
+        self.headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+        return self.write
+
+    def write(self, data: bytes) -> None:
+        """PEP 3333's legacy write(): buffered, then sent ahead of the returned iterable."""
+        self.written.append(bytes(data))
+
+
+class AsgiAdapter:
+    """ASGI application wrapping a WSGI app with separate reader and worker pools."""
+
+    def __init__(self, wsgi_app, readers: int, workers: int, max_pending: int):
+        self.wsgi_app = wsgi_app
+        self.readers = ThreadPoolExecutor(readers, thread_name_prefix="asgi-reader")
+        self.workers = ThreadPoolExecutor(workers, thread_name_prefix="asgi-worker")
+        self.max_pending = max_pending
+        self.pending = 0  # reads queued or running; only touched on the event loop
+        self.rejected = 0
+
+    def is_read(self, environ: Dict[str, Any]) -> bool:
+        """True for GETs of the read routes."""
+        if environ["REQUEST_METHOD"] not in READ_METHODS:
+            return False
+        try:
+            endpoint, _ = self.wsgi_app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return False
+        return endpoint in READ_ENDPOINTS
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+        environ = build_environ(scope, await read_body(receive))
+        if not self.is_read(environ):
+            await self.respond(environ, self.workers, send)
+            return
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            await send({"type": "http.response.start", "status": 503,
+                        "headers": [(b"content-type", b"text/plain"), (b"retry-after", b"1")]})
+            await send({"type": "http.response.body", "body": b"Server busy, retry shortly\n"})
+            return
+        environ[READ_ONLY_ENVIRON_KEY] = True
+        self.pending += 1
+        try:
+            await self.respond(environ, self.readers, send)
+        finally:
+            self.pending -= 1
+
+    async def respond(self, environ: Dict[str, Any], executor: ThreadPoolExecutor,
+                      send: Callable) -> None:
+        """Run the WSGI app on `executor` and relay its response."""
+        loop = asyncio.get_running_loop()
+        # Every step of one request runs in the same context, so Flask's
+        # context-local state survives the hops between threads.
+        context = contextvars.copy_context()
+        start_response = StartResponse()
+
+        def start() -> Tuple[Any, Any, List[bytes], bool]:
+            # Pull up to two chunks so one-chunk bodies need no second hop.
+            body = self.wsgi_app(environ, start_response)
+            iterator = iter(body)
+            chunks, start_response.written = start_response.written, []
+            for pulled, chunk in enumerate(iterator, 1):
+                chunks.append(chunk)
+                if pulled == 2:
+                    return body, iterator, chunks, False
+            close(body)
+            return body, iterator, chunks, True
+
+        body, iterator, chunks, done = await loop.run_in_executor(executor, context.run, start)
+        try:
+            await send({"type": "http.response.start", "status": start_response.status,
+                        "headers": start_response.headers})
+            for chunk in chunks:
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            while not done:
+                chunk = await loop.run_in_executor(executor, context.run, next, iterator, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            if not done:
+                await loop.run_in_executor(executor, context.run, close, body)
+
+    async def lifespan(self, receive: Callable, send: Callable) -> None:
+        """Apply pending migrations at startup; stop the thread pools at shutdown."""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    path = sqlite_path()
+                    if self.wsgi_app.config["MIGRATE_ON_STARTUP"] and os.path.exists(path):
+                        await asyncio.get_running_loop().run_in_executor(self.workers, migrate_db)
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def shutdown(self) -> None:
+        self.readers.shutdown(wait=True)
+        self.workers.shutdown(wait=True)
+
+
+def close(body: Any) -> None:
+    """Call the WSGI iterable's close(), if any (releases stream resources)."""
+    closer: Optional[Callable] = getattr(body, "close", None)
+    if closer is not None:
+        closer()
+
+
+application = AsgiAdapter(app, app.config["ASYNC_READERS"], app.config["ASYNC_WORKERS"],
+                          app.config["ASYNC_MAX_PENDING"])
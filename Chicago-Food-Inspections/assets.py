@@ -0,0 +1,162 @@
+"""
+Static asset build: fingerprinted, pre-compressed copies of static/.
+
+Every file under static/ is copied to static/dist/ under a name containing a
+hash of its content (style.css -> style.3f2a9c1d4e5b.css), next to .gz and,
+when the brotli package is installed, .br versions compressed at maximum
+level. manifest.json maps the original names to the hashed ones. Templates
+link through app.asset_url(), which uses the manifest, so a changed file
+gets a new URL and the old one can be cached forever. /assets/ serves the
+build with `Cache-Control: immutable` and picks the pre-compressed copy the
+client accepts, so static files are never compressed per request.
+
+Third-party files are pinned below and vendored under static/vendor/, so
+pages need no CDN round trip; --vendor downloads them (again, e.g. after
+changing a pin). Chart.js is committed. Pico CSS is not yet, so it stays
+linked from its pinned CDN URL (CDN_LINKED) until `--vendor` fetches it;
+other missing files are linked from the CDN only with ASSET_CDN_FALLBACK.
+
+Run after changing anything under static/ (and on deploy):
+    python assets.py --vendor   # download vendored files, then build
+    python assets.py            # build static/dist/
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+from typing import Dict
+
+from compression import SUFFIXES, available_encodings, compress
+from config import BASE_DIR, Config
+
+logger = logging.getLogger(__name__)
+
+# static/ path -> pinned upstream URL
+VENDOR = {
+    "vendor/chart.umd.js": "https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.js",
+    "vendor/pico.min.css": "https://cdn.jsdelivr.net/npm/@picocss/pico@2.0.6/css/pico.min.css",
+}
+
+# Vendored files not committed yet; asset_url() links them from VENDOR until present
+CDN_LINKED = {"vendor/pico.min.css"}
+
+MANIFEST_NAME = "manifest.json"
+COMPRESSIBLE = {".css", ".js", ".json", ".svg", ".txt", ".map", ".html"}
+MIN_COMPRESS_BYTES = 256
+
+
+def hashed_name(name: str, data: bytes) -> str:
+    """style.css -> style.<12 hex digits of content hash>.css"""
+    base, ext = os.path.splitext(name)
+    return f"{base}.{hashlib.blake2b(data, digest_size=6).hexdigest()}{ext}"
+
+
+def source_files(static_dir: str, build_dir: str):
+    """Relative (POSIX) paths of every file under static_dir, outside build_dir."""
+    build_dir = os.path.abspath(build_dir)
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.abspath(os.path.join(root, d)) != build_dir)
+        for filename in sorted(files):
+            if filename.startswith("."):
+                continue
+            path = os.path.join(root, filename)
+            yield os.path.relpath(path, static_dir).replace(os.sep, "/")
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """Write via a temp file, so a running server never serves a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def load_manifest(build_dir: str) -> Dict[str, str]:
+    """original name -> hashed name ({} if nothing was built yet)."""
+    try:
+        with open(os.path.join(build_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def build(static_dir: str, build_dir: str) -> Dict[str, str]:
+    """
+    Fingerprint and pre-compress every static file into build_dir.
+
+    Files from the previous build are kept, so pages rendered before a
+    deploy can still load theirs; anything older is removed.
+
+    Returns:
+        The new manifest (original name -> hashed name)
+    """
+    previous = load_manifest(build_dir)
+    manifest = {}
+    for name in source_files(static_dir, build_dir):
+        with open(os.path.join(static_dir, name), "rb") as f:
+            data = f.read()
+        hashed = hashed_name(name, data)
+        manifest[name] = hashed
+        target = os.path.join(build_dir, hashed)
+        if not os.path.exists(target):
+            write_atomic(target, data)
+        if os.path.splitext(name)[1] not in COMPRESSIBLE or len(data) < MIN_COMPRESS_BYTES:
+            continue
+        for encoding in available_encodings():
+            compressed_path = target + SUFFIXES[encoding]
+            if os.path.exists(compressed_path):
+                continue
+            compressed = compress(data, encoding, level=9, brotli_quality=11)
+            if len(compressed) < len(data):
+                write_atomic(compressed_path, compressed)
+        logger.info("%s -> %s", name, hashed)
+
+    keep = set(manifest.values()) | set(previous.values())
+    keep |= {name + suffix for name in list(keep) for suffix in SUFFIXES.values()}
+    for name in source_files(build_dir, os.path.join(build_dir, "\0")):
+        if name != MANIFEST_NAME and name not in keep:
+            os.remove(os.path.join(build_dir, name))
+    write_atomic(os.path.join(build_dir, MANIFEST_NAME),
+                 json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+    return manifest
+
+
+def vendor(static_dir: str, timeout: float = 30) -> None:
+    """Download the pinned third-party files in VENDOR into static_dir."""
+    import requests
+
+    for name, url in VENDOR.items():
+        response = requests.get(url, timeout=timeout)
+        response.raise_for_status()
+        write_atomic(os.path.join(static_dir, name), response.content)
+        logger.info("Vendored %s -> static/%s (%d bytes)", url, name, len(response.content))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fingerprint and pre-compress static files")
+    parser.add_argument("--static", default=str(BASE_DIR / "static"), help="source directory")
+    parser.add_argument("--out", default=str(Config.ASSET_DIR), help="build directory")
+    parser.add_argument("--vendor", action="store_true",
+                        help="download the pinned third-party files first")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.vendor:
+        try:
+            vendor(args.static)
+        except Exception as e:
+            sys.exit(f"Vendoring failed: {e}")
+    manifest = build(args.static, args.out)
+    missing = [name for name in VENDOR if name not in manifest]
+    if missing:
+        print(f"Not vendored (served from the CDN): {', '.join(missing)}; run with --vendor")
+    print(f"Built {len(manifest)} file(s) into {args.out} "
+          f"(encodings: {', '.join(available_encodings())})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Database selection from DATABASE_URL, and the connection pools built on it.
+
+    sqlite:///app.db                    relative path (the default is DATABASE_PATH)
+    sqlite:////var/data/app.db          absolute path
+
+The app runs on SQLite only: its schema (FTS5 search, the R*Tree, the
+trigger-maintained counters and rollups, schema.sql and migrations/) and its
+error paths, which catch sqlite3 exceptions, are SQLite-specific. Any other
+URL is refused with a ValueError, which app.py raises at startup rather than
+on every request.
+
+Check a URL from the command line:
+    python backends.py sqlite:///app.db
+"""
+
+import argparse
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from db import ConnectionPool
+
+SQLITE = "sqlite"
+
+
+def database_url(config) -> str:
+    """DATABASE_URL if set, else the SQLite file at DATABASE_PATH."""
+    return config.get("DATABASE_URL") or f"sqlite:///{config['DATABASE_PATH']}"
+
+
+def parse_database_url(url: str) -> str:
+    """
+    The SQLite file a database URL names.
+
+    Raises:
+        ValueError: for a URL without a path or with any other scheme
+    """
+    scheme = urlsplit(url).scheme.lower()
+    if scheme != SQLITE:
+        raise ValueError(f"DATABASE_URL uses {scheme or url!r}, but the app runs on SQLite only "
+                         f"(FTS5 search, R*Tree and trigger-maintained counters); "
+                         f"use sqlite:///path or unset DATABASE_URL")
+    path = url[len("sqlite:///"):] if url.lower().startswith("sqlite:///") else ""
+    if not path:
+        raise ValueError(f"SQLite URL needs a path, e.g. sqlite:///app.db: {url!r}")
+    return path
+
+
+def app_database_path(config) -> str:
+    """
+    The SQLite file app.py runs on.
+
+    Raises:
+        ValueError: DATABASE_URL is not a sqlite:/// URL
+    """
+    return parse_database_url(database_url(config))
+
+
+def create_pool(url: str, pragmas: Optional[Dict[str, object]] = None, size: int = 8,
+                read_only: bool = False) -> "SQLitePool":
+    """Connection pool for a database URL; read_only pools set query_only."""
+    pragmas = dict(pragmas or {})
+    if read_only:
+        pragmas["query_only"] = "ON"
+    return SQLitePool(url, parse_database_url(url), pragmas, size)
+
+
+def connect(url: str, pragmas: Optional[Dict[str, object]] = None):
+    """One unpooled connection (the caller closes it)."""
+    return create_pool(url, pragmas, size=0).open()
+
+
+class SQLitePool(ConnectionPool):
+    """db.ConnectionPool that remembers the URL it was built from."""
+
+    backend = SQLITE
+
+    def __init__(self, url: str, path: str, pragmas: Optional[Dict[str, object]], size: int):
+        super().__init__(path, pragmas, size)
+        self.url = url
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check a DATABASE_URL")
+    parser.add_argument("url")
+    args = parser.parse_args(argv)
+    print(f"backend: {SQLITE} ({parse_database_url(args.url)})")
+    conn = connect(args.url)
+    try:
+        version, journal = conn.execute("SELECT sqlite_version(), * FROM pragma_journal_mode").fetchone()
+        tables = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'").fetchone()[0]
+        print(f"SQLite {version}, journal_mode={journal}, {tables} tables")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
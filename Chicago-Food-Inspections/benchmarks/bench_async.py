@@ -0,0 +1,178 @@
+"""
+Benchmark: ASGI mode (asgi.py) vs a threaded WSGI deployment under load.
+
+Both modes run in-process against the same database and route mix, so
+the numbers compare the concurrency models themselves, not HTTP stacks:
+
+- wsgi: a pool of --workers threads, as in `gunicorn --threads N`. Each
+  request holds its thread for the app work *and* --client-ms, which
+  stands for the time a sync worker is tied up with the client (slow
+  links, keep-alive, a dashboard firing requests in bursts).
+- asgi: asgi.application with --workers reader threads. The client time is
+  an `await` on the event loop, so it holds no thread.
+
+For every --concurrency level, N clients send requests back to back. The
+benchmark reports throughput and p50/p99 latency, queueing included. With
+--client-ms 0 the two modes should roughly tie, because the app is then
+CPU-bound and both use the same number of threads.
+
+Usage:
+    python benchmarks/bench_async.py --db /tmp/1m.db --concurrency 8,64,256
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from werkzeug.test import EnvironBuilder
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import app as app_module  # noqa: E402
+from app import app  # noqa: E402
+from bench_routes import build_routes, percentile  # noqa: E402
+from generate_data import generate  # noqa: E402
+
+
+def request_paths(db_path, seed):
+    """One flat list of read-route paths, cycled by every client."""
+    routes = build_routes(db_path, 50, seed)
+    names = ("home", "home_filtered", "home_deep_page", "facility_detail", "chart_default")
+    return [path for name in names for path in routes[name]]
+
+
+def run_wsgi(paths, workers, clients, per_client, client_delay):
+    """Closed-loop clients against a fixed pool of sync worker threads."""
+    latencies, errors = [], []
+    pool = ThreadPoolExecutor(workers)
+
+    def handle(path):
+        status = []
+        body = app(EnvironBuilder(path=path).get_environ(),
+                   lambda s, h, exc_info=None: status.append(int(s[:3])))
+        for _ in body:
+            pass
+        getattr(body, "close", lambda: None)()
+        time.sleep(client_delay)  # the worker is busy with the client meanwhile
+        return status[0]
+
+    def client(idx):
+        for n in range(per_client):
+            t = time.perf_counter()
+            status = pool.submit(handle, paths[(idx * 7 + n) % len(paths)]).result()
+            latencies.append(time.perf_counter() - t)
+            if status >= 400:
+                errors.append(status)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    pool.shutdown()
+    return latencies, errors, elapsed
+
+
+def run_asgi(paths, readers, clients, per_client, client_delay, max_pending):
+    """Closed-loop clients as coroutines against asgi.application."""
+    import asgi
+    application = asgi.AsgiAdapter(app, readers, 2, max_pending)
+    latencies, errors = [], []
+
+    async def request(path):
+        url = urlsplit(path)
+        scope = {"type": "http", "method": "GET", "path": url.path,
+                 "query_string": url.query.encode(), "headers": [],
+                 "server": ("bench", 80), "client": ("127.0.0.1", 0)}
+        status = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+            elif not message.get("more_body"):
+                await asyncio.sleep(client_delay)  # waiting on the client holds no thread
+
+        await application(scope, receive, send)
+        return status[0]
+
+    async def client(idx):
+        for n in range(per_client):
+            t = time.perf_counter()
+            status = await request(paths[(idx * 7 + n) % len(paths)])
+            latencies.append(time.perf_counter() - t)
+            if status >= 400:
+                errors.append(status)
+
+    async def main():
+        await asyncio.gather(*(client(i) for i in range(clients)))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    elapsed = time.perf_counter() - start
+    application.shutdown()
+    return latencies, errors, elapsed
+
+
+def report(mode, clients, latencies, errors, elapsed):
+    ms = sorted(x * 1000 for x in latencies)
+    print(f"{mode:<6}{clients:>8}{len(ms) / elapsed:>10.1f}{statistics.median(ms):>10.1f}"
+          f"{percentile(ms, 99):>10.1f}{len(errors):>8}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", help="existing database (default: generate one)")
+    parser.add_argument("--inspections", type=int, default=50000, help="rows to generate without --db")
+    parser.add_argument("--concurrency", default="8,64,256", help="comma-separated client counts")
+    parser.add_argument("--workers", type=int, default=8, help="WSGI threads / ASGI reader threads")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per concurrency level")
+    parser.add_argument("--client-ms", type=float, default=20.0, help="client time per request")
+    parser.add_argument("--max-pending", type=int, default=10000, help="ASGI 503 threshold")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with_tmp = None
+    db_path = args.db
+    if not db_path:
+        import tempfile
+        with_tmp = tempfile.TemporaryDirectory()
+        db_path = os.path.join(with_tmp.name, "bench.db")
+        print(f"Generating {args.inspections:,} inspections...")
+        generate(db_path, args.inspections, max(1, args.inspections // 6), seed=42)
+
+    app.config["DATABASE_PATH"] = db_path
+    app.config["RESULT_CACHE_SIZE"] = 0  # measure the queries, not cache hits
+    app.config["SQLITE_POOL_SIZE"] = app.config["ASYNC_READERS"] = args.workers
+    app_module._pool = app_module._read_pool = None
+    app_module.logger.setLevel(logging.WARNING)
+    paths = request_paths(db_path, args.seed)
+    delay = args.client_ms / 1000
+
+    print(f"\n{args.workers} threads per mode, {args.client_ms:g} ms client time per request")
+    print(f"{'mode':<6}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    try:
+        for clients in (int(c) for c in args.concurrency.split(",")):
+            per_client = max(1, args.requests // clients)
+            report("wsgi", clients, *run_wsgi(paths, args.workers, clients, per_client, delay))
+            report("asgi", clients, *run_asgi(paths, args.workers, clients, per_client, delay,
+                                              args.max_pending))
+    finally:
+        if with_tmp:
+            with_tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
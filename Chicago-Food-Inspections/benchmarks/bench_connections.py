@@ -0,0 +1,114 @@
+"""
+Benchmark: requests/second with pooled, tuned connections vs. the old
+open-a-connection-per-request setup.
+
+Serves app.py from a threaded WSGI server over a synthetic database and
+hammers a mix of read routes from several client threads with keep-alive
+HTTP connections. The "legacy" run disables the pool and the PRAGMA tuning
+(rollback journal, default cache, no mmap), which is what get_db() used to do.
+
+Usage:
+    python benchmarks/bench_connections.py --clients 8 --seconds 10
+"""
+
+import argparse
+import http.client
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import app as app_module  # noqa: E402
+from app import app  # noqa: E402
+from bench_search import populate  # noqa: E402
+from migrate import stamp  # noqa: E402
+
+LEGACY = {
+    "SQLITE_POOL_SIZE": 0,
+    "SQLITE_JOURNAL_MODE": "DELETE",
+    "SQLITE_SYNCHRONOUS": "FULL",
+    "SQLITE_BUSY_TIMEOUT": None,
+    "SQLITE_CACHE_SIZE": None,
+    "SQLITE_MMAP_SIZE": 0,
+}
+
+
+def client(port, paths, deadline, counts, idx):
+    """Issue GETs over one keep-alive connection until the deadline."""
+    rng = random.Random(idx)
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    done = 0
+    while time.perf_counter() < deadline:
+        conn.request("GET", rng.choice(paths))
+        resp = conn.getresponse()
+        resp.read()
+        done += 1
+    conn.close()
+    counts[idx] = done
+
+
+def run(port, paths, clients, seconds):
+    """Return requests/second for one configuration."""
+    counts = [0] * clients
+    deadline = time.perf_counter() + seconds
+    threads = [threading.Thread(target=client, args=(port, paths, deadline, counts, n))
+               for n in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(counts) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--facilities", type=int, default=20000)
+    parser.add_argument("--inspections", type=int, default=100000)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        conn = sqlite3.connect(db_path)
+        with open(app.config["SCHEMA_PATH"], "r", encoding="utf-8") as f:
+            conn.executescript(f.read())
+        stamp(conn, str(app.config["MIGRATIONS_DIR"]))
+        populate(conn, args.facilities, args.inspections)
+        conn.close()
+
+        rng = random.Random(7)
+        paths = ["/", "/?result=Fail", "/chart/monthly-fails.json"]
+        paths += [f"/facility/LIC-{rng.randrange(args.facilities):07d}" for _ in range(20)]
+
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        tuned = {key: app.config[key] for key in LEGACY}
+        app.config["DATABASE_PATH"] = db_path
+        results = {}
+        for label, settings in (("legacy", LEGACY), ("pooled", tuned)):
+            app.config.update(settings)
+            app_module._pool = None  # rebuild the pool with these settings
+            server = make_server("127.0.0.1", 0, app, threaded=True)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            run(server.server_port, paths, args.clients, 1)  # warm up
+            results[label] = run(server.server_port, paths, args.clients, args.seconds)
+            server.shutdown()
+
+        print(f"\n{'mode':<10}{'req/s':>10}")
+        for label, rps in results.items():
+            print(f"{label:<10}{rps:>10.1f}")
+        print(f"speedup: {results['pooled'] / results['legacy']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
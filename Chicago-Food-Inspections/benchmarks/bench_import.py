@@ -0,0 +1,172 @@
+"""
+Benchmark: import_chicago_data.import_data() throughput.
+
+Writes a synthetic CSV with the Chicago Data Portal's column layout, then
+imports it into fresh databases with bulk mode off and on, and with the
+parse/clean stage in-process and in a worker pool, and reports rows/sec for
+each. The parallel run is checked to produce the same rows as the serial one.
+
+With --via gzip the fixture is gzip-compressed first; with --via http it is
+also served from a local HTTP server, so the import streams it over the
+network with no temp file on the importing side.
+
+Usage:
+    python benchmarks/bench_import.py --rows 250000 --workers 4
+    python benchmarks/bench_import.py --rows 250000 --via http
+"""
+
+import argparse
+import csv
+import functools
+import gzip
+import http.server
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import import_chicago_data  # noqa: E402
+from config import Config  # noqa: E402
+from migrate import stamp  # noqa: E402
+
+SCHEMA_PATH = os.path.join(BASE_DIR, "schema.sql")
+
+PORTAL_COLUMNS = ["Inspection ID", "DBA Name", "AKA Name", "License #", "Facility Type",
+                  "Risk", "Address", "City", "State", "Zip", "Inspection Date",
+                  "Inspection Type", "Results", "Violations", "Latitude", "Longitude",
+                  "Location"]
+
+NAMES = ["SUNRISE DINER", "LOTUS EXPRESS", "GOLDEN DRAGON", "TACO PALACE", "PIZZA KITCHEN",
+         "SUBWAY", "STARBUCKS", "MCDONALD'S", "HAROLD'S CHICKEN", "NOODLE GARDEN"]
+STREETS = ["N CLARK ST", "S STATE ST", "W MADISON ST", "N HALSTED ST", "W DIVISION ST"]
+TYPES = ["Restaurant", "Grocery Store", "Bakery", "School", "Daycare (2 - 6 Years)"]
+RISKS = ["Risk 1 (High)", "Risk 2 (Medium)", "Risk 3 (Low)", "All", ""]
+RESULTS = ["Pass", "Fail", "Pass w/ Conditions", "Out of Business", "No Entry", "Not Ready"]
+TYPES_OF_INSPECTION = ["Canvass", "License", "Complaint", "Canvass Re-Inspection", "Short Form Complaint"]
+VIOLATIONS = [
+    "3. MANAGEMENT, FOOD EMPLOYEE AND CONDITIONAL EMPLOYEE; KNOWLEDGE - Comments: ...",
+    "21. PROPER HOT HOLDING TEMPERATURES - Comments: OBSERVED IMPROPER HOT HOLDING ...",
+    "38. INSECTS, RODENTS, & ANIMALS NOT PRESENT - Comments: OBSERVED MICE DROPPINGS ...",
+    "47. FOOD & NON-FOOD CONTACT SURFACES CLEANABLE - Comments: MUST REPAIR ...",
+    "55. PHYSICAL FACILITIES INSTALLED, MAINTAINED & CLEAN - Comments: CLEAN FLOORS ...",
+]
+
+
+def portal_row(n, rng, n_facilities):
+    """One synthetic CSV row in portal format."""
+    lic = rng.randrange(n_facilities)
+    frng = random.Random(lic)  # facility attributes stable per license
+    lat = 41.65 + frng.random() * 0.37
+    lon = -87.85 + frng.random() * 0.33
+    return {
+        "Inspection ID": 2_000_000 + n,
+        "DBA Name": f"{frng.choice(NAMES)} #{lic % 97}",
+        "AKA Name": "",
+        "License #": 1_000_000 + lic,
+        "Facility Type": frng.choice(TYPES),
+        "Risk": frng.choice(RISKS),
+        "Address": f"{frng.randint(1, 9999)} {frng.choice(STREETS)} ",
+        "City": "CHICAGO",
+        "State": "IL",
+        "Zip": f"606{frng.randint(1, 60):02d}",
+        "Inspection Date": f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{rng.randint(2010, 2025)}",
+        "Inspection Type": rng.choice(TYPES_OF_INSPECTION),
+        "Results": rng.choice(RESULTS),
+        "Violations": " | ".join(rng.sample(VIOLATIONS, rng.randint(0, 3))),
+        "Latitude": f"{lat:.6f}",
+        "Longitude": f"{lon:.6f}",
+        "Location": f"({lat:.6f}, {lon:.6f})",
+    }
+
+
+def write_portal_csv(path, rows, seed=42):
+    """Write `rows` synthetic inspections to `path` in portal CSV format."""
+    rng = random.Random(seed)
+    n_facilities = max(1, rows // 6)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=PORTAL_COLUMNS)
+        writer.writeheader()
+        for n in range(rows):
+            writer.writerow(portal_row(n, rng, n_facilities))
+
+
+def fresh_db(path):
+    """Create an empty database from schema.sql (seed rows removed), stamped like init_db."""
+    conn = sqlite3.connect(path)
+    with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+        conn.executescript(f.read())
+    conn.executescript("DELETE FROM facilities;")
+    stamp(conn, str(Config.MIGRATIONS_DIR))
+    conn.close()
+
+
+def table_dump(path):
+    """Facilities, inspections (minus timestamps) and violations for comparing runs."""
+    conn = sqlite3.connect(path)
+    dump = (
+        conn.execute("SELECT license_number, dba_name, facility_type, address, city, state, zip "
+                     "FROM facilities ORDER BY rowid").fetchall(),
+        conn.execute("SELECT inspection_id, license_number, inspection_date, inspection_type, "
+                     "risk, result, violations_text FROM inspections ORDER BY inspection_id").fetchall(),
+        conn.execute("SELECT inspection_id, code, description, critical FROM violations "
+                     "ORDER BY violation_id").fetchall(),
+    )
+    conn.close()
+    return dump
+
+
+def serve_directory(directory):
+    """Serve a directory over HTTP on a free local port; returns the server."""
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=directory)
+    handler.log_message = lambda *args: None
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=250000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--via", choices=["file", "gzip", "http"], default="file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "portal.csv")
+        write_portal_csv(source, args.rows)
+        server = None
+        if args.via in ("gzip", "http"):
+            with open(source, "rb") as src, gzip.open(source + ".gz", "wb") as dst:
+                dst.write(src.read())
+            os.remove(source)
+            source += ".gz"
+        if args.via == "http":
+            server = serve_directory(tmp)
+            source = f"http://127.0.0.1:{server.server_port}/portal.csv.gz"
+
+        runs = (("batched", False, 1), ("bulk", True, 1), (f"bulk x{args.workers}", True, args.workers))
+        results = {}
+        for label, bulk, workers in runs:
+            import_chicago_data.DB_PATH = os.path.join(tmp, f"{len(results)}.db")
+            fresh_db(import_chicago_data.DB_PATH)
+            start = time.perf_counter()
+            import_chicago_data.import_data(limit=None, bulk=bulk, source=source, workers=workers)
+            results[label] = (time.perf_counter() - start, import_chicago_data.DB_PATH)
+
+        print(f"\n{'mode':<12}{'seconds':>10}{'rows/sec':>12}")
+        for label, (seconds, _) in results.items():
+            print(f"{label:<12}{seconds:>10.1f}{args.rows / seconds:>12,.0f}")
+        dumps = [table_dump(path) for _, path in results.values()]
+        print("identical output:", all(d == dumps[0] for d in dumps))
+        if server:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
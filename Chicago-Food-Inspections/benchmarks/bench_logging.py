@@ -0,0 +1,126 @@
+"""
+Benchmark: per-request cost of logging, synchronous vs. queued (applog.py).
+
+Runs a route mix through the Flask test client: listing, facility pages,
+facility edits and a small export. Each round uses one of three pipelines:
+
+- off: LOG_LEVEL = WARNING, so info records are never created
+- sync: LOG_ASYNC = False, records are formatted and written on the request thread
+- async: LOG_ASYNC = True, the QueueHandler/QueueListener pipeline
+
+Rounds alternate between pipelines, so drift hits all of them equally.
+Every `request` event is kept (sample rate 1.0) unless --sampled is given.
+--stall-ms adds a sleep to every file write, to stand in for a slow or
+contended disk.
+
+Usage:
+    python benchmarks/bench_logging.py --inspections 50000 --rounds 15
+    python benchmarks/bench_logging.py --stall-ms 2
+"""
+
+import argparse
+import logging.handlers
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import app as app_module  # noqa: E402
+import applog  # noqa: E402
+from app import app  # noqa: E402
+from generate_data import generate  # noqa: E402
+
+PIPELINES = ("off", "sync", "async")
+EDIT_FORM = {"dba_name": "Bench Cafe", "facility_type": "Restaurant", "address": "1 W Madison St",
+             "city": "Chicago", "state": "IL", "zip": "60602", "phone": ""}
+
+
+def request_mix(client, n):
+    """One request of the mix; returns its latency in seconds."""
+    start = time.perf_counter()
+    kind = n % 5
+    if kind == 0:
+        response = client.get("/?result=Fail")
+    elif kind == 1:
+        response = client.get(f"/facility/{1000001 + n % 500}")
+    elif kind == 2:
+        response = client.post(f"/facility/{1000001 + n % 500}/edit", data=EDIT_FORM)
+    elif kind == 3:
+        response = client.get("/export.csv?q=pizza&fields=inspection_id,inspection_date")
+        response.get_data()
+    else:
+        response = client.get("/chart/monthly-fails.json")
+    response.close()
+    return time.perf_counter() - start
+
+
+def configure(pipeline, log_file, sample_rates):
+    """Switch the root logger to one of PIPELINES."""
+    config = dict(app.config)
+    config.update(LOG_FILE=log_file, LOG_CONSOLE=False, LOG_SAMPLE_RATES=sample_rates,
+                  LOG_ASYNC=pipeline == "async",
+                  LOG_LEVEL="WARNING" if pipeline == "off" else "INFO")
+    applog.configure_logging(config, app_module.log_context)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--inspections", type=int, default=50000)
+    parser.add_argument("--rounds", type=int, default=15)
+    parser.add_argument("--requests", type=int, default=100, help="requests per round")
+    parser.add_argument("--stall-ms", type=float, default=0.0, help="sleep added to every file write")
+    parser.add_argument("--sampled", action="store_true", help="use the configured LOG_SAMPLE_RATES")
+    args = parser.parse_args()
+
+    if args.stall_ms:
+        emit = logging.handlers.RotatingFileHandler.emit
+
+        def stalled_emit(self, record):
+            time.sleep(args.stall_ms / 1000)
+            emit(self, record)
+        logging.handlers.RotatingFileHandler.emit = stalled_emit
+
+    sample_rates = app.config["LOG_SAMPLE_RATES"] if args.sampled else {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        log_file = os.path.join(tmp, "app.log")
+        print(f"Generating {args.inspections:,} inspections...")
+        generate(db_path, args.inspections, max(1, args.inspections // 6), seed=42)
+
+        app.config["DATABASE_PATH"] = db_path
+        app.config["RESULT_CACHE_SIZE"] = 0
+        app.config["SESSION_COOKIE_SECURE"] = False
+        app_module._pool = None
+        client = app.test_client()
+
+        latencies = {name: [] for name in PIPELINES}
+        for name in PIPELINES:  # warm up every path
+            configure(name, log_file, sample_rates)
+            for n in range(args.requests):
+                request_mix(client, n)
+        for _ in range(args.rounds):
+            for name in PIPELINES:
+                configure(name, log_file, sample_rates)
+                latencies[name] += [request_mix(client, n) for n in range(args.requests)]
+        applog.shutdown()
+        lines = sum(1 for _ in open(log_file, encoding="utf-8")) if os.path.exists(log_file) else 0
+
+    print(f"\nstall: {args.stall_ms} ms per write, request events "
+          f"{'sampled' if args.sampled else 'all kept'}; {lines:,} lines in app.log")
+    print(f"{'pipeline':<10}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}")
+    for name in PIPELINES:
+        values = sorted(latencies[name])
+        p99 = values[max(0, int(len(values) * 0.99) - 1)]
+        print(f"{name:<10}{statistics.mean(values) * 1e6:>10.1f}"
+              f"{statistics.median(values) * 1e6:>10.1f}{p99 * 1e6:>10.1f}")
+    off = statistics.mean(latencies["off"])
+    for name in ("sync", "async"):
+        print(f"{name} overhead: {(statistics.mean(latencies[name]) - off) * 1e6:+.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
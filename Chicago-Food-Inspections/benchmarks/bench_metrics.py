@@ -0,0 +1,94 @@
+"""
+Benchmark: overhead of the /metrics instrumentation.
+
+Runs the same route mix through the Flask test client with METRICS_ENABLED
+off and on, alternating short rounds so drift (CPU frequency, page cache)
+hits both equally, and reports the per-request difference. It also times the
+two pieces in isolation: Metrics.observe_request() and one query through
+InstrumentedConnection vs. the raw connection.
+
+Usage:
+    python benchmarks/bench_metrics.py --inspections 50000 --rounds 20
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import app as app_module  # noqa: E402
+from app import app  # noqa: E402
+from db import InstrumentedConnection  # noqa: E402
+from generate_data import generate  # noqa: E402
+from metrics import Metrics  # noqa: E402
+
+PATHS = ["/", "/?result=Fail", "/?q=pizza", "/facility/1000001", "/facility/1000042",
+         "/chart/monthly-fails.json", "/violations/top.json"]
+
+
+def run_round(client, requests):
+    """Seconds per request for one pass over the route mix."""
+    start = time.perf_counter()
+    for n in range(requests):
+        client.get(PATHS[n % len(PATHS)])
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--inspections", type=int, default=50000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=70, help="requests per round")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        print(f"Generating {args.inspections:,} inspections...")
+        generate(db_path, args.inspections, max(1, args.inspections // 6), seed=42)
+
+        app.config["DATABASE_PATH"] = db_path
+        app.config["RESULT_CACHE_SIZE"] = 0  # measure the instrumented queries, not cache hits
+        app_module._pool = None
+        app_module.logger.setLevel(logging.WARNING)
+        client = app.test_client()
+
+        timings = {False: [], True: []}
+        for enabled in (False, True):  # warm up both paths
+            app.config["METRICS_ENABLED"] = enabled
+            run_round(client, args.requests)
+        for _ in range(args.rounds):
+            for enabled in (False, True):
+                app.config["METRICS_ENABLED"] = enabled
+                timings[enabled].append(run_round(client, args.requests))
+
+        off = statistics.median(timings[False]) * 1e6
+        on = statistics.median(timings[True]) * 1e6
+        print(f"\n{'metrics':<10}{'us/request':>12}")
+        print(f"{'off':<10}{off:>12.1f}")
+        print(f"{'on':<10}{on:>12.1f}")
+        print(f"overhead: {on - off:+.1f} us/request ({(on - off) / off * 100:+.2f}%)")
+
+        registry = Metrics()
+        observe = timeit.timeit(
+            lambda: registry.observe_request("home", "GET", 200, 0.004, 3, 0.002), number=100000) * 10
+        raw = sqlite3.connect(db_path)
+        wrapped = InstrumentedConnection(raw)
+        sql = "SELECT * FROM facilities WHERE license_number = ?"
+        raw_q = timeit.timeit(lambda: raw.execute(sql, ("1000001",)).fetchone(), number=50000) * 20
+        wrapped_q = timeit.timeit(lambda: wrapped.execute(sql, ("1000001",)).fetchone(), number=50000) * 20
+        raw.close()
+        print(f"\nobserve_request(): {observe:.2f} us")
+        print(f"PK lookup raw: {raw_q:.2f} us, instrumented: {wrapped_q:.2f} us "
+              f"({wrapped_q - raw_q:+.2f} us per query)")
+
+
+if __name__ == "__main__":
+    main()
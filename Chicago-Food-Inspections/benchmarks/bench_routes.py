@@ -0,0 +1,249 @@
+"""
+Benchmark: per-route latency and throughput for the read routes.
+
+Drives home(), facility_detail(), chart_monthly_fails(), nearby() and
+friends against an existing database (fill one with generate_data.py), first
+in-process through the Flask test client and then over HTTP through a
+threaded WSGI server with concurrent keep-alive clients. For each route it reports
+p50/p95/p99 latency and requests/second, and --output saves everything as
+JSON; --compare prints the change against an earlier run of the same
+benchmark, so regressions show up between commits.
+
+The result cache is disabled unless --cache is given, so the numbers measure
+the queries rather than cache hits.
+
+Usage:
+    python benchmarks/generate_data.py --inspections 1000000 --db /tmp/1m.db
+    python benchmarks/bench_routes.py --db /tmp/1m.db --output before.json
+    python benchmarks/bench_routes.py --db /tmp/1m.db --compare before.json
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from werkzeug.serving import make_server
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import app as app_module  # noqa: E402
+from app import app  # noqa: E402
+
+PERCENTILES = (50, 95, 99)
+
+
+def build_routes(db_path, n_facilities, seed):
+    """Route name -> list of request paths to cycle through."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    max_rowid = conn.execute("SELECT MAX(rowid) FROM facilities").fetchone()[0] or 0
+    picks = [rng.randint(1, max_rowid) for _ in range(n_facilities * 2)]
+    licenses = [r[0] for r in conn.execute(
+        f"SELECT license_number FROM facilities WHERE rowid IN ({','.join('?' * len(picks))})",
+        picks)][:n_facilities]
+    last = conn.execute("SELECT MAX(inspection_date) FROM inspections").fetchone()[0] or "2025-01-01"
+    conn.close()
+    year = int(last[:4])
+    return {
+        "home": ["/"],
+        "home_filtered": ["/?result=Fail", "/?risk=High", "/?result=Pass&risk=Low"],
+        "home_search": ["/?q=pizza", "/?q=golden+dragon", "/?q=subway&result=Fail", "/?q=tav"],
+        "home_deep_page": ["/?page=50", "/?result=Fail&page=20"],
+        "home_facilities": ["/?view=facilities", "/?view=facilities&result=Fail", "/?view=facilities&page=20"],
+        "home_large_page": ["/?per_page=2000", "/?per_page=1000&result=Fail", "/?per_page=500&view=facilities"],
+        "facility_detail": [f"/facility/{lic}" for lic in licenses] or ["/facility/LIC-1001"],
+        "chart_default": ["/chart/monthly-fails.json"],
+        "chart_range": [f"/chart/monthly-fails.json?from={year - 5}-01&to={year}-12",
+                        f"/chart/monthly-fails.json?from={year}-01-01&to={year}-12-31&granularity=day",
+                        f"/chart/monthly-fails.json?from={year - 2}-01&to={year}-12&group_by=zip"],
+        "top_violations": [f"/violations/top.json?from={year - 1}-01-01&to={year}-12-31",
+                           f"/violations/top.json?from={year - 1}-01-01&to={year}-12-31&zip=60614"],
+        # The Loop (densest), Lincoln Park, and the far South Side
+        "nearby": ["/nearby?lat=41.8819&lon=-87.6278", "/nearby?lat=41.9214&lon=-87.6513&radius=500",
+                   "/nearby?lat=41.7200&lon=-87.5800&radius=5000&limit=200"],
+    }
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-p * len(sorted_values) // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(latencies, errors, elapsed):
+    """Latency percentiles (ms) and throughput for one route."""
+    ms = sorted(x * 1000 for x in latencies)
+    summary = {"requests": len(ms), "errors": errors,
+               "rps": round(len(ms) / elapsed, 1) if elapsed else 0.0,
+               "mean_ms": round(sum(ms) / len(ms), 2) if ms else 0.0}
+    for p in PERCENTILES:
+        summary[f"p{p}_ms"] = round(percentile(ms, p), 2)
+    return summary
+
+
+def run_test_client(routes, requests_per_route, warmup):
+    """Sequential in-process requests: pure app + database cost."""
+    client = app.test_client()
+    results = {}
+    for name, paths in routes.items():
+        for n in range(warmup):
+            client.get(paths[n % len(paths)])
+        latencies, errors = [], 0
+        start = time.perf_counter()
+        for n in range(requests_per_route):
+            t = time.perf_counter()
+            response = client.get(paths[n % len(paths)])
+            response.get_data()  # streamed pages render while the body is read
+            latencies.append(time.perf_counter() - t)
+            errors += response.status_code >= 400
+            response.close()
+        results[name] = summarize(latencies, errors, time.perf_counter() - start)
+        print_row("testclient", name, results[name])
+    return results
+
+
+def http_client(port, paths, count, latencies, errors, idx):
+    """Issue `count` GETs over one keep-alive connection."""
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    for n in range(count):
+        t = time.perf_counter()
+        conn.request("GET", paths[(idx + n) % len(paths)])
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - t)
+        if response.status >= 400:
+            errors.append(response.status)
+    conn.close()
+
+
+def run_wsgi(routes, requests_per_route, clients, warmup):
+    """Concurrent clients against a threaded WSGI server: adds HTTP and contention."""
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+    results = {}
+    try:
+        for name, paths in routes.items():
+            http_client(port, paths, warmup, [], [], 0)
+            latencies, errors = [], []
+            per_client = max(1, requests_per_route // clients)
+            threads = [threading.Thread(target=http_client,
+                                        args=(port, paths, per_client, latencies, errors, n))
+                       for n in range(clients)]
+            start = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            results[name] = summarize(latencies, len(errors), time.perf_counter() - start)
+            print_row(f"wsgi x{clients}", name, results[name])
+    finally:
+        server.shutdown()
+    return results
+
+
+def print_row(mode, name, s):
+    print(f"{mode:<12}{name:<18}{s['p50_ms']:>9.2f}{s['p95_ms']:>9.2f}{s['p99_ms']:>9.2f}"
+          f"{s['rps']:>10.1f}{s['errors']:>7}", flush=True)
+
+
+def metadata(db_path, args):
+    """What the numbers were measured against."""
+    conn = sqlite3.connect(db_path)
+    counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+              for table in ("facilities", "inspections", "violations")}
+    conn.close()
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "cpus": os.cpu_count(),
+        "database": os.path.abspath(db_path),
+        "rows": counts,
+        "args": vars(args),
+    }
+
+
+def compare(current, baseline_path):
+    """Print p50/p95/rps changes against a saved run."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline_path} (commit {baseline['meta'].get('commit')}); negative latency = faster")
+    print(f"{'mode':<12}{'route':<18}{'p50':>9}{'p95':>9}{'rps':>9}")
+    for mode, routes in current["results"].items():
+        for name, s in routes.items():
+            old = baseline["results"].get(mode, {}).get(name)
+            if not old:
+                continue
+            change = [(s[k] - old[k]) / old[k] * 100 if old[k] else 0.0
+                      for k in ("p50_ms", "p95_ms", "rps")]
+            print(f"{mode:<12}{name:<18}{change[0]:>+8.1f}%{change[1]:>+8.1f}%{change[2]:>+8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default=str(app.config["DATABASE_PATH"]))
+    parser.add_argument("--mode", choices=["testclient", "wsgi", "both"], default="both")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route per mode")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent clients in wsgi mode")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--routes", default="", help="comma-separated subset of route names")
+    parser.add_argument("--facilities", type=int, default=100, help="distinct facility pages to hit")
+    parser.add_argument("--cache", action="store_true", help="keep the result cache enabled")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="JSON from an earlier run to diff against")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        sys.exit(f"{args.db} not found; create one with benchmarks/generate_data.py")
+    app.config["DATABASE_PATH"] = args.db
+    if not args.cache:
+        app.config["RESULT_CACHE_SIZE"] = 0
+    app_module._pool = None
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    app_module.logger.setLevel(logging.WARNING)
+
+    routes = build_routes(args.db, args.facilities, args.seed)
+    if args.routes:
+        wanted = set(args.routes.split(","))
+        routes = {name: paths for name, paths in routes.items() if name in wanted}
+
+    report = {"meta": metadata(args.db, args), "results": {}}
+    print(f"{report['meta']['rows']['inspections']:,} inspections, commit {report['meta']['commit']}\n")
+    print(f"{'mode':<12}{'route':<18}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>10}{'errors':>7}")
+    if args.mode in ("testclient", "both"):
+        report["results"]["testclient"] = run_test_client(routes, args.requests, args.warmup)
+    if args.mode in ("wsgi", "both"):
+        report["results"][f"wsgi_x{args.clients}"] = run_wsgi(routes, args.requests, args.clients,
+                                                                args.warmup)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
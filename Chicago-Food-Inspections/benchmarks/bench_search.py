@@ -0,0 +1,137 @@
+"""
+Benchmark: LIKE substring search vs. FTS5 search for the home() search box.
+
+Builds a throwaway database from schema.sql, fills it with synthetic
+facilities and inspections, then times the page + count query pair that
+home() runs for a set of search terms, once with the old
+LOWER(...) LIKE '%q%' filter and once with the facilities_fts index.
+
+Usage:
+    python benchmarks/bench_search.py --facilities 40000 --inspections 250000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from app import build_fts_query, fts_join  # noqa: E402
+from config import Config  # noqa: E402
+from migrate import stamp  # noqa: E402
+
+SCHEMA_PATH = os.path.join(BASE_DIR, "schema.sql")
+
+NAME_WORDS = ["Sunrise", "Lotus", "Golden", "Dragon", "Taco", "Pizza", "Burger", "Grill",
+              "Cafe", "Diner", "Express", "Kitchen", "Bakery", "Market", "Garden", "Palace",
+              "Subway", "Starbucks", "McDonald's", "Harold's", "Chicken", "Noodle", "Sushi"]
+STREETS = ["Main St", "W Lake St", "N Clark St", "S State St", "W Madison St", "N Halsted St",
+           "W Division St", "S Halsted St", "N Milwaukee Ave", "W Belmont Ave"]
+TYPES = ["Restaurant", "Grocery Store", "Bakery", "School", "Daycare", "Liquor"]
+
+SEARCHES = ["pizza", "golden dragon", '"n clark"', "sub", "harold", "madison"]
+
+LIKE_PAGE_SQL = """
+    SELECT f.license_number, f.dba_name, f.facility_type, f.zip,
+           i.inspection_id, i.inspection_date, i.result, i.risk
+    FROM facilities f
+    LEFT JOIN inspections i ON i.license_number = f.license_number
+    WHERE (LOWER(f.dba_name) LIKE ? OR LOWER(f.address) LIKE ?)
+    ORDER BY i.inspection_date DESC LIMIT 50 OFFSET 0
+"""
+LIKE_COUNT_SQL = """
+    SELECT COUNT(DISTINCT f.license_number || '-' || COALESCE(i.inspection_id, ''))
+    FROM facilities f
+    LEFT JOIN inspections i ON i.license_number = f.license_number
+    WHERE (LOWER(f.dba_name) LIKE ? OR LOWER(f.address) LIKE ?)
+"""
+FTS_PAGE_SQL = """
+    SELECT f.license_number, f.dba_name, f.facility_type, f.zip,
+           i.inspection_id, i.inspection_date, i.result, i.risk
+    FROM facilities f
+    {join}
+    LEFT JOIN inspections i ON i.license_number = f.license_number
+    ORDER BY i.inspection_date DESC LIMIT 50 OFFSET 0
+""".format(join=fts_join("f"))
+FTS_COUNT_SQL = """
+    SELECT COUNT(DISTINCT f.license_number || '-' || COALESCE(i.inspection_id, ''))
+    FROM facilities f
+    {join}
+    LEFT JOIN inspections i ON i.license_number = f.license_number
+""".format(join=fts_join("f"))
+
+
+def populate(conn, n_facilities, n_inspections, seed=42):
+    """Fill the schema with reproducible synthetic rows."""
+    rng = random.Random(seed)
+    facilities = []
+    for n in range(n_facilities):
+        name = " ".join(rng.sample(NAME_WORDS, rng.randint(1, 3)))
+        address = f"{rng.randint(1, 9999)} {rng.choice(STREETS)}"
+        facilities.append((f"LIC-{n:07d}", name, rng.choice(TYPES), address,
+                           f"606{rng.randint(1, 60):02d}"))
+    conn.executemany("""
+        INSERT INTO facilities (license_number, dba_name, facility_type, address, zip)
+        VALUES (?, ?, ?, ?, ?)
+    """, facilities)
+
+    inspections = []
+    for _ in range(n_inspections):
+        lic = facilities[rng.randrange(n_facilities)][0]
+        date = f"{rng.randint(2010, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        inspections.append((lic, date, "Canvass",
+                            rng.choice(["High", "Medium", "Low"]),
+                            rng.choice(["Pass", "Fail", "Warning", "No Entry"])))
+    conn.executemany("""
+        INSERT INTO inspections (license_number, inspection_date, inspection_type, risk, result)
+        VALUES (?, ?, ?, ?, ?)
+    """, inspections)
+    conn.commit()
+
+
+def time_queries(conn, page_sql, count_sql, params, repeat):
+    """Return per-run wall times (ms) for the page + count pair."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(page_sql, params).fetchall()
+        conn.execute(count_sql, params).fetchone()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--facilities", type=int, default=40000)
+    parser.add_argument("--inspections", type=int, default=250000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+            conn.executescript(f.read())
+        stamp(conn, str(Config.MIGRATIONS_DIR))
+        print(f"Populating {args.facilities} facilities / {args.inspections} inspections...")
+        populate(conn, args.facilities, args.inspections)
+
+        print(f"\n{'query':<20}{'LIKE ms':>12}{'FTS5 ms':>12}{'speedup':>10}")
+        for q in SEARCHES:
+            like = "%" + q.strip('"').lower() + "%"
+            like_ms = statistics.median(
+                time_queries(conn, LIKE_PAGE_SQL, LIKE_COUNT_SQL, [like, like], args.repeat))
+            match = build_fts_query(q)
+            fts_ms = statistics.median(
+                time_queries(conn, FTS_PAGE_SQL, FTS_COUNT_SQL, [match], args.repeat))
+            print(f"{q:<20}{like_ms:>12.1f}{fts_ms:>12.1f}{like_ms / fts_ms:>9.1f}x")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Generate a synthetic database at a chosen scale for load testing.
+
+Recreates the schema in the target database (app.db by default), then fills
+it with facilities and inspections drawn from distributions that resemble
+the Chicago Data Portal export: a few facilities are inspected far more often
+than most, restaurants dominate, most inspections are High risk, failures
+carry more violations than passes, and dates span 2010 to today. The same
+--seed always produces the same data.
+
+Rows are written with the importer's bulk-load mode (indexes, triggers and
+derived tables rebuilt once at the end), in batches, so memory stays flat
+even at millions of rows.
+
+Usage:
+    python benchmarks/generate_data.py --inspections 1000000
+    python benchmarks/generate_data.py --inspections 5000000 --db /tmp/big.db --force
+"""
+
+import argparse
+import logging
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import import_chicago_data  # noqa: E402
+from config import Config  # noqa: E402
+from db import VIOLATION_INSERT, parse_violations  # noqa: E402
+from migrate import stamp  # noqa: E402
+
+SCHEMA_PATH = os.path.join(BASE_DIR, "schema.sql")
+BATCH = 50000
+
+NAME_WORDS = ["Sunrise", "Lotus", "Golden", "Dragon", "Taco", "Pizza", "Burger", "Grill",
+              "Cafe", "Diner", "Express", "Kitchen", "Bakery", "Market", "Garden", "Palace",
+              "Noodle", "Sushi", "Chicken", "Thai", "Mexican", "Deli", "Tavern", "Corner"]
+CHAINS = ["SUBWAY", "STARBUCKS", "MCDONALD'S", "DUNKIN DONUTS", "HAROLD'S CHICKEN", "CHIPOTLE"]
+STREETS = ["N CLARK ST", "S STATE ST", "W MADISON ST", "N HALSTED ST", "W DIVISION ST",
+           "N MILWAUKEE AVE", "W BELMONT AVE", "S ASHLAND AVE", "W 63RD ST", "N BROADWAY"]
+
+# (value, weight) tables, roughly matching the portal's shares
+FACILITY_TYPES = [("Restaurant", 65), ("Grocery Store", 13), ("School", 6), ("Daycare", 5),
+                  ("Bakery", 3), ("Children's Services Facility", 3), ("Liquor", 2),
+                  ("Mobile Food Dispenser", 2), ("Hospital", 1)]
+RISKS = [("High", 70), ("Medium", 20), ("Low", 10)]
+RESULTS = [("Pass", 52), ("Fail", 20), ("Warning", 16), ("No Entry", 12)]
+INSPECTION_TYPES = [("Canvass", 52), ("License", 13), ("Canvass Re-Inspection", 11),
+                    ("Complaint", 9), ("License Re-Inspection", 5), ("Short Form Complaint", 4),
+                    ("Complaint Re-Inspection", 4), ("Suspected Food Poisoning", 2)]
+VIOLATIONS_BY_RESULT = {"Pass": 1.0, "Warning": 2.5, "Fail": 4.5, "No Entry": 0.0}
+VIOLATION_TITLES = {
+    1: "PERSON IN CHARGE PRESENT, DEMONSTRATES KNOWLEDGE",
+    2: "CITY OF CHICAGO FOOD SERVICE SANITATION CERTIFICATE",
+    3: "MANAGEMENT, FOOD EMPLOYEE AND CONDITIONAL EMPLOYEE; KNOWLEDGE",
+    5: "PROCEDURES FOR RESPONDING TO VOMITING AND DIARRHEAL EVENTS",
+    10: "ADEQUATE HANDWASHING SINKS PROPERLY SUPPLIED AND ACCESSIBLE",
+    16: "FOOD-CONTACT SURFACES: CLEANED & SANITIZED",
+    21: "PROPER HOT HOLDING TEMPERATURES",
+    22: "PROPER COLD HOLDING TEMPERATURES",
+    33: "PROPER COOLING METHODS USED; ADEQUATE EQUIPMENT FOR TEMPERATURE CONTROL",
+    36: "THERMOMETERS PROVIDED & ACCURATE",
+    37: "FOOD PROPERLY LABELED; ORIGINAL CONTAINER",
+    38: "INSECTS, RODENTS, & ANIMALS NOT PRESENT",
+    41: "WIPING CLOTHS: PROPERLY USED & STORED",
+    47: "FOOD & NON-FOOD CONTACT SURFACES CLEANABLE, PROPERLY DESIGNED",
+    49: "NON-FOOD/FOOD CONTACT SURFACES CLEAN",
+    51: "PLUMBING INSTALLED; PROPER BACKFLOW DEVICES",
+    53: "TOILET FACILITIES: PROPERLY CONSTRUCTED, SUPPLIED, & CLEANED",
+    55: "PHYSICAL FACILITIES INSTALLED, MAINTAINED & CLEAN",
+    56: "ADEQUATE VENTILATION & LIGHTING; DESIGNATED AREAS USED",
+    58: "ALLERGEN TRAINING AS REQUIRED",
+}
+# Core (30+) codes are cited far more often than priority ones.
+VIOLATION_CODES = [(code, 1 if code < 15 else 2 if code < 30 else 6) for code in VIOLATION_TITLES]
+FIRST_DATE = date(2010, 1, 1)
+# City limits; facilities cluster around the Loop, and a few have no coordinates.
+LAT_RANGE, LON_RANGE = (41.64, 42.02), (-87.94, -87.52)
+DOWNTOWN = (41.88, -87.64)
+MISSING_COORDINATES = 0.02
+
+
+class Weighted:
+    """Fast weighted choice over a (value, weight) table."""
+
+    def __init__(self, table):
+        self.values = [value for value, _ in table]
+        self.cum_weights = []
+        total = 0
+        for _, weight in table:
+            total += weight
+            self.cum_weights.append(total)
+
+    def pick(self, rng, k=1):
+        return rng.choices(self.values, cum_weights=self.cum_weights, k=k)
+
+
+def make_facility(n, rng, types):
+    """One facility row (with coordinates); every 12th is a chain location."""
+    if n % 12 == 0:
+        name = f"{rng.choice(CHAINS)} #{rng.randint(1, 9999)}"
+    else:
+        name = " ".join(rng.sample(NAME_WORDS, rng.randint(1, 3))).upper()
+    # Lower Chicago ZIPs are denser, so weight toward them.
+    zip_code = f"606{min(int(rng.expovariate(1 / 18)) + 1, 61):02d}"
+    lat = lon = None
+    if rng.random() >= MISSING_COORDINATES:
+        lat = round(min(max(rng.gauss(DOWNTOWN[0], 0.09), LAT_RANGE[0]), LAT_RANGE[1]), 6)
+        lon = round(min(max(rng.gauss(DOWNTOWN[1], 0.07), LON_RANGE[0]), LON_RANGE[1]), 6)
+    return (f"{1000000 + n}", name, types.pick(rng)[0],
+            f"{rng.randint(1, 9999)} {rng.choice(STREETS)}", "Chicago", "IL", zip_code, lat, lon)
+
+
+def make_violations(rng, result, codes):
+    """Portal-style ' | '-joined violation text (None for no violations)."""
+    mean = VIOLATIONS_BY_RESULT[result]
+    count = min(int(rng.expovariate(1 / mean)), 12) if mean else 0
+    if not count:
+        return None
+    picked = sorted(set(codes.pick(rng, count)))
+    return " | ".join(f"{code}. {VIOLATION_TITLES[code]} - Comments: OBSERVED DURING INSPECTION"
+                      for code in picked)
+
+
+def generate(db_path, n_inspections, n_facilities, seed, today=None):
+    """Recreate the schema at db_path and fill it; returns elapsed seconds."""
+    rng = random.Random(seed)
+    today = today or date.today()
+    span = (today - FIRST_DATE).days
+    types, risks, results = Weighted(FACILITY_TYPES), Weighted(RISKS), Weighted(RESULTS)
+    inspection_types, codes = Weighted(INSPECTION_TYPES), Weighted(VIOLATION_CODES)
+
+    with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+        schema = f.read()
+    conn = sqlite3.connect(db_path)
+    conn.executescript(schema)
+    conn.executescript("DELETE FROM facilities;")
+    stamp(conn, str(Config.MIGRATIONS_DIR))
+    conn.close()
+
+    import_chicago_data.DB_PATH = db_path
+    conn = import_chicago_data.get_db()
+    start = time.perf_counter()
+    state = import_chicago_data.begin_bulk_load(conn)
+    try:
+        for first in range(0, n_facilities, BATCH):
+            rows = [make_facility(n, rng, types) for n in range(first, min(first + BATCH, n_facilities))]
+            with conn:
+                conn.executemany("""
+                    INSERT INTO facilities (license_number, dba_name, facility_type, address, city, state, zip,
+                                            latitude, longitude)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+        risk_of = [risks.pick(rng)[0] for _ in range(n_facilities)]
+
+        # Pareto-distributed popularity: a long tail of facilities inspected
+        # once or twice and a few inspected dozens of times.
+        popularity = [min(rng.paretovariate(2.5), 40.0) for _ in range(n_facilities)]
+        cum, total = [], 0.0
+        for weight in popularity:
+            total += weight
+            cum.append(total)
+        del popularity
+
+        inspection_id = 0
+        for first in range(0, n_inspections, BATCH):
+            count = min(BATCH, n_inspections - first)
+            picks = rng.choices(range(n_facilities), cum_weights=cum, k=count)
+            inspections, violations = [], []
+            for fac in picks:
+                inspection_id += 1
+                result = results.pick(rng)[0]
+                text = make_violations(rng, result, codes)
+                # Slightly more recent inspections than old ones
+                day = FIRST_DATE + timedelta(days=int(span * rng.random() ** 0.85))
+                inspections.append((inspection_id, f"{1000000 + fac}", day.isoformat(),
+                                    inspection_types.pick(rng)[0], risk_of[fac], result, text))
+                violations.extend((inspection_id,) + v for v in parse_violations(text))
+            with conn:
+                conn.executemany("""
+                    INSERT INTO inspections (inspection_id, license_number, inspection_date,
+                                             inspection_type, risk, result, violations_text)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, inspections)
+                conn.executemany(VIOLATION_INSERT, violations)
+            done = first + count
+            print(f"  {done:,} / {n_inspections:,} inspections "
+                  f"({done / (time.perf_counter() - start):,.0f} rows/sec)", flush=True)
+    finally:
+        import_chicago_data.end_bulk_load(conn, state)
+        conn.close()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--inspections", type=int, default=100000)
+    parser.add_argument("--facilities", type=int, default=None,
+                        help="default: one per 6 inspections, like the portal export")
+    parser.add_argument("--db", default=str(Config.DATABASE_PATH))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--force", action="store_true", help="overwrite a database that has data")
+    args = parser.parse_args()
+    n_facilities = args.facilities or max(1, args.inspections // 6)
+
+    if os.path.exists(args.db) and not args.force:
+        try:
+            conn = sqlite3.connect(args.db)
+            existing = conn.execute("SELECT COUNT(*) FROM inspections").fetchone()[0]
+            conn.close()
+        except sqlite3.Error:
+            existing = 0
+        if existing:
+            sys.exit(f"{args.db} already has {existing:,} inspections; pass --force to replace them")
+
+    logging.basicConfig(level=logging.WARNING)
+    print(f"Generating {n_facilities:,} facilities / {args.inspections:,} inspections into {args.db}")
+    elapsed = generate(args.db, args.inspections, n_facilities, args.seed)
+    print(f"Done in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
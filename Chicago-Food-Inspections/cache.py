@@ -0,0 +1,102 @@
+"""
+In-process result cache for app.py's read routes.
+
+Entries expire after a TTL and the least recently used ones are evicted once
+the cache is full. Writes through the app bump a data generation counter:
+entries that depend on the whole table (listing pages, totals) are stale as
+soon as the generation moves on, while per-facility entries are dropped by
+key, so editing one facility leaves every other facility page cached.
+
+The TTL bounds staleness for writes the app does not see (imports, other
+worker processes).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with per-entry TTL and a data generation counter.
+
+    put() takes the generation read *before* the value was computed, so a
+    write racing with the computation makes the result uncacheable instead
+    of caching pre-write data.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0,
+                       "invalidations": 0}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, generation, depends_on_all, value = entry
+                if time.monotonic() >= expires:
+                    del self._entries[key]
+                    self._stats["expirations"] += 1
+                elif depends_on_all and generation != self.generation:
+                    del self._entries[key]
+                    self._stats["invalidations"] += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key: Hashable, value: Any, generation: int, depends_on_all: bool = True) -> None:
+        """
+        Cache a value computed at `generation`.
+
+        Args:
+            depends_on_all: True if any write can change the value (listings);
+                            False if only invalidate(key) can (facility pages)
+        """
+        if self.max_entries <= 0 or value is None:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return  # a write landed while the value was being computed
+            self._entries[key] = (time.monotonic() + self.ttl, generation, depends_on_all, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def bump(self, *keys: Hashable) -> int:
+        """Record a write: advance the generation and drop the given keys."""
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self._stats["invalidations"] += 1
+            return self.generation
+
+    def clear(self) -> None:
+        """Drop every entry (e.g. after the database is re-initialized)."""
+        with self._lock:
+            self.generation += 1
+            self._stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus current size, generation and hit rate."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+            stats["max_entries"] = self.max_entries
+            stats["ttl"] = self.ttl
+            stats["generation"] = self.generation
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,57 @@
+"""
+Content-Encoding negotiation and compression for app.py and assets.py.
+
+gzip is always available; brotli is used when the optional `brotli` package
+is installed (it compresses HTML/JSON/CSS/JS noticeably better at similar
+speed). Clients choose through Accept-Encoding; among encodings they accept
+with equal preference, brotli wins over gzip.
+"""
+
+import gzip
+from typing import Iterable, Optional
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+# File suffix of a pre-compressed copy, per Content-Encoding
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def available_encodings() -> tuple:
+    """Encodings this process can produce, most preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encodings, offered: Optional[Iterable[str]] = None) -> Optional[str]:
+    """
+    Pick the Content-Encoding for a response.
+
+    Args:
+        accept_encodings: The request's parsed Accept-Encoding
+                          (werkzeug Accept, e.g. request.accept_encodings)
+        offered: Encodings to choose from, most preferred first
+                 (default available_encodings())
+
+    Returns:
+        "br", "gzip", or None for identity
+    """
+    offered = list(available_encodings() if offered is None else offered)
+    if not offered:
+        return None
+    # best_match keeps the first of equally weighted matches, so server
+    # preference breaks ties; q=0 entries never match.
+    return accept_encodings.best_match(offered)
+
+
+def compress(data: bytes, encoding: str, level: int = 6, brotli_quality: int = 5) -> bytes:
+    """Compress a whole body. mtime is fixed so equal inputs give equal outputs."""
+    if encoding == "br":
+        if brotli is None:
+            raise RuntimeError("brotli encoding needs the brotli package (pip install brotli)")
+        return brotli.compress(data, quality=brotli_quality)
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    raise ValueError(f"Unsupported Content-Encoding: {encoding}")
+
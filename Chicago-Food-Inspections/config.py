@@ -13,17 +13,102 @@ class Config:
     DEBUG = False
     TESTING = False
     
-    # Database
+    # Database: DATABASE_URL (sqlite:///path) overrides DATABASE_PATH; the
+    # app refuses other backends at startup (see backends.py)
     DATABASE_NAME = 'app.db'
     DATABASE_PATH = BASE_DIR / DATABASE_NAME
+    DATABASE_URL = os.environ.get('DATABASE_URL')
     SCHEMA_PATH = BASE_DIR / 'schema.sql'
+    MIGRATIONS_DIR = BASE_DIR / 'migrations'
+    MIGRATE_ON_STARTUP = True  # `python app.py` applies pending migrations
+    
+    # SQLite tuning (applied to every pooled connection)
+    SQLITE_JOURNAL_MODE = 'WAL'
+    SQLITE_SYNCHRONOUS = 'NORMAL'  # safe with WAL; FULL only matters for power loss
+    SQLITE_BUSY_TIMEOUT = 5000  # ms to wait on a locked database
+    SQLITE_CACHE_SIZE = -65536  # negative = KiB, so 64 MiB page cache per connection
+    SQLITE_MMAP_SIZE = 268435456  # 256 MiB memory-mapped I/O
+    SQLITE_POOL_SIZE = 8  # idle connections kept for reuse (0 = open per request)
     
-    # Pagination
+    # ASGI mode (asgi.py): read routes run on ASYNC_READERS threads with
+    # read-only connections, everything else on ASYNC_WORKERS threads; reads
+    # beyond ASYNC_MAX_PENDING queued get a 503
+    ASYNC_READERS = int(os.environ.get('ASYNC_READERS', 8))
+    ASYNC_WORKERS = int(os.environ.get('ASYNC_WORKERS', 4))
+    ASYNC_MAX_PENDING = int(os.environ.get('ASYNC_MAX_PENDING', 256))
+    
+    # Pagination: ?per_page= defaults to ITEMS_PER_PAGE, capped at
+    # MAX_ITEMS_PER_PAGE. Pages over STREAM_MIN_ROWS are streamed from the
+    # cursor into the template (not cached), in STREAM_CHUNK_SIZE pieces
     ITEMS_PER_PAGE = 50
+    MAX_ITEMS_PER_PAGE = 2000
+    STREAM_MIN_ROWS = 200
+    STREAM_CHUNK_SIZE = 16384  # characters
+    
+    # Listing totals: searches stop counting at COUNT_CAP ("10,000+");
+    # optionally an exact count runs in the background and is reused
+    COUNT_CAP = 10000
+    BACKGROUND_EXACT_COUNTS = os.environ.get('BACKGROUND_EXACT_COUNTS', 'False').lower() == 'true'
+    EXACT_COUNT_TTL = 300  # seconds
+    
+    # Result cache for home() and facility_detail(); per process, so the TTL
+    # bounds staleness from imports and other workers (0 entries = disabled)
+    RESULT_CACHE_SIZE = 1024
+    RESULT_CACHE_TTL = 30  # seconds
+    
+    # Per-route latency / SQL metrics served at /metrics
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    
+    # Slow-query log: statements over the threshold are written with their
+    # EXPLAIN QUERY PLAN (report with `python slowlog.py`; 0 ms = disabled)
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
+    SLOW_QUERY_LOG = BASE_DIR / 'slow_queries.log'
+    SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+    SLOW_QUERY_LOG_BACKUPS = 5
+    SLOW_QUERY_LARGE_TABLES = ('facilities', 'inspections', 'violations')  # SCANs of these are flagged
+    
+    # Response compression: gzip (or brotli, if installed) for dynamic
+    # responses of these types, negotiated via Accept-Encoding
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'True').lower() == 'true'
+    COMPRESS_MIN_SIZE = 500  # bytes; smaller bodies gain nothing
+    COMPRESS_LEVEL = 6  # gzip 1-9
+    COMPRESS_BROTLI_QUALITY = 5  # brotli 0-11; above ~6 costs more CPU than it saves bytes
+    COMPRESS_MIMETYPES = ('text/html', 'application/json', 'text/plain', 'text/css',
+                          'text/javascript', 'application/javascript', 'text/csv',
+                          'application/x-ndjson')
     
-    # Logging
+    # Fingerprinted, pre-compressed static files built by `python assets.py`
+    # and served from /assets/ as immutable
+    ASSET_DIR = BASE_DIR / 'static' / 'dist'
+    ASSET_MAX_AGE = 31536000  # one year; a changed file gets a new name
+    # Link vendored files missing from static/vendor/ from their pinned CDN
+    # URL instead (assets.VENDOR); off, so pages never depend on a CDN
+    ASSET_CDN_FALLBACK = os.environ.get('ASSET_CDN_FALLBACK', 'False').lower() == 'true'
+    
+    # Logging: JSON lines written by a background thread (see applog.py);
+    # info records with an `event` listed in LOG_SAMPLE_RATES are sampled
     LOG_LEVEL = 'INFO'
     LOG_FILE = BASE_DIR / 'app.log'
+    LOG_MAX_BYTES = 10 * 1024 * 1024  # rotate at 10 MiB
+    LOG_BACKUPS = 5
+    LOG_CONSOLE = True  # also write plain-text lines to stderr
+    LOG_ASYNC = os.environ.get('LOG_ASYNC', 'True').lower() == 'true'
+    LOG_QUEUE_SIZE = 10000  # records; beyond this they are dropped, not waited for
+    LOG_SAMPLE_RATES = {'request': 0.1}  # event -> fraction of info records kept
+    
+    # Admin endpoints: POST /admin/import runs an import in the background
+    # (jobs.py). Requests need `Authorization: Bearer <ADMIN_TOKEN>`; while it
+    # is unset the endpoints are disabled
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+    IMPORT_SOURCES = {  # source=file|stream -> what import_data() reads
+        'file': os.environ.get('IMPORT_CSV_FILE') or str(BASE_DIR / 'chicago_food_inspections.csv'),
+        'stream': os.environ.get('IMPORT_STREAM_URL')
+                  or 'https://data.cityofchicago.org/api/views/4ijn-s7e5/rows.csv?accessType=DOWNLOAD',
+    }
+    IMPORT_SAMPLE_ROWS = 1000  # default row limit of mode=sample
+    # Rows per transaction for those jobs: small, so the site's own writes
+    # wait well under SQLITE_BUSY_TIMEOUT for each one
+    IMPORT_JOB_BATCH_SIZE = 1000
     
     # Security
     SESSION_COOKIE_SECURE = True  # Requires HTTPS
@@ -41,13 +126,9 @@ class DevelopmentConfig(Config):
 
 class ProductionConfig(Config):
     """Production configuration"""
-    # In production, ensure SECRET_KEY is set via environment variable
+    # In production, SECRET_KEY must be set via environment variable
+    # (checked in get_config() so importing this module never fails)
     SECRET_KEY = os.environ.get('SECRET_KEY')
-    if not SECRET_KEY:
-        raise ValueError("SECRET_KEY environment variable must be set in production")
-    
-    # Production database (can be overridden for PostgreSQL)
-    DATABASE_URL = os.environ.get('DATABASE_URL')
     
     LOG_LEVEL = 'WARNING'
 
@@ -80,4 +161,7 @@ def get_config(env=None):
     if env is None:
         env = os.environ.get('FLASK_ENV', 'development')
     
+    if env == 'production' and not os.environ.get('SECRET_KEY'):
+        raise ValueError("SECRET_KEY environment variable must be set in production")
+    
     return config.get(env, config['default'])
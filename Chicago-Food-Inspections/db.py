@@ -0,0 +1,372 @@
+"""
+Database helpers shared by app.py and import_chicago_data.py.
+
+Connections are expensive to open relative to the queries this app runs, so
+they are kept in a small pool and handed to one request (or job) at a time.
+Every connection gets the PRAGMAs configured in config.py when it is opened.
+The rebuild_* functions recompute derived data (search index, counters)
+after bulk loads or manual SQL edits.
+"""
+
+import logging
+import queue
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def open_connection(path: str, pragmas: Optional[Dict[str, object]] = None) -> sqlite3.Connection:
+    """
+    Open a tuned SQLite connection.
+
+    Args:
+        path: Database file path
+        pragmas: PRAGMA name -> value, applied in order (None values skipped)
+
+    Returns:
+        sqlite3.Connection: Connection with Row factory and foreign keys enabled
+    """
+    # check_same_thread=False: pooled connections move between worker threads,
+    # but the pool guarantees only one thread uses a connection at a time.
+    conn = sqlite3.connect(str(path), check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON;")
+    for name, value in (pragmas or {}).items():
+        if value is not None:
+            conn.execute(f"PRAGMA {name} = {value};")
+    return conn
+
+
+def pragmas_from_config(config) -> Dict[str, object]:
+    """Collect the SQLITE_* tuning settings from a Flask config mapping."""
+    return {
+        "journal_mode": config.get("SQLITE_JOURNAL_MODE"),
+        "synchronous": config.get("SQLITE_SYNCHRONOUS"),
+        "busy_timeout": config.get("SQLITE_BUSY_TIMEOUT"),
+        "cache_size": config.get("SQLITE_CACHE_SIZE"),
+        "mmap_size": config.get("SQLITE_MMAP_SIZE"),
+    }
+
+
+class ConnectionPool:
+    """
+    Bounded pool of idle SQLite connections.
+
+    acquire() reuses an idle connection or opens a new one; release() rolls
+    back anything left uncommitted and keeps the connection if there is room,
+    closing it otherwise. A size of 0 disables reuse entirely.
+    """
+
+    def __init__(self, path: str, pragmas: Optional[Dict[str, object]] = None, size: int = 8):
+        self.path = str(path)
+        self.pragmas = dict(pragmas or {})
+        self.size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=max(size, 1))
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self) -> sqlite3.Connection:
+        """Check out a connection."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self.open()
+
+    def open(self) -> sqlite3.Connection:
+        """Open a new connection."""
+        return open_connection(self.path, self.pragmas)
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Return a connection to the pool (or close it if the pool is full)."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.warning("Discarding broken pooled connection: %s", e)
+            conn.close()
+            return
+        with self._lock:
+            if self._closed or self.size <= 0:
+                conn.close()
+                return
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Context manager for code running outside a request."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def idle(self) -> int:
+        """Number of idle connections currently pooled."""
+        return self._idle.qsize()
+
+    def close_all(self) -> None:
+        """Close every idle connection and stop accepting returns."""
+        with self._lock:
+            self._closed = True
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+
+
+# ==================== INSTRUMENTATION ====================
+
+class InstrumentedConnection:
+    """
+    Connection proxy that counts statements and times them.
+
+    execute()/executemany() and the fetch calls on the cursors they return
+    are timed, since SQLite does most of a query's work while rows are
+    stepped. Everything else is delegated to the wrapped connection.
+
+    If `on_slow` is given, it is called as on_slow(raw, sql, params, seconds)
+    once for each statement whose time crosses `slow_seconds` (params is
+    None for executemany()).
+    """
+
+    __slots__ = ("raw", "queries", "seconds", "on_slow", "slow_seconds")
+
+    def __init__(self, raw: sqlite3.Connection, on_slow: Optional[Callable] = None,
+                 slow_seconds: float = 0.0):
+        self.raw = raw
+        self.queries = 0
+        self.seconds = 0.0
+        self.on_slow = on_slow
+        self.slow_seconds = slow_seconds
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def execute(self, sql: str, params=()) -> "TimedCursor":
+        start = time.perf_counter()
+        try:
+            cursor = self.raw.execute(sql, params)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.seconds += elapsed
+        return TimedCursor(cursor, self, sql, params).charge(elapsed)
+
+    def executemany(self, sql: str, seq_of_params) -> "TimedCursor":
+        start = time.perf_counter()
+        try:
+            cursor = self.raw.executemany(sql, seq_of_params)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.seconds += elapsed
+        return TimedCursor(cursor, self, sql, None).charge(elapsed)
+
+
+# Rows fetched per timed step when a TimedCursor is iterated (streamed pages
+# read it lazily, so it must not fetch everything up front)
+ITER_BATCH_ROWS = 256
+
+
+class TimedCursor:
+    """Cursor proxy that adds fetch time to its InstrumentedConnection."""
+
+    __slots__ = ("raw", "conn", "sql", "params", "seconds")
+
+    def __init__(self, raw: sqlite3.Cursor, conn: InstrumentedConnection, sql: str, params):
+        self.raw = raw
+        self.conn = conn
+        self.sql = sql
+        self.params = params
+        self.seconds = 0.0
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def charge(self, elapsed: float) -> "TimedCursor":
+        """Add time spent on this statement; report it once if it turned slow."""
+        before = self.seconds
+        self.seconds += elapsed
+        conn = self.conn
+        if conn.on_slow is not None and before < conn.slow_seconds <= self.seconds:
+            conn.on_slow(conn.raw, self.sql, self.params, self.seconds)
+        return self
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.conn.seconds += elapsed
+            self.charge(elapsed)
+
+    def fetchone(self):
+        return self._timed(self.raw.fetchone)
+
+    def fetchmany(self, size: int = 1):
+        return self._timed(self.raw.fetchmany, size)
+
+    def fetchall(self):
+        return self._timed(self.raw.fetchall)
+
+    def __iter__(self):
+        while True:
+            rows = self.fetchmany(ITER_BATCH_ROWS)
+            if not rows:
+                return
+            yield from rows
+
+
+# ==================== VIOLATIONS ====================
+
+# Portal exports join violations with " | " ("21. PROPER HOT HOLDING ... -
+# Comments: ..."); app-entered text uses "#21: ...; #6: ...".
+VIOLATION_SPLIT_RE = re.compile(r"\s*\|\s*|;\s*(?=#\d)")
+VIOLATION_RE = re.compile(r"#?(\d+)\s*[.:]\s*")
+
+# Chicago codes 1-14 are "priority" and 15-29 "priority foundation"; 30+ are core.
+CRITICAL_MAX_CODE = 29
+
+
+def parse_violations(text: Optional[str]) -> List[Tuple[str, str, int]]:
+    """
+    Split a violations blob into (code, description, critical) tuples.
+
+    Codes are stored as "#21". Items without a recognizable code are skipped.
+    """
+    parsed = []
+    if not text:
+        return parsed
+    for item in VIOLATION_SPLIT_RE.split(text.strip()):
+        m = VIOLATION_RE.match(item)
+        if not m:
+            continue
+        number = int(m.group(1))
+        # str.partition beats a lazy regex group on long inspector comments
+        description = item[m.end():].partition("- Comments:")[0].strip() or f"Violation {number}"
+        parsed.append((f"#{number}", description, int(number <= CRITICAL_MAX_CODE)))
+    return parsed
+
+
+VIOLATION_INSERT = "INSERT INTO violations (inspection_id, code, description, critical) VALUES (?, ?, ?, ?)"
+
+
+def replace_violations(conn: sqlite3.Connection, inspection_id: int, text: Optional[str]) -> None:
+    """Re-derive one inspection's violations rows from its text (caller commits)."""
+    conn.execute("DELETE FROM violations WHERE inspection_id = ?", (inspection_id,))
+    conn.executemany(VIOLATION_INSERT, [(inspection_id,) + v for v in parse_violations(text)])
+
+
+# ==================== DERIVED DATA ====================
+
+# Rows that already hold the right values are skipped, so a rebuild does not
+# touch (and bump updated_at on) facilities that did not change.
+LATEST_INSPECTIONS_REBUILD = """
+    UPDATE facilities
+    SET inspection_count = s.n, last_inspection_id = s.inspection_id,
+        last_inspection_date = s.inspection_date, last_result = s.result, last_risk = s.risk
+    FROM (
+        SELECT license_number, inspection_id, inspection_date, result, risk, n
+        FROM (SELECT license_number, inspection_id, inspection_date, result, risk,
+                     COUNT(*) OVER w AS n,
+                     ROW_NUMBER() OVER (w ORDER BY inspection_date DESC, inspection_id DESC) AS rn
+              FROM inspections
+              WINDOW w AS (PARTITION BY license_number))
+        WHERE rn = 1) s
+    WHERE facilities.license_number = s.license_number
+      AND (facilities.inspection_count, facilities.last_inspection_id, facilities.last_inspection_date,
+           facilities.last_result, facilities.last_risk)
+          IS NOT (s.n, s.inspection_id, s.inspection_date, s.result, s.risk)
+"""
+
+def rebuild_search_index(conn: sqlite3.Connection) -> None:
+    """Rebuild facilities_fts from facilities (needed after VACUUM or bulk loads)."""
+    conn.execute("INSERT INTO facilities_fts(facilities_fts) VALUES('rebuild')")
+    conn.commit()
+
+
+def rebuild_geo_index(conn: sqlite3.Connection) -> None:
+    """Rebuild facilities_geo from facilities' coordinates (after VACUUM or bulk loads)."""
+    conn.execute("DELETE FROM facilities_geo")
+    conn.execute("""
+        INSERT INTO facilities_geo (id, min_lat, max_lat, min_lon, max_lon)
+        SELECT rowid, latitude, latitude, longitude, longitude FROM facilities
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+    """)
+    conn.commit()
+
+
+def rebuild_violations(conn: sqlite3.Connection) -> int:
+    """Re-derive the violations table from inspections.violations_text; returns rows written."""
+    conn.execute("DELETE FROM violations")
+    written = 0
+    cursor = conn.execute("SELECT inspection_id, violations_text FROM inspections "
+                          "WHERE violations_text IS NOT NULL")
+    while True:
+        batch = cursor.fetchmany(10000)
+        if not batch:
+            break
+        rows = [(r[0],) + v for r in batch for v in parse_violations(r[1])]
+        conn.executemany(VIOLATION_INSERT, rows)
+        written += len(rows)
+    conn.commit()
+    return written
+
+
+def rebuild_rollups(conn: sqlite3.Connection) -> None:
+    """Recompute inspection_rollups for every grain from inspections + facilities."""
+    conn.execute("DELETE FROM inspection_rollups")
+    conn.execute("""
+        INSERT INTO inspection_rollups (grain, period, result, risk, facility_type, zip, n)
+        SELECT g.grain, substr(i.inspection_date, 1, g.width), i.result, i.risk,
+               f.facility_type, f.zip, COUNT(*)
+        FROM rollup_grains g, inspections i
+        JOIN facilities f ON f.license_number = i.license_number
+        GROUP BY 1, 2, 3, 4, 5, 6
+    """)
+    conn.commit()
+
+
+def rebuild_latest_inspections(conn: sqlite3.Connection) -> None:
+    """Recompute facilities' inspection_count and last_* columns (after bulk loads)."""
+    conn.execute(LATEST_INSPECTIONS_REBUILD)
+    conn.execute("""
+        UPDATE facilities
+        SET inspection_count = 0, last_inspection_id = NULL, last_inspection_date = NULL,
+            last_result = NULL, last_risk = NULL
+        WHERE (inspection_count <> 0 OR last_inspection_id IS NOT NULL)
+          AND license_number NOT IN (SELECT license_number FROM inspections)
+    """)
+    conn.commit()
+
+
+def rebuild_listing_counts(conn: sqlite3.Connection) -> None:
+    """Recompute the listing counters from scratch (e.g. after manual SQL edits)."""
+    conn.execute("DELETE FROM inspection_counts")
+    conn.execute("""
+        INSERT INTO inspection_counts (result, risk, n)
+        SELECT result, risk, COUNT(*) FROM inspections GROUP BY result, risk
+    """)
+    conn.execute("DELETE FROM facility_counts")
+    conn.execute("""
+        INSERT INTO facility_counts (result, risk, n)
+        SELECT last_result, last_risk, COUNT(*) FROM facilities
+        WHERE last_result IS NOT NULL GROUP BY last_result, last_risk
+    """)
+    conn.execute("""
+        UPDATE listing_counters SET n = (
+            SELECT COUNT(*) FROM facilities f
+            WHERE NOT EXISTS (SELECT 1 FROM inspections i WHERE i.license_number = f.license_number))
+        WHERE name = 'uninspected_facilities'
+    """)
+    conn.commit()
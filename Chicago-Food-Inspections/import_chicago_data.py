@@ -3,21 +3,53 @@ import sqlite3
 import csv
 import requests
 import os
+import sys
+import io
+import gzip
+import hashlib
+import bz2
+import multiprocessing
+import queue
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 import logging
 
+from config import Config
+from db import (VIOLATION_INSERT, open_connection, parse_violations, pragmas_from_config,
+                rebuild_geo_index, rebuild_latest_inspections, rebuild_listing_counts, rebuild_rollups,
+                rebuild_search_index, rebuild_violations)
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Configuration
 DB_PATH = "app.db"
+# WAL, busy_timeout etc. as the app uses them, so an import waits for the
+# site's writes (and vice versa) instead of failing with "database is locked"
+DB_PRAGMAS = pragmas_from_config(vars(Config))
 CSV_URL = "https://data.cityofchicago.org/api/views/4ijn-s7e5/rows.csv?accessType=DOWNLOAD"
 CSV_FILE = "chicago_food_inspections.csv"
 
+# Bulk loading
+BATCH_SIZE = 10000  # rows per executemany / transaction
+BULK_CACHE_KIB = 262144  # 256 MiB page cache while loading
+
+# Parse/clean worker processes (0 = one per CPU core; 1 = parse in-process)
+IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', 0))
+
+# Streaming sources
+STREAM_BLOCK_SIZE = 65536  # bytes per network read
+PREFETCH_BLOCKS = 64  # network blocks buffered ahead of the parser (~4 MiB)
+
 def download_data():
     """Download the CSV file from Chicago Data Portal"""
-    logger.info(f"Downloading data from {CSV_URL}")
+    logger.info("Downloading data from %s", CSV_URL)
     
     try:
         response = requests.get(CSV_URL, stream=True)
@@ -27,18 +59,167 @@ def download_data():
             for chunk in response.iter_content(chunk_size=8192):
                 f.write(chunk)
         
-        logger.info(f"Downloaded {os.path.getsize(CSV_FILE)} bytes to {CSV_FILE}")
+        logger.info("Downloaded %d bytes to %s", os.path.getsize(CSV_FILE), CSV_FILE)
         return True
     except Exception as e:
-        logger.error(f"Error downloading data: {e}")
+        logger.error("Error downloading data: %s", e)
         return False
 
-def get_db():
-    """Get database connection"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON;")
-    return conn
+class PrefetchReader(io.RawIOBase):
+    """
+    Read a byte stream from a background thread through a bounded queue.
+
+    Lets a slow network download keep going while the importer is busy
+    parsing and inserting, without ever holding more than
+    PREFETCH_BLOCKS x STREAM_BLOCK_SIZE bytes in memory.
+    """
+
+    def __init__(self, raw, block_size=STREAM_BLOCK_SIZE, max_blocks=PREFETCH_BLOCKS):
+        super().__init__()
+        self._blocks = queue.Queue(maxsize=max_blocks)
+        self._current = memoryview(b"")
+        self._error = None
+        self._eof = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._fill, args=(raw, block_size), daemon=True)
+        self._thread.start()
+
+    def _fill(self, raw, block_size):
+        try:
+            while not self._stop.is_set():
+                block = raw.read(block_size)
+                if not block:
+                    break
+                while not self._stop.is_set():
+                    try:
+                        self._blocks.put(block, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+        except Exception as e:
+            self._error = e
+        finally:
+            self._blocks.put(None)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if not self._current:
+            if self._eof:
+                return 0
+            block = self._blocks.get()
+            if block is None:
+                self._eof = True
+                if self._error:
+                    raise self._error
+                return 0
+            self._current = memoryview(block)
+        n = min(len(b), len(self._current))
+        b[:n] = self._current[:n]
+        self._current = self._current[n:]
+        return n
+
+    def close(self):
+        self._stop.set()
+        while True:  # unblock the producer if it is waiting on a full queue
+            try:
+                self._blocks.get_nowait()
+            except queue.Empty:
+                break
+        super().close()
+
+class ByteMeter:
+    """Bytes read from an import source so far, and its size when known."""
+
+    def __init__(self):
+        self.bytes_read = 0
+        self.total = None
+
+class MeteredReader(io.RawIOBase):
+    """Count the bytes read through a binary stream into a ByteMeter."""
+
+    def __init__(self, raw, meter):
+        super().__init__()
+        self._raw = raw
+        self._meter = meter
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = self._raw.readinto(b)
+        if n:
+            self._meter.bytes_read += n
+        return n
+
+@contextmanager
+def open_source(source, meter=None):
+    """
+    Open a CSV source as an incrementally-read text stream.
+    
+    Args:
+        source: A file path, '-' for stdin, an http(s) URL, or a binary
+                file object. gzip and bz2 data is detected from its magic
+                bytes and decompressed on the fly.
+        meter: Optional ByteMeter to count the (compressed) bytes read; its
+               total is set for files and for URLs that send Content-Length.
+    
+    Yields:
+        Text stream positioned at the CSV header
+    """
+    owned = []
+    text = None
+    try:
+        if hasattr(source, 'read'):
+            raw = source
+        elif source == '-':
+            raw = sys.stdin.buffer
+        elif source.startswith(('http://', 'https://')):
+            response = requests.get(source, stream=True, timeout=60)
+            response.raise_for_status()
+            owned.append(response)
+            response.raw.decode_content = True  # undo Content-Encoding: gzip
+            if meter is not None and 'Content-Encoding' not in response.headers:
+                length = response.headers.get('Content-Length', '')
+                meter.total = int(length) if length.isdigit() else None
+            raw = PrefetchReader(response.raw)
+            owned.append(raw)
+        else:
+            raw = open(source, 'rb')
+            owned.append(raw)
+            if meter is not None:
+                meter.total = os.fstat(raw.fileno()).st_size
+        
+        if meter is not None:
+            raw = MeteredReader(raw, meter)
+        if not hasattr(raw, 'peek'):
+            raw = io.BufferedReader(raw, STREAM_BLOCK_SIZE)
+        magic = raw.peek(3)[:3]
+        if magic.startswith(b'\x1f\x8b'):
+            raw = gzip.GzipFile(fileobj=raw)
+        elif magic == b'BZh':
+            raw = bz2.BZ2File(raw)
+        
+        text = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+        yield text
+    finally:
+        if text is not None:
+            try:
+                text.detach()  # never close stdin or a caller's stream
+            except ValueError:
+                pass
+        for obj in reversed(owned):
+            obj.close()
+
+def is_local_path(source):
+    """True if source names a file on disk (not stdin, a URL or a stream)."""
+    return isinstance(source, (str, os.PathLike)) and source != '-' and \
+        not str(source).startswith(('http://', 'https://'))
+
+def get_db(path=None, pragmas=None):
+    """Get database connection (default DB_PATH) with the app's PRAGMAs (DB_PRAGMAS)"""
+    return open_connection(path or DB_PATH, DB_PRAGMAS if pragmas is None else pragmas)
 
 def clean_zip(zip_code):
     """Clean and validate ZIP code"""
@@ -58,23 +239,41 @@ def clean_phone(phone):
         return f"({cleaned[:3]}) {cleaned[3:6]}-{cleaned[6:]}"
     return None
 
+@lru_cache(maxsize=65536)
 def parse_date(date_str):
-    """Parse date from various formats"""
+    """Parse date from various formats (cached: the portal repeats a few thousand dates)"""
     if not date_str:
         return None
     
-    try:
-        # Try MM/DD/YYYY format (most common in Chicago data)
-        dt = datetime.strptime(date_str.split()[0], '%m/%d/%Y')
-        return dt.strftime('%Y-%m-%d')
-    except:
+    parts = date_str.split()
+    if not parts:
+        return None
+    
+    # MM/DD/YYYY is the most common format in Chicago data, then YYYY-MM-DD
+    for fmt in ('%m/%d/%Y', '%Y-%m-%d'):
         try:
-            # Try YYYY-MM-DD format
-            dt = datetime.strptime(date_str.split()[0], '%Y-%m-%d')
-            return dt.strftime('%Y-%m-%d')
-        except:
-            return None
+            return datetime.strptime(parts[0], fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
 
+def parse_coordinates(lat_str, lon_str):
+    """
+    Parse the portal's Latitude/Longitude pair.
+
+    Returns:
+        (latitude, longitude), or (None, None) if either is missing, not a
+        number or out of range (the export uses blanks and 0 for "unknown")
+    """
+    try:
+        lat, lon = float(lat_str), float(lon_str)
+    except (TypeError, ValueError):
+        return None, None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or (lat == 0 and lon == 0):
+        return None, None
+    return lat, lon
+
+@lru_cache(maxsize=256)
 def map_risk(risk_str):
     """Map risk categories to our schema"""
     if not risk_str:
@@ -88,6 +287,7 @@ def map_risk(risk_str):
     else:
         return 'Medium'
 
+@lru_cache(maxsize=256)
 def map_result(result_str):
     """Map inspection results to our schema"""
     if not result_str:
@@ -105,119 +305,537 @@ def map_result(result_str):
     else:
         return 'Warning'
 
-def import_data(limit=1000):
+def clean_row(row):
+    """
+    Turn one portal CSV row into insert-ready tuples.
+
+    Returns:
+        (facility, inspection): facility is None if the row has no usable
+        facility; inspection is None if the facility is fine but the
+        inspection fields are not. inspection[0] is the portal's
+        Inspection ID (None if the export has none).
+    """
+    license_number = row.get('License #', '').strip()
+    if not license_number or license_number == 'None':
+        return None, None
+
+    dba_name = row.get('DBA Name', '').strip() or row.get('AKA Name', '').strip()
+    if not dba_name:
+        return None, None
+
+    zip_code = clean_zip(row.get('Zip', ''))
+    if not zip_code:
+        return None, None
+
+    latitude, longitude = parse_coordinates(row.get('Latitude'), row.get('Longitude'))
+    facility = (
+        license_number,
+        dba_name,
+        row.get('Facility Type', 'Restaurant').strip(),
+        row.get('Address', '').strip(),
+        row.get('City', 'Chicago').strip(),
+        row.get('State', 'IL').strip(),
+        zip_code,
+        None,
+        latitude,
+        longitude,
+    )
+
+    inspection_date = parse_date(row.get('Inspection Date', ''))
+    inspection_type = row.get('Inspection Type', 'Routine').strip()
+    if not inspection_date or not inspection_type:
+        return facility, None
+
+    source_id = (row.get('Inspection ID') or '').strip()
+    inspection = (
+        int(source_id) if source_id.isdigit() else None,
+        license_number,
+        inspection_date,
+        inspection_type,
+        map_risk(row.get('Risk', '')),
+        map_result(row.get('Results', '')),
+        row.get('Violations', '').strip() or None,
+    )
+    return facility, inspection
+
+def read_chunks(f, limit=None, chunk_size=BATCH_SIZE):
+    """
+    Split a CSV file into chunks of raw field lists.
+
+    csv.reader does the quoting/newline handling in C here; turning rows into
+    dicts and cleaning them is left to clean_chunk(), which can run in
+    worker processes.
+
+    Yields:
+        (header, rows) tuples of at most chunk_size rows
+    """
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return
+    rows = []
+    count = 0
+    for fields in reader:
+        if not fields:
+            continue  # csv.DictReader skips blank lines too
+        if limit and count >= limit:
+            logger.info("Reached limit of %d records", limit)
+            break
+        rows.append(fields)
+        count += 1
+        if len(rows) >= chunk_size:
+            yield header, rows
+            rows = []
+    if rows:
+        yield header, rows
+
+def clean_chunk(chunk):
+    """
+    Clean one chunk of raw rows (runs in a worker process).
+
+    Content hashes and parsed violations are computed here too, so the CPU
+    work stays parallel.
+
+    Returns:
+        (rows, facilities, inspections, facilities_skipped, inspections_skipped)
+        where facilities are FACILITY_INSERT tuples and inspections are
+        (INSPECTION_INSERT tuple, parsed violations) pairs
+    """
+    header, rows = chunk
+    width = len(header)
+    facilities, inspections = [], []
+    facilities_skipped = inspections_skipped = 0
+    for fields in rows:
+        row = dict(zip(header, fields))
+        if len(fields) < width:
+            # Match csv.DictReader: missing trailing fields read as None
+            for key in header[len(fields):]:
+                row[key] = None
+        facility, inspection = clean_row(row)
+        if facility is None:
+            facilities_skipped += 1
+            continue
+        facilities.append(facility + (content_hash(facility), inspection[2] if inspection else None))
+        if inspection is None:
+            inspections_skipped += 1
+            continue
+        inspections.append((inspection + (content_hash(inspection[1:]),),
+                            parse_violations(inspection[6])))
+    return len(rows), facilities, inspections, facilities_skipped, inspections_skipped
+
+def clean_chunks(chunks, workers):
+    """
+    Run clean_chunk over chunks, in order.
+
+    With more than one worker, chunks are cleaned in a process pool while
+    the caller writes earlier results; at most 2 x workers chunks are in
+    flight so memory stays bounded. Results come back in input order, so
+    the database ends up identical to a serial run.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield clean_chunk(chunk)
+        return
+
+    # Forking a process that runs other threads (the web app, a prefetching
+    # download) can copy a held lock into the child; spawn fresh workers then.
+    context = multiprocessing.get_context("spawn") if threading.active_count() > 1 else None
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(clean_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+FACILITY_INSERT = """
+    INSERT INTO facilities
+    (license_number, dba_name, facility_type, address, city, state, zip, phone,
+     latitude, longitude, content_hash, source_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# phone is not in the portal export, so an app-entered phone is kept
+FACILITY_UPDATE = """
+    UPDATE facilities
+    SET dba_name=?, facility_type=?, address=?, city=?, state=?, zip=?,
+        latitude=?, longitude=?, content_hash=?, source_date=?, updated_at=strftime('%Y-%m-%d %H:%M:%f', 'now')
+    WHERE license_number=?
+"""
+
+INSPECTION_INSERT = """
+    INSERT INTO inspections
+    (source_id, license_number, inspection_date, inspection_type, risk, result,
+     violations_text, content_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSPECTION_UPDATE = """
+    UPDATE inspections
+    SET license_number=?, inspection_date=?, inspection_type=?, risk=?, result=?,
+        violations_text=?, content_hash=?, updated_at=strftime('%Y-%m-%d %H:%M:%f', 'now')
+    WHERE source_id=?
+"""
+
+# Rows imported before source_id existed (marked by 0000_baseline.sql) get
+# their Inspection ID attached on the next import instead of a duplicate row
+INSPECTION_ADOPT = """
+    UPDATE inspections
+    SET license_number=?, inspection_date=?, inspection_type=?, risk=?, result=?,
+        violations_text=?, content_hash=?, source_id=?, updated_at=strftime('%Y-%m-%d %H:%M:%f', 'now')
+    WHERE inspection_id=?
+"""
+
+LEGACY_HASH = "pre-source-id"
+
+LOOKUP_CHUNK = 500  # keys per IN (...) lookup
+
+def content_hash(values):
+    """Digest of a row's imported fields, used to skip rows that have not changed."""
+    joined = "\x1f".join("" if v is None else str(v) for v in values)
+    return hashlib.blake2b(joined.encode("utf-8"), digest_size=16).hexdigest()
+
+def _lookup(conn, sql, keys):
+    """Run `sql` (with an IN ({}) placeholder) over keys in chunks; key -> rest of row."""
+    keys = list(keys)
+    found = {}
+    for i in range(0, len(keys), LOOKUP_CHUNK):
+        part = keys[i:i + LOOKUP_CHUNK]
+        for row in conn.execute(sql.format(",".join("?" * len(part))), part):
+            found[row[0]] = tuple(row[1:])
+    return found
+
+def has_legacy_rows(conn):
+    """True if the database still has inspections imported without an Inspection ID."""
+    return conn.execute("SELECT 1 FROM inspections WHERE source_id IS NULL AND content_hash = ? "
+                        "LIMIT 1", (LEGACY_HASH,)).fetchone() is not None
+
+def _legacy_ids(conn, license_numbers):
+    """(license_number, inspection_date, inspection_type) -> ids of legacy rows, oldest first."""
+    license_numbers = list(license_numbers)
+    found = {}
+    for i in range(0, len(license_numbers), LOOKUP_CHUNK):
+        part = license_numbers[i:i + LOOKUP_CHUNK]
+        sql = ("SELECT license_number, inspection_date, inspection_type, inspection_id FROM inspections "
+               "WHERE license_number IN ({}) AND source_id IS NULL AND content_hash = ? "
+               "ORDER BY inspection_id").format(",".join("?" * len(part)))
+        for row in conn.execute(sql, part + [LEGACY_HASH]):
+            found.setdefault(tuple(row[:3]), []).append(row[3])
+    return found
+
+def plan_batch(conn, facilities, inspections, adopt=False):
+    """
+    Split a cleaned batch into inserts, updates and unchanged rows.
+
+    Facilities are keyed on license_number and take their details from the
+    most recent inspection seen for them; inspections are keyed on the
+    portal's Inspection ID (rows without one are always inserted). With
+    `adopt`, a new Inspection ID that matches a legacy row on license,
+    date and type updates that row instead (see has_legacy_rows()).
+
+    Returns:
+        dict of statement lists plus the number of unchanged inspections;
+        inspection entries are (statement params, parsed violations) pairs
+    """
+    latest = {}
+    for rec in facilities:
+        current = latest.get(rec[0])
+        if current is None or (rec[11] or "") > (current[11] or ""):
+            latest[rec[0]] = rec
+    stored = _lookup(conn, "SELECT license_number, content_hash, source_date FROM facilities "
+                           "WHERE license_number IN ({})", latest)
+    facility_inserts, facility_updates = [], []
+    for license_number, rec in latest.items():
+        if license_number not in stored:
+            facility_inserts.append(rec)
+        else:
+            old_hash, old_date = stored[license_number]
+            if rec[10] != old_hash and (rec[11] or "") >= (old_date or ""):
+                facility_updates.append(rec[1:7] + rec[8:12] + (license_number,))
+
+    source_ids = {rec[0] for rec, _ in inspections if rec[0] is not None}
+    stored = _lookup(conn, "SELECT source_id, content_hash FROM inspections "
+                           "WHERE source_id IN ({})", source_ids)
+    legacy = {}
+    if adopt:
+        legacy = _legacy_ids(conn, {rec[1] for rec, _ in inspections
+                                    if rec[0] is not None and rec[0] not in stored})
+    inspection_inserts, inspection_updates, inspection_adoptions = [], [], []
+    seen = set()
+    unchanged = 0
+    for rec, violations in inspections:
+        source_id = rec[0]
+        if source_id is None:
+            inspection_inserts.append((rec, violations))
+        elif source_id in seen:
+            unchanged += 1  # repeated in the same batch
+        elif source_id not in stored:
+            candidates = legacy.get(rec[1:4])
+            if candidates:
+                inspection_adoptions.append((rec[1:] + (source_id, candidates.pop(0)), violations))
+            else:
+                inspection_inserts.append((rec, violations))
+        elif stored[source_id][0] != rec[7]:
+            inspection_updates.append((rec[1:] + (source_id,), violations))
+        else:
+            unchanged += 1
+        if source_id is not None:
+            seen.add(source_id)
+
+    return {
+        "facility_inserts": facility_inserts,
+        "facility_updates": facility_updates,
+        "inspection_inserts": inspection_inserts,
+        "inspection_updates": inspection_updates,
+        "inspection_adoptions": inspection_adoptions,
+        "inspections_unchanged": unchanged,
+    }
+
+def write_inspections(conn, inserts=(), updates=(), adoptions=()):
+    """
+    Insert/update inspections and rewrite their violations rows.
+
+    Keyed rows go through executemany and get their new ids back from the
+    source_id index; rows without an Inspection ID are inserted one at a time
+    for their lastrowid. Adopted legacy rows are updated by inspection_id.
+    """
+    keyed = [rec for rec, _ in inserts if rec[0] is not None]
+    conn.executemany(INSPECTION_INSERT, keyed)
+    conn.executemany(INSPECTION_UPDATE, [params for params, _ in updates])
+    conn.executemany(INSPECTION_ADOPT, [params for params, _ in adoptions])
+
+    violation_rows = []
+    for rec, violations in inserts:
+        if rec[0] is None:
+            inspection_id = conn.execute(INSPECTION_INSERT, rec).lastrowid
+            violation_rows.extend((inspection_id,) + v for v in violations)
+    changed = [(rec[0], violations) for rec, violations in inserts if rec[0] is not None and violations]
+    changed += [(params[-1], violations) for params, violations in updates]
+    ids = _lookup(conn, "SELECT source_id, inspection_id FROM inspections "
+                        "WHERE source_id IN ({})", [source_id for source_id, _ in changed])
+    conn.executemany("DELETE FROM violations WHERE inspection_id = ?",
+                     [ids[params[-1]] for params, _ in updates] +
+                     [params[-1:] for params, _ in adoptions])
+    for source_id, violations in changed:
+        violation_rows.extend(ids[source_id] + v for v in violations)
+    for params, violations in adoptions:
+        violation_rows.extend(params[-1:] + v for v in violations)
+    conn.executemany(VIOLATION_INSERT, violation_rows)
+
+def write_batch(conn, facilities, inspections, adopt=False):
+    """
+    Upsert one batch in a single transaction.
+
+    Only new or changed rows are written; `adopt` is passed to plan_batch(). Falls back to row-by-row writes if
+    the batch hits a constraint error, so one bad row only skips itself.
+
+    Returns:
+        Counter of facilities_added/updated/failed and
+        inspections_added/updated/unchanged/failed (adopted legacy rows
+        count as updated)
+    """
+    plan = plan_batch(conn, facilities, inspections, adopt)
+    facility_steps = (
+        ("facilities_added", FACILITY_INSERT, plan["facility_inserts"]),
+        ("facilities_updated", FACILITY_UPDATE, plan["facility_updates"]),
+    )
+    inserts, updates = plan["inspection_inserts"], plan["inspection_updates"]
+    adoptions = plan["inspection_adoptions"]
+    stats = Counter(inspections_unchanged=plan["inspections_unchanged"])
+    try:
+        with conn:
+            for done, sql, rows in facility_steps:
+                conn.executemany(sql, rows)
+                stats[done] += len(rows)
+            write_inspections(conn, inserts, updates, adoptions)
+        stats.update(inspections_added=len(inserts), inspections_updated=len(updates) + len(adoptions))
+        return stats
+    except sqlite3.Error as e:
+        logger.debug("Batch write failed (%s); retrying row by row", e)
+
+    stats = Counter(inspections_unchanged=plan["inspections_unchanged"])
+    with conn:
+        for done, sql, rows in facility_steps:
+            for row in rows:
+                try:
+                    conn.execute(sql, row)
+                    stats[done] += 1
+                except sqlite3.Error as e:
+                    logger.debug("Error writing facility: %s", e)
+                    stats["facilities_failed"] += 1
+        for done, entries, kind in (("inspections_added", inserts, "inserts"),
+                                    ("inspections_updated", updates, "updates"),
+                                    ("inspections_updated", adoptions, "adoptions")):
+            for entry in entries:
+                try:
+                    conn.execute("SAVEPOINT row")
+                    write_inspections(conn, **{kind: [entry]})
+                    conn.execute("RELEASE row")
+                    stats[done] += 1
+                except sqlite3.Error as e:
+                    conn.execute("ROLLBACK TO row")
+                    conn.execute("RELEASE row")
+                    logger.debug("Error writing inspection: %s", e)
+                    stats["inspections_failed"] += 1
+    return stats
+
+def begin_bulk_load(conn):
+    """
+    Put the database into bulk-load mode.
+
+    Relaxes durability (a crash mid-import means re-running it, not
+    corruption of existing pages) and drops the secondary indexes and
+    triggers on facilities/inspections so inserts only touch the tables.
+    UNIQUE indexes stay: the upsert lookups depend on them.
+
+    Returns:
+        Saved state to pass to end_bulk_load()
+    """
+    journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+    try:
+        conn.execute("PRAGMA journal_mode = MEMORY")
+    except sqlite3.OperationalError as e:
+        # Leaving WAL needs exclusive access; keep WAL if the app is running.
+        logger.warning("Keeping journal_mode=%s: %s", journal_mode, e)
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute(f"PRAGMA cache_size = {-BULK_CACHE_KIB}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+
+    objects = conn.execute("""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE type IN ('index', 'trigger') AND sql IS NOT NULL
+          AND tbl_name IN ('facilities', 'inspections')
+          AND sql NOT LIKE 'CREATE UNIQUE INDEX%'
+    """).fetchall()
+    with conn:
+        for obj in objects:
+            conn.execute(f"DROP {obj['type'].upper()} IF EXISTS {obj['name']}")
+    logger.info("Bulk mode: dropped %d indexes/triggers", len(objects))
+    return {"journal_mode": journal_mode, "synchronous": synchronous, "objects": objects}
+
+def end_bulk_load(conn, state):
+    """Recreate dropped indexes/triggers, rebuild derived data, restore PRAGMAs."""
+    start = time.perf_counter()
+    # Before the triggers and indexes are back, so it only writes the columns.
+    rebuild_latest_inspections(conn)
+    with conn:
+        for obj in state["objects"]:
+            conn.execute(obj["sql"])
+    rebuild_search_index(conn)
+    rebuild_geo_index(conn)
+    rebuild_listing_counts(conn)
+    rebuild_rollups(conn)
+    conn.execute("ANALYZE")
+    conn.execute(f"PRAGMA synchronous = {state['synchronous']}")
+    try:
+        conn.execute(f"PRAGMA journal_mode = {state['journal_mode']}")
+    except sqlite3.OperationalError as e:
+        logger.warning("Could not restore journal_mode=%s: %s", state['journal_mode'], e)
+    logger.info("Rebuilt indexes and derived data in %.1fs", time.perf_counter() - start)
+
+def import_data(limit=1000, bulk=None, batch_size=None, source=None, workers=None,
+                db_path=None, progress=None, pragmas=None):
     """
     Import data from CSV into database
     
+    Re-running an import is incremental: inspections are matched on the
+    portal's Inspection ID and facilities on license number, and only new or
+    changed rows are written.
+    
     Args:
         limit: Maximum number of records to import (default 1000)
-               Set to None to import all records (WARNING: may take a long time)
+               Set to None to import all records
+        bulk: Use bulk-load mode (relaxed durability, indexes rebuilt at the
+              end). Defaults to on for full imports.
+        batch_size: Rows per executemany/transaction (default BATCH_SIZE)
+        source: What to read (default CSV_FILE): a path (plain, .gz or .bz2),
+                '-' for stdin, an http(s) URL, or a binary file object.
+                Streams are parsed and inserted as bytes arrive.
+        workers: Parse/clean processes (default IMPORT_WORKERS; 0 = one per
+                 core). Imports that fit in one batch are parsed in-process.
+        db_path: SQLite database to write (default DB_PATH)
+        pragmas: PRAGMAs for its connection (default DB_PRAGMAS)
+        progress: Optional callback, called as progress(stage, rows,
+                  bytes_read, bytes_total, error=None) after every batch
+                  ("running"), before index rebuilds ("rebuilding") and on
+                  errors ("failed")
+    
+    Returns:
+        Counter of added/updated/unchanged/skipped rows, or None on error
     """
-    logger.info(f"Starting data import (limit: {limit if limit else 'all records'})")
+    source = source or CSV_FILE
+    batch_size = batch_size or BATCH_SIZE
+    if bulk is None:
+        bulk = limit is None
+    if workers is None:
+        workers = IMPORT_WORKERS
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    if limit and limit <= batch_size:
+        workers = 1
+    logger.info("Starting data import (limit: %s, bulk: %s, workers: %d)",
+                limit if limit else 'all records', bulk, workers)
     
-    if not os.path.exists(CSV_FILE):
-        logger.error(f"CSV file {CSV_FILE} not found. Run download_data() first.")
+    if is_local_path(source) and not os.path.exists(source):
+        logger.error("CSV file %s not found. Run download_data() first.", source)
+        if progress:
+            progress("failed", 0, 0, None, error=f"CSV file {source} not found")
         return
     
-    conn = get_db()
-    cursor = conn.cursor()
+    conn = get_db(db_path, pragmas)
     
-    # Track statistics
-    facilities_added = 0
-    facilities_skipped = 0
-    inspections_added = 0
-    inspections_skipped = 0
+    stats = Counter()
+    rows_read = 0
+    meter = ByteMeter()
     
+    start = time.perf_counter()
+    adopt = has_legacy_rows(conn)
+    if adopt:
+        logger.info("Matching inspections imported before Inspection IDs were stored")
+    bulk_state = begin_bulk_load(conn) if bulk else None
     try:
-        with open(CSV_FILE, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            
-            for i, row in enumerate(reader):
-                if limit and i >= limit:
-                    logger.info(f"Reached limit of {limit} records")
-                    break
-                
-                if i % 100 == 0:
-                    logger.info(f"Processing record {i}...")
-                
-                # Extract facility data
-                license_number = row.get('License #', '').strip()
-                if not license_number or license_number == 'None':
-                    facilities_skipped += 1
-                    continue
-                
-                dba_name = row.get('DBA Name', '').strip() or row.get('AKA Name', '').strip()
-                if not dba_name:
-                    facilities_skipped += 1
-                    continue
-                
-                facility_type = row.get('Facility Type', 'Restaurant').strip()
-                address = row.get('Address', '').strip()
-                city = row.get('City', 'Chicago').strip()
-                state = row.get('State', 'IL').strip()
-                zip_code = clean_zip(row.get('Zip', ''))
-                
-                if not zip_code:
-                    facilities_skipped += 1
-                    continue
-                
-                # Insert or update facility
-                try:
-                    cursor.execute("""
-                        INSERT OR IGNORE INTO facilities 
-                        (license_number, dba_name, facility_type, address, city, state, zip, phone)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (license_number, dba_name, facility_type, address, city, state, zip_code, None))
-                    
-                    if cursor.rowcount > 0:
-                        facilities_added += 1
-                except Exception as e:
-                    logger.debug(f"Error inserting facility: {e}")
-                    facilities_skipped += 1
-                    continue
-                
-                # Extract inspection data
-                inspection_date = parse_date(row.get('Inspection Date', ''))
-                if not inspection_date:
-                    inspections_skipped += 1
-                    continue
-                
-                inspection_type = row.get('Inspection Type', 'Routine').strip()
-                risk = map_risk(row.get('Risk', ''))
-                result = map_result(row.get('Results', ''))
-                violations = row.get('Violations', '').strip() or None
-                
-                # Insert inspection
-                try:
-                    cursor.execute("""
-                        INSERT INTO inspections 
-                        (license_number, inspection_date, inspection_type, risk, result, violations_text)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """, (license_number, inspection_date, inspection_type, risk, result, violations))
-                    
-                    if cursor.rowcount > 0:
-                        inspections_added += 1
-                except Exception as e:
-                    logger.debug(f"Error inserting inspection: {e}")
-                    inspections_skipped += 1
-        
-        conn.commit()
-        
-        # Print summary
-        logger.info("="*60)
-        logger.info("IMPORT COMPLETE")
-        logger.info("="*60)
-        logger.info(f"Facilities added: {facilities_added}")
-        logger.info(f"Facilities skipped: {facilities_skipped}")
-        logger.info(f"Inspections added: {inspections_added}")
-        logger.info(f"Inspections skipped: {inspections_skipped}")
-        logger.info("="*60)
+        with open_source(source, meter) as f:
+            chunks = read_chunks(f, limit, batch_size)
+            for n_rows, facilities, inspections, f_skipped, i_skipped in clean_chunks(chunks, workers):
+                stats += write_batch(conn, facilities, inspections, adopt)
+                stats.update(facilities_skipped=f_skipped, inspections_skipped=i_skipped)
+                rows_read += n_rows
+                elapsed = time.perf_counter() - start
+                logger.info("Processed %d records (%.0f rows/sec)", rows_read, rows_read / elapsed)
+                if progress:
+                    progress("running", rows_read, meter.bytes_read, meter.total)
         
     except Exception as e:
-        logger.error(f"Error during import: {e}")
+        logger.error("Error during import: %s", e)
         conn.rollback()
+        if progress:
+            progress("failed", rows_read, meter.bytes_read, meter.total, error=str(e))
+        return
     finally:
+        if bulk_state:
+            if progress:
+                progress("rebuilding", rows_read, meter.bytes_read, meter.total)
+            end_bulk_load(conn, bulk_state)
         conn.close()
+    
+    elapsed = time.perf_counter() - start
+    
+    # Print summary
+    logger.info("="*60)
+    logger.info("IMPORT COMPLETE")
+    logger.info("="*60)
+    logger.info("Facilities added: %d", stats['facilities_added'])
+    logger.info("Facilities updated: %d", stats['facilities_updated'])
+    logger.info("Facilities skipped: %d", stats['facilities_skipped'] + stats['facilities_failed'])
+    logger.info("Inspections added: %d", stats['inspections_added'])
+    logger.info("Inspections updated: %d", stats['inspections_updated'])
+    logger.info("Inspections unchanged: %d", stats['inspections_unchanged'])
+    logger.info("Inspections skipped: %d", stats['inspections_skipped'] + stats['inspections_failed'])
+    logger.info("Elapsed: %.1fs (%.0f rows/sec)", elapsed, rows_read / elapsed if elapsed else 0)
+    logger.info("="*60)
+    return stats
 
 def quick_stats():
     """Display quick statistics about the database"""
@@ -259,6 +877,33 @@ def quick_stats():
     
     conn.close()
 
+def cli(argv):
+    """Non-interactive entry point, e.g. `gunzip -c x.csv.gz | python import_chicago_data.py --source -`"""
+    import argparse
+    parser = argparse.ArgumentParser(description="Import Chicago food inspection data")
+    parser.add_argument("--source", default=CSV_FILE,
+                        help="CSV path (.gz/.bz2 ok), '-' for stdin, or an http(s) URL "
+                             "(use 'portal' for the Chicago Data Portal)")
+    parser.add_argument("--limit", type=int, default=None, help="import at most N records")
+    parser.add_argument("--workers", type=int, default=None, help="parse/clean processes (0 = per core)")
+    parser.add_argument("--no-bulk", action="store_true", help="keep indexes and durability during the load")
+    parser.add_argument("--rebuild-violations", action="store_true",
+                        help="re-derive the violations table from stored violation text and exit")
+    args = parser.parse_args(argv)
+    
+    if args.rebuild_violations:
+        conn = get_db()
+        try:
+            logger.info("Wrote %d violations", rebuild_violations(conn))
+        finally:
+            conn.close()
+        return
+    
+    source = CSV_URL if args.source == 'portal' else args.source
+    import_data(limit=args.limit, bulk=False if args.no_bulk else None,
+                source=source, workers=args.workers)
+    quick_stats()
+
 def main():
     """Main function to run the import"""
     print("\n🍽️  Chicago Food Inspections Data Import")
@@ -274,11 +919,12 @@ def main():
     print("1. Download latest data from Chicago Data Portal")
     print("2. Import data (first 1000 records - fast)")
     print("3. Import data (first 5000 records)")
-    print("4. Import ALL data (WARNING: slow, may take 5-10 minutes)")
-    print("5. Show current database stats")
-    print("6. Exit")
+    print("4. Import ALL data (bulk mode, about a minute)")
+    print("5. Stream ALL data straight from the portal (no download file)")
+    print("6. Show current database stats")
+    print("7. Exit")
     
-    choice = input("\nEnter choice (1-6): ").strip()
+    choice = input("\nEnter choice (1-7): ").strip()
     
     if choice == '1':
         if download_data():
@@ -313,13 +959,23 @@ def main():
                 print("✅ Import complete! Visit http://localhost:5000/ to see the data.")
     
     elif choice == '5':
-        quick_stats()
+        confirm = input("⚠️  This will stream and import ALL records (250K+). Continue? (yes/no): ")
+        if confirm.lower() == 'yes':
+            import_data(limit=None, source=CSV_URL)
+            quick_stats()
+            print("✅ Import complete! Visit http://localhost:5000/ to see the data.")
     
     elif choice == '6':
+        quick_stats()
+    
+    elif choice == '7':
         print("👋 Goodbye!")
     
     else:
         print("❌ Invalid choice")
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1:
+        cli(sys.argv[1:])
+    else:
+        main()
@@ -0,0 +1,263 @@
+"""
+Background import jobs for the admin endpoints in app.py.
+
+POST /admin/import records a job in the import_jobs table and runs
+import_chicago_data.import_data() on a worker thread, so the site keeps
+serving while it loads. The importer reports after every batch through its
+progress callback. The worker writes those figures to the job's row, so
+GET /admin/import can answer from any server process: rows processed,
+rows/sec and an ETA.
+
+Only one job may be queued or running at a time. The lock is a partial
+unique index on import_jobs (schema.sql), so it holds across worker
+processes, not just threads. A job whose process died (crash, restart)
+would hold it forever, so each job records the host, pid and a per-process
+token of its runner. Jobs whose runner is gone are marked failed the next
+time the lock is checked. Batches already committed by such a job stay;
+imports are idempotent, so running the job again picks up the rest.
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Counter, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MODES = ("sample", "full")
+ACTIVE_STATES = ("queued", "running", "rebuilding")
+ACTIVE_IN = f"state IN ({', '.join('?' * len(ACTIVE_STATES))})"  # bind ACTIVE_STATES
+NOW_SQL = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+_process_token = uuid.uuid4().hex[:12]
+
+
+class JobConflict(Exception):
+    """Another import job is queued or running."""
+
+    def __init__(self, job: Dict[str, Any]):
+        super().__init__(f"Import job {job['id']} is {job['state']}")
+        self.job = job
+
+
+def owner_id() -> str:
+    """host:pid:token of this process (a restarted process reusing a pid gets a new token)."""
+    return f"{socket.gethostname()}:{os.getpid()}:{_process_token}"
+
+
+def owner_alive(owner: Optional[str]) -> bool:
+    """Whether the process that owns a job may still be running it."""
+    if not owner or owner == owner_id():
+        return True
+    host, pid, _ = owner.rsplit(":", 2)
+    if host != socket.gethostname():
+        return True  # another machine's process: nothing to check
+    if int(pid) == os.getpid():
+        return False  # an earlier process with this pid
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """SQLite strftime('%Y-%m-%d %H:%M:%f') text (UTC) -> aware datetime."""
+    if not value:
+        return None
+    return datetime.strptime(value, TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+
+
+def describe(row: sqlite3.Row) -> Dict[str, Any]:
+    """
+    A job row as the JSON the admin endpoints return.
+
+    rows_per_sec and eta_s are as of the last progress report (updated_at,
+    once per batch). percent comes from the row limit when there is one,
+    otherwise from the bytes read of a source of known size; without either
+    there is no ETA.
+    """
+    job = {key: row[key] for key in ("id", "mode", "source", "state", "rows", "bytes_read",
+                                      "bytes_total", "error", "created_at", "started_at",
+                                      "updated_at", "finished_at")}
+    job["limit"] = row["row_limit"]
+    job["stats"] = json.loads(row["stats"]) if row["stats"] else None
+
+    started = parse_timestamp(row["started_at"])
+    updated = parse_timestamp(row["updated_at"])
+    finished = parse_timestamp(row["finished_at"])
+    now = datetime.now(timezone.utc)
+    elapsed = ((finished or now) - started).total_seconds() if started else None
+    reported = (updated - started).total_seconds() if started and updated else 0.0
+
+    fraction = None
+    if row["state"] == "succeeded":
+        fraction = 1.0
+    elif row["row_limit"]:
+        fraction = min(row["rows"] / row["row_limit"], 1.0)
+    elif row["bytes_total"]:
+        fraction = min(row["bytes_read"] / row["bytes_total"], 1.0)
+
+    eta = None
+    if row["state"] == "succeeded":
+        eta = 0.0
+    elif row["state"] == "running" and fraction and reported > 0:
+        eta = reported * (1 - fraction) / fraction
+
+    job.update(
+        elapsed_s=round(elapsed, 1) if elapsed is not None else None,
+        rows_per_sec=round(row["rows"] / reported, 1) if reported > 0 else None,
+        percent=round(fraction * 100, 1) if fraction is not None else None,
+        eta_s=round(eta, 1) if eta is not None else None,
+    )
+    return job
+
+
+class ImportJobs:
+    """
+    Starts import jobs and reports on them.
+
+    Args:
+        connect: Returns a new connection to the app's database (closed by the caller)
+        run_import: Runs one import, called as run_import(source=, limit=,
+                    bulk=, progress=); returns the stats Counter, or None
+                    if the import failed (import_data's contract)
+        on_success: Called after a job succeeds (e.g. to clear caches)
+    """
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection],
+                 run_import: Callable[..., Optional[Counter]],
+                 on_success: Optional[Callable[[], None]] = None):
+        self.connect = connect
+        self.run_import = run_import
+        self.on_success = on_success
+
+    def submit(self, mode: str, source: str, limit: Optional[int], bulk: bool = False) -> Dict[str, Any]:
+        """
+        Queue an import and start its worker.
+
+        Returns:
+            The queued job (describe())
+
+        Raises:
+            JobConflict: Another job is queued or running
+        """
+        conn = self.connect()
+        try:
+            self.reap(conn)
+            try:
+                with conn:
+                    job_id = conn.execute(
+                        "INSERT INTO import_jobs (mode, source, row_limit, owner) VALUES (?, ?, ?, ?)",
+                        (mode, source, limit, owner_id())).lastrowid
+            except sqlite3.IntegrityError:
+                active = self._active(conn)
+                if active is None:
+                    raise
+                raise JobConflict(describe(active))
+            job = describe(self._fetch(conn, job_id))
+        finally:
+            conn.close()
+
+        # A daemon thread, so stopping the server is not held up by a long
+        # import; the job is then reaped as failed.
+        threading.Thread(target=self._run, args=(job_id, source, limit, bulk),
+                         name=f"import-job-{job_id}", daemon=True).start()
+        logger.info("Queued import job %d (%s, %s)", job_id, mode, source,
+                    extra={"event": "import_job", "job_id": job_id, "state": "queued"})
+        return job
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """The job with this id, or None."""
+        conn = self.connect()
+        try:
+            self.reap(conn)
+            row = self._fetch(conn, job_id)
+            return describe(row) if row else None
+        finally:
+            conn.close()
+
+    def current(self) -> Optional[Dict[str, Any]]:
+        """The active job if there is one, else the most recent; None if none ever ran."""
+        conn = self.connect()
+        try:
+            self.reap(conn)
+            row = self._active(conn) or conn.execute(
+                "SELECT * FROM import_jobs ORDER BY id DESC LIMIT 1").fetchone()
+            return describe(row) if row else None
+        finally:
+            conn.close()
+
+    def reap(self, conn: sqlite3.Connection) -> None:
+        """Fail the active job if the process running it is gone, releasing the lock."""
+        active = self._active(conn)
+        if active is not None and not owner_alive(active["owner"]):
+            logger.warning("Import job %d was abandoned by %s", active["id"], active["owner"],
+                           extra={"event": "import_job", "job_id": active["id"], "state": "failed"})
+            self._finish(conn, active["id"], "failed", None, "The process running this import exited")
+
+    def _active(self, conn: sqlite3.Connection) -> Optional[sqlite3.Row]:
+        return conn.execute(f"SELECT * FROM import_jobs WHERE {ACTIVE_IN}", ACTIVE_STATES).fetchone()
+
+    def _fetch(self, conn: sqlite3.Connection, job_id: int) -> Optional[sqlite3.Row]:
+        return conn.execute("SELECT * FROM import_jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def _finish(self, conn: sqlite3.Connection, job_id: int, state: str,
+                stats: Optional[Counter], error: Optional[str]) -> None:
+        with conn:
+            conn.execute(f"""
+                UPDATE import_jobs
+                SET state = ?, stats = ?, error = ?, finished_at = {NOW_SQL}, updated_at = {NOW_SQL}
+                WHERE id = ? AND {ACTIVE_IN}
+            """, (state, json.dumps(dict(stats)) if stats is not None else None, error, job_id,
+                  *ACTIVE_STATES))
+
+    def _run(self, job_id: int, source: str, limit: Optional[int], bulk: bool) -> None:
+        """Worker thread: run the import, writing its progress to the job's row."""
+        conn = self.connect()
+        errors = []
+
+        def progress(stage, rows, bytes_read, bytes_total, error=None):
+            if error:
+                errors.append(error)
+                return  # import_data returns None next; _finish records it
+            with conn:
+                conn.execute(f"""
+                    UPDATE import_jobs
+                    SET state = ?, rows = ?, bytes_read = ?, bytes_total = ?, updated_at = {NOW_SQL}
+                    WHERE id = ?
+                """, (stage, rows, bytes_read, bytes_total, job_id))
+
+        try:
+            with conn:
+                conn.execute(f"""
+                    UPDATE import_jobs SET state = 'running', started_at = {NOW_SQL}, updated_at = {NOW_SQL}
+                    WHERE id = ?
+                """, (job_id,))
+            try:
+                stats = self.run_import(source=source, limit=limit, bulk=bulk, progress=progress)
+            except Exception as e:
+                logger.exception("Import job %d crashed", job_id)
+                stats, errors = None, [str(e)]
+            if stats is None:
+                self._finish(conn, job_id, "failed", None,
+                             errors[-1] if errors else "Import failed; see app.log")
+            else:
+                self._finish(conn, job_id, "succeeded", stats, None)
+                if self.on_success:
+                    self.on_success()
+            logger.info("Import job %d %s", job_id, "failed" if stats is None else "succeeded",
+                        extra={"event": "import_job", "job_id": job_id,
+                               "state": "failed" if stats is None else "succeeded"})
+        except Exception:
+            logger.exception("Import job %d: could not record its state", job_id)
+        finally:
+            conn.close()
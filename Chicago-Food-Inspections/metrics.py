@@ -0,0 +1,113 @@
+"""
+Request and SQL metrics in Prometheus text format.
+
+app.py records one observation per request: latency by endpoint, plus the
+number of SQL statements and the time spent in them (measured by the
+InstrumentedConnection that get_db() hands out). Everything is kept in
+fixed-bucket histograms and counters behind one lock, so recording is a few
+dict lookups and additions. Values are per process; Prometheus sums them
+across workers.
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram for one label set (caller holds the lock)."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Registry of the app's request/SQL metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests: Dict[Labels, int] = {}
+        self._latency: Dict[Labels, Histogram] = {}
+        self._sql_seconds: Dict[Labels, Histogram] = {}
+        self._sql_queries: Dict[Labels, Histogram] = {}
+
+    def observe_request(self, endpoint: str, method: str, status: int, seconds: float,
+                        queries: int, sql_seconds: float) -> None:
+        """Record one finished request."""
+        route = (("endpoint", endpoint), ("method", method))
+        with self._lock:
+            key = route + (("status", str(status)),)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            self._histogram(self._latency, route, LATENCY_BUCKETS).observe(seconds)
+            self._histogram(self._sql_seconds, route, LATENCY_BUCKETS).observe(sql_seconds)
+            self._histogram(self._sql_queries, route, QUERY_COUNT_BUCKETS).observe(queries)
+
+    @staticmethod
+    def _histogram(table: Dict[Labels, Histogram], labels: Labels, buckets) -> Histogram:
+        histogram = table.get(labels)
+        if histogram is None:
+            histogram = table[labels] = Histogram(buckets)
+        return histogram
+
+    def render(self, extra: Iterable[Tuple[str, str, str, float]] = ()) -> str:
+        """
+        Prometheus text exposition of every metric.
+
+        Args:
+            extra: (name, type, help, value) samples to append, e.g. gauges
+                   owned by other components
+        """
+        lines: List[str] = []
+        with self._lock:
+            lines += _header("http_requests_total", "counter", "Requests by endpoint, method and status.")
+            for labels, n in sorted(self._requests.items()):
+                lines.append(f"http_requests_total{_labels(labels)} {n}")
+            for name, help_text, table in (
+                ("http_request_duration_seconds", "Request latency by endpoint.", self._latency),
+                ("db_request_seconds", "Time spent in SQL per request.", self._sql_seconds),
+                ("db_request_queries", "SQL statements executed per request.", self._sql_queries),
+            ):
+                lines += _header(name, "histogram", help_text)
+                for labels, histogram in sorted(table.items()):
+                    lines += _histogram_lines(name, labels, histogram)
+        for name, kind, help_text, value in extra:
+            lines += _header(name, kind, help_text)
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _header(name: str, kind: str, help_text: str) -> List[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+
+def _labels(labels: Labels) -> str:
+    escaped = (k + '="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+               for k, v in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _histogram_lines(name: str, labels: Labels, histogram: Histogram) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, n in zip(histogram.buckets + (float("inf"),), histogram.counts):
+        cumulative += n
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+    lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+    lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+    return lines
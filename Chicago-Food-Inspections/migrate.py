@@ -0,0 +1,243 @@
+"""
+Versioned, non-destructive schema migrations.
+
+schema.sql builds a fresh database at the latest version, and init_db() then
+stamps every migration as applied. An existing database is brought up to
+date by applying migrations/NNNN_description.sql files in version order.
+0000_baseline carries a database built from the original schema.sql to the
+schema the numbered series starts from; databases that already have that
+schema (built by a newer schema.sql before migrations existed) are stamped
+with it instead.
+Each file runs in one IMMEDIATE transaction together with its
+schema_migrations row, so a failed migration leaves nothing behind and two
+processes starting at once cannot apply the same version twice.
+
+SQLite builds an index while holding the write lock. In WAL mode readers
+keep being served; writers wait (up to SQLITE_BUSY_TIMEOUT), so run large
+index builds outside import windows.
+
+Usage:
+    python migrate.py               # apply pending migrations
+    python migrate.py --status
+    python migrate.py --target 3    # stop after version 3
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from config import Config
+from db import open_connection
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_FILE_RE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+BASELINE_VERSION = 0
+
+MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+      version      INTEGER PRIMARY KEY,
+      name         TEXT NOT NULL,
+      checksum     TEXT NOT NULL,
+      applied_at   TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+      duration_ms  REAL NOT NULL DEFAULT 0
+    )
+"""
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    sql: str
+    checksum: str
+
+
+def discover(directory: str) -> List[Migration]:
+    """
+    Load migrations/NNNN_name.sql files in version order.
+
+    Raises:
+        ValueError: if two files share a version number
+    """
+    migrations: Dict[int, Migration] = {}
+    for filename in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+        match = MIGRATION_FILE_RE.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f"Duplicate migration version {version}: {filename}")
+        with open(os.path.join(directory, filename), "r", encoding="utf-8") as f:
+            sql = f.read()
+        checksum = hashlib.blake2b(sql.encode("utf-8"), digest_size=8).hexdigest()
+        migrations[version] = Migration(version, match.group(2), sql, checksum)
+    return [migrations[v] for v in sorted(migrations)]
+
+
+def split_statements(sql: str) -> List[str]:
+    """Split a script into statements (trigger bodies stay whole)."""
+    statements, current = [], ""
+    for line in sql.splitlines(keepends=True):
+        current += line
+        if sqlite3.complete_statement(current):
+            if current.strip().rstrip(";").strip():
+                statements.append(current.strip())
+            current = ""
+    if re.sub(r"--[^\n]*", "", current).strip():
+        raise ValueError(f"Incomplete SQL statement: {current.strip()[:80]}")
+    return statements
+
+
+def applied_versions(conn: sqlite3.Connection) -> Dict[int, sqlite3.Row]:
+    """version -> schema_migrations row (creates the table on older databases)."""
+    conn.execute(MIGRATIONS_TABLE)
+    conn.commit()
+    return {row[0]: row for row in conn.execute(
+        "SELECT version, name, checksum, applied_at, duration_ms FROM schema_migrations")}
+
+
+def has_baseline(conn: sqlite3.Connection) -> bool:
+    """Whether the schema already includes 0000_baseline (its last column added is inspections.source_id)."""
+    return conn.execute("SELECT 1 FROM pragma_table_info('inspections') "
+                        "WHERE name = 'source_id'").fetchone() is not None
+
+
+def record(conn: sqlite3.Connection, migrations: List[Migration]) -> None:
+    """Mark migrations as applied without running them."""
+    with conn:
+        conn.executemany("""
+            INSERT OR IGNORE INTO schema_migrations (version, name, checksum)
+            VALUES (?, ?, ?)
+        """, [(m.version, m.name, m.checksum) for m in migrations])
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    """Highest applied migration version (0 for none)."""
+    return max(applied_versions(conn), default=0)
+
+
+def apply_migration(conn: sqlite3.Connection, migration: Migration) -> Optional[float]:
+    """
+    Apply one migration in its own transaction.
+
+    Returns:
+        Seconds taken, or None if another process applied it first
+    """
+    start = time.perf_counter()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM schema_migrations WHERE version = ?",
+                        (migration.version,)).fetchone():
+            conn.rollback()
+            return None
+        for statement in split_statements(migration.sql):
+            conn.execute(statement)
+        elapsed = time.perf_counter() - start
+        conn.execute("""
+            INSERT INTO schema_migrations (version, name, checksum, duration_ms)
+            VALUES (?, ?, ?, ?)
+        """, (migration.version, migration.name, migration.checksum, round(elapsed * 1000, 3)))
+        conn.commit()
+        return elapsed
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def migrate(conn: sqlite3.Connection, directory: str,
+            target: Optional[int] = None) -> List[Tuple[Migration, float]]:
+    """
+    Apply every pending migration up to `target` (default: all), in order.
+
+    Returns:
+        List of (migration, seconds) actually applied
+    """
+    applied = applied_versions(conn)
+    done = []
+    for migration in discover(directory):
+        if target is not None and migration.version > target:
+            break
+        if migration.version in applied:
+            if applied[migration.version]["checksum"] != migration.checksum:
+                logger.warning("Migration %04d_%s changed after it was applied",
+                               migration.version, migration.name)
+            continue
+        if migration.version == BASELINE_VERSION and has_baseline(conn):
+            logger.info("Schema already includes %04d_%s; marking it applied",
+                        migration.version, migration.name)
+            record(conn, [migration])
+            continue
+        logger.info("Applying migration %04d_%s...", migration.version, migration.name)
+        elapsed = apply_migration(conn, migration)
+        if elapsed is not None:
+            logger.info("Applied migration %04d_%s in %.1f ms",
+                        migration.version, migration.name, elapsed * 1000)
+            done.append((migration, elapsed))
+    return done
+
+
+def stamp(conn: sqlite3.Connection, directory: str) -> None:
+    """Mark every migration as applied (for databases just built from schema.sql)."""
+    applied_versions(conn)
+    record(conn, discover(directory))
+
+
+def status(conn: sqlite3.Connection, directory: str) -> List[Dict]:
+    """Every known or applied migration with its state (applied, pending, modified, missing)."""
+    applied = applied_versions(conn)
+    rows = []
+    for migration in discover(directory):
+        row = applied.pop(migration.version, None)
+        state = ("pending" if row is None else
+                 "modified" if row["checksum"] != migration.checksum else "applied")
+        rows.append({"version": migration.version, "name": migration.name, "state": state,
+                     "applied_at": row["applied_at"] if row else None,
+                     "duration_ms": row["duration_ms"] if row else None})
+    for version, row in applied.items():  # applied, but the file is gone
+        rows.append({"version": version, "name": row["name"], "state": "missing",
+                     "applied_at": row["applied_at"], "duration_ms": row["duration_ms"]})
+    return sorted(rows, key=lambda r: r["version"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply schema migrations without losing data")
+    parser.add_argument("--db", default=str(Config.DATABASE_PATH))
+    parser.add_argument("--dir", default=str(Config.MIGRATIONS_DIR), help="migrations directory")
+    parser.add_argument("--target", type=int, default=None, help="apply up to this version")
+    parser.add_argument("--status", action="store_true", help="list migrations and exit")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if not os.path.exists(args.db):
+        sys.exit(f"{args.db} not found; create it with `python app.py` or /init first")
+    conn = open_connection(args.db, {"busy_timeout": Config.SQLITE_BUSY_TIMEOUT})
+    try:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'facilities'").fetchone():
+            sys.exit(f"{args.db} has no schema; create it with `python app.py` or /init first")
+        if args.status:
+            for row in status(conn, args.dir):
+                timing = f"{row['duration_ms']:.1f} ms" if row["duration_ms"] is not None else ""
+                print(f"{row['version']:04d}  {row['name']:<40}{row['state']:<10}"
+                      f"{row['applied_at'] or '':<25}{timing}")
+            return
+        start = time.perf_counter()
+        done = migrate(conn, args.dir, args.target)
+        if not done:
+            print(f"Up to date (version {current_version(conn)})")
+            return
+        for migration, elapsed in done:
+            print(f"{migration.version:04d}_{migration.name}: {elapsed * 1000:.1f} ms")
+        print(f"Applied {len(done)} migration(s) in {time.perf_counter() - start:.2f}s; "
+              f"now at version {current_version(conn)}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+-- Brings a database built from the original schema.sql (before migrations
+-- existed) up to the schema 0001 starts from: full-text search, listing
+-- counters, chart rollups, the importer's source/hash columns, the
+-- violation and updated_at indexes and millisecond updated_at triggers.
+-- Derived tables are rebuilt from the existing rows. migrate.py stamps this
+-- migration without running it on databases that already have that schema.
+--
+-- created_at/updated_at defaults cannot be changed in place, so rows
+-- inserted later still start with second precision; the triggers below
+-- give every update millisecond precision. Inspections imported before
+-- this migration have no violations rows yet: run
+-- `python import_chicago_data.py --rebuild-violations` once.
+
+ALTER TABLE facilities ADD COLUMN content_hash TEXT;
+ALTER TABLE facilities ADD COLUMN source_date TEXT;
+ALTER TABLE inspections ADD COLUMN source_id INTEGER;
+ALTER TABLE inspections ADD COLUMN content_hash TEXT;
+
+-- Existing rows have no Inspection ID. Mark them (LEGACY_HASH in
+-- import_chicago_data.py) so the next import matches them on license, date
+-- and type and fills in source_id instead of inserting them again.
+UPDATE inspections SET content_hash = 'pre-source-id';
+
+-- Indexes ---------------------------------------------------------------------
+CREATE INDEX IF NOT EXISTS idx_inspections_date_id ON inspections (inspection_date, inspection_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_inspections_source_id ON inspections (source_id);
+CREATE INDEX IF NOT EXISTS idx_violations_code ON violations (code, inspection_id);
+CREATE INDEX IF NOT EXISTS idx_violations_inspection ON violations (inspection_id);
+CREATE INDEX IF NOT EXISTS idx_inspections_license_updated ON inspections (license_number, updated_at);
+CREATE INDEX IF NOT EXISTS idx_inspections_updated ON inspections (updated_at);
+CREATE INDEX IF NOT EXISTS idx_facilities_updated ON facilities (updated_at);
+
+-- updated_at triggers -----------------------------------------------------------
+DROP TRIGGER IF EXISTS trg_facilities_updated_at;
+CREATE TRIGGER trg_facilities_updated_at
+AFTER UPDATE ON facilities
+FOR EACH ROW BEGIN
+  UPDATE facilities SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE license_number = NEW.license_number;
+END;
+
+DROP TRIGGER IF EXISTS trg_inspections_updated_at;
+CREATE TRIGGER trg_inspections_updated_at
+AFTER UPDATE ON inspections
+FOR EACH ROW BEGIN
+  UPDATE inspections SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE inspection_id = NEW.inspection_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_facilities_touch_inspection_delete
+AFTER DELETE ON inspections
+FOR EACH ROW BEGIN
+  UPDATE facilities SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE license_number = OLD.license_number;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_facilities_touch_inspection_move
+AFTER UPDATE OF license_number ON inspections
+FOR EACH ROW WHEN OLD.license_number IS NOT NEW.license_number
+BEGIN
+  UPDATE facilities SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE license_number = OLD.license_number;
+END;
+
+-- Listing counters --------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS inspection_counts (
+  result  TEXT NOT NULL,
+  risk    TEXT NOT NULL,
+  n       INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (result, risk)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS listing_counters (
+  name  TEXT PRIMARY KEY,
+  n     INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+DELETE FROM inspection_counts;
+INSERT INTO inspection_counts (result, risk, n)
+SELECT result, risk, COUNT(*) FROM inspections GROUP BY result, risk;
+
+INSERT OR REPLACE INTO listing_counters (name, n)
+SELECT 'uninspected_facilities', COUNT(*) FROM facilities f
+WHERE NOT EXISTS (SELECT 1 FROM inspections i WHERE i.license_number = f.license_number);
+
+CREATE TRIGGER IF NOT EXISTS trg_counts_inspection_insert
+AFTER INSERT ON inspections
+FOR EACH ROW BEGIN
+  INSERT INTO inspection_counts (result, risk, n) VALUES (NEW.result, NEW.risk, 1)
+  ON CONFLICT (result, risk) DO UPDATE SET n = n + 1;
+  UPDATE listing_counters SET n = n - 1
+  WHERE name = 'uninspected_facilities'
+    AND NOT EXISTS (SELECT 1 FROM inspections
+                    WHERE license_number = NEW.license_number
+                      AND inspection_id <> NEW.inspection_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counts_inspection_delete
+AFTER DELETE ON inspections
+FOR EACH ROW BEGIN
+  UPDATE inspection_counts SET n = n - 1 WHERE result = OLD.result AND risk = OLD.risk;
+  UPDATE listing_counters SET n = n + 1
+  WHERE name = 'uninspected_facilities'
+    AND EXISTS (SELECT 1 FROM facilities WHERE license_number = OLD.license_number)
+    AND NOT EXISTS (SELECT 1 FROM inspections WHERE license_number = OLD.license_number);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counts_inspection_update
+AFTER UPDATE OF result, risk ON inspections
+FOR EACH ROW WHEN OLD.result <> NEW.result OR OLD.risk <> NEW.risk BEGIN
+  UPDATE inspection_counts SET n = n - 1 WHERE result = OLD.result AND risk = OLD.risk;
+  INSERT INTO inspection_counts (result, risk, n) VALUES (NEW.result, NEW.risk, 1)
+  ON CONFLICT (result, risk) DO UPDATE SET n = n + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counts_inspection_move
+AFTER UPDATE OF license_number ON inspections
+FOR EACH ROW WHEN OLD.license_number <> NEW.license_number BEGIN
+  UPDATE listing_counters SET n = n + 1
+  WHERE name = 'uninspected_facilities'
+    AND NOT EXISTS (SELECT 1 FROM inspections WHERE license_number = OLD.license_number);
+  UPDATE listing_counters SET n = n - 1
+  WHERE name = 'uninspected_facilities'
+    AND NOT EXISTS (SELECT 1 FROM inspections
+                    WHERE license_number = NEW.license_number
+                      AND inspection_id <> NEW.inspection_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counts_facility_insert
+AFTER INSERT ON facilities
+FOR EACH ROW BEGIN
+  UPDATE listing_counters SET n = n + 1 WHERE name = 'uninspected_facilities';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counts_facility_delete
+BEFORE DELETE ON facilities
+FOR EACH ROW BEGIN
+  UPDATE listing_counters SET n = n - 1
+  WHERE name = 'uninspected_facilities'
+    AND NOT EXISTS (SELECT 1 FROM inspections WHERE license_number = OLD.license_number);
+END;
+
+-- Chart rollups -----------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS rollup_grains (
+  grain  TEXT PRIMARY KEY,
+  width  INTEGER NOT NULL
+) WITHOUT ROWID;
+
+INSERT OR IGNORE INTO rollup_grains (grain, width) VALUES ('day', 10), ('month', 7);
+
+CREATE TABLE IF NOT EXISTS inspection_rollups (
+  grain          TEXT NOT NULL,
+  period         TEXT NOT NULL,
+  result         TEXT NOT NULL,
+  risk           TEXT NOT NULL,
+  facility_type  TEXT NOT NULL,
+  zip            TEXT NOT NULL,
+  n              INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (grain, period, result, risk, facility_type, zip)
+) WITHOUT ROWID;
+
+DELETE FROM inspection_rollups;
+INSERT INTO inspection_rollups (grain, period, result, risk, facility_type, zip, n)
+SELECT g.grain, substr(i.inspection_date, 1, g.width), i.result, i.risk,
+       f.facility_type, f.zip, COUNT(*)
+FROM rollup_grains g, inspections i
+JOIN facilities f ON f.license_number = i.license_number
+GROUP BY 1, 2, 3, 4, 5, 6;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollups_inspection_insert
+AFTER INSERT ON inspections
+FOR EACH ROW BEGIN
+  INSERT INTO inspection_rollups (grain, period, result, risk, facility_type, zip, n)
+  SELECT g.grain, substr(NEW.inspection_date, 1, g.width), NEW.result, NEW.risk, f.facility_type, f.zip, 1
+  FROM rollup_grains g, facilities f
+  WHERE f.license_number = NEW.license_number
+  ON CONFLICT (grain, period, result, risk, facility_type, zip) DO UPDATE SET n = n + excluded.n;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollups_inspection_delete
+AFTER DELETE ON inspections
+FOR EACH ROW BEGIN
+  INSERT INTO inspection_rollups (grain, period, result, risk, facility_type, zip, n)
+  SELECT g.grain, substr(OLD.inspection_date, 1, g.width), OLD.result, OLD.risk, f.facility_type, f.zip, -1
+  FROM rollup_grains g, facilities f
+  WHERE f.license_number = OLD.license_number
+  ON CONFLICT (grain, period, result, risk, facility_type, zip) DO UPDATE SET n = n + excluded.n;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollups_inspection_update
+AFTER UPDATE OF inspection_date, result, risk, license_number ON inspections
+FOR EACH ROW BEGIN
+  INSERT INTO inspection_rollups (grain, period, result, risk, facility_type, zip, n)
+  SELECT g.grain, substr(OLD.inspection_date, 1, g.width), OLD.result, OLD.risk, f.facility_type, f.zip, -1
+  FROM rollup_grains g, facilities f
+  WHERE f.license_number = OLD.license_number
+  ON CONFLICT (grain, period, result, risk, facility_type, zip) DO UPDATE SET n = n + excluded.n;
+  INSERT INTO inspection_rollups (grain, period, result, risk, facility_type, zip, n)
+  SELECT g.grain, substr(NEW.inspection_date, 1, g.width), NEW.result, NEW.risk, f.facility_type, f.zip, 1
+  FROM rollup_grains g, facilities f
+  WHERE f.license_number = NEW.license_number
+  ON CONFLICT (grain, period, result, risk, facility_type, zip) DO UPDATE SET n = n + excluded.n;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollups_facility_update
+AFTER UPDATE OF facility_type, zip ON facilities
+FOR EACH ROW WHEN OLD.facility_type IS NOT NEW.facility_type OR OLD.zip IS NOT NEW.zip
+BEGIN
+  INSERT INTO inspection_rollups (grain, period, result, risk, facility_type, zip, n)
+  SELECT g.grain, substr(i.inspection_date, 1, g.width), i.result, i.risk, OLD.facility_type, OLD.zip, -COUNT(*)
+  FROM rollup_grains g, inspections i
+  WHERE i.license_number = NEW.license_number
+  GROUP BY 1, 2, 3, 4
+  ON CONFLICT (grain, period, result, risk, facility_type, zip) DO UPDATE SET n = n + excluded.n;
+  INSERT INTO inspection_rollups (grain, period, result, risk, facility_type, zip, n)
+  SELECT g.grain, substr(i.inspection_date, 1, g.width), i.result, i.risk, NEW.facility_type, NEW.zip, COUNT(*)
+  FROM rollup_grains g, inspections i
+  WHERE i.license_number = NEW.license_number
+  GROUP BY 1, 2, 3, 4
+  ON CONFLICT (grain, period, result, risk, facility_type, zip) DO UPDATE SET n = n + excluded.n;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollups_facility_delete
+BEFORE DELETE ON facilities
+FOR EACH ROW BEGIN
+  INSERT INTO inspection_rollups (grain, period, result, risk, facility_type, zip, n)
+  SELECT g.grain, substr(i.inspection_date, 1, g.width), i.result, i.risk, OLD.facility_type, OLD.zip, -COUNT(*)
+  FROM rollup_grains g, inspections i
+  WHERE i.license_number = OLD.license_number
+  GROUP BY 1, 2, 3, 4
+  ON CONFLICT (grain, period, result, risk, facility_type, zip) DO UPDATE SET n = n + excluded.n;
+END;
+
+-- Full-text search --------------------------------------------------------------
+CREATE VIRTUAL TABLE IF NOT EXISTS facilities_fts USING fts5(
+  dba_name,
+  address,
+  facility_type,
+  content='facilities',
+  content_rowid='rowid',
+  tokenize='unicode61 remove_diacritics 2',
+  prefix='2 3'
+);
+
+INSERT INTO facilities_fts(facilities_fts) VALUES('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS trg_facilities_fts_insert
+AFTER INSERT ON facilities
+FOR EACH ROW BEGIN
+  INSERT INTO facilities_fts (rowid, dba_name, address, facility_type)
+  VALUES (NEW.rowid, NEW.dba_name, NEW.address, NEW.facility_type);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_facilities_fts_delete
+AFTER DELETE ON facilities
+FOR EACH ROW BEGIN
+  INSERT INTO facilities_fts (facilities_fts, rowid, dba_name, address, facility_type)
+  VALUES ('delete', OLD.rowid, OLD.dba_name, OLD.address, OLD.facility_type);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_facilities_fts_update
+AFTER UPDATE OF dba_name, address, facility_type ON facilities
+FOR EACH ROW BEGIN
+  INSERT INTO facilities_fts (facilities_fts, rowid, dba_name, address, facility_type)
+  VALUES ('delete', OLD.rowid, OLD.dba_name, OLD.address, OLD.facility_type);
+  INSERT INTO facilities_fts (rowid, dba_name, address, facility_type)
+  VALUES (NEW.rowid, NEW.dba_name, NEW.address, NEW.facility_type);
+END;
@@ -0,0 +1,11 @@
+-- home() filters on result and/or risk and orders by inspection date. With
+-- the filter columns leading, each combination is an index range already in
+-- date order, so deep pages stop walking idx_inspections_date_id and
+-- discarding non-matching rows. (inspection_date, result, risk) would not
+-- help: the planner cannot use it for ORDER BY inspection_date, inspection_id.
+CREATE INDEX IF NOT EXISTS idx_inspections_result_date ON inspections (result, inspection_date);
+CREATE INDEX IF NOT EXISTS idx_inspections_result_risk_date ON inspections (result, risk, inspection_date);
+CREATE INDEX IF NOT EXISTS idx_inspections_risk_date ON inspections (risk, inspection_date);
+
+-- A prefix of idx_inspections_result_date, so it only costs writes now.
+DROP INDEX IF EXISTS idx_inspections_result;
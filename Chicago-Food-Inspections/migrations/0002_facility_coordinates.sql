@@ -0,0 +1,35 @@
+-- Facility coordinates from the portal's Latitude/Longitude columns, plus an
+-- R*Tree over them for /nearby. Existing rows stay NULL (and out of the
+-- index) until the next import: the coordinates are part of the facility
+-- content hash, so every facility with coordinates is rewritten then.
+ALTER TABLE facilities ADD COLUMN latitude REAL;
+ALTER TABLE facilities ADD COLUMN longitude REAL;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS facilities_geo USING rtree(
+  id,
+  min_lat, max_lat,
+  min_lon, max_lon
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_facilities_geo_insert
+AFTER INSERT ON facilities
+FOR EACH ROW WHEN NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL
+BEGIN
+  INSERT INTO facilities_geo (id, min_lat, max_lat, min_lon, max_lon)
+  VALUES (NEW.rowid, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_facilities_geo_update
+AFTER UPDATE OF latitude, longitude ON facilities
+FOR EACH ROW BEGIN
+  DELETE FROM facilities_geo WHERE id = OLD.rowid;
+  INSERT INTO facilities_geo (id, min_lat, max_lat, min_lon, max_lon)
+  SELECT NEW.rowid, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude
+  WHERE NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_facilities_geo_delete
+AFTER DELETE ON facilities
+FOR EACH ROW BEGIN
+  DELETE FROM facilities_geo WHERE id = OLD.rowid;
+END;
@@ -0,0 +1,104 @@
+-- Latest inspection per facility, for the facility view of home(): the
+-- facility's inspection count and its newest inspection's id, date, result
+-- and risk, kept current by triggers so the listing is one indexed scan of
+-- facilities instead of a window over every inspection, plus facility_counts
+-- for its totals. Backfills existing rows once (rebuild_latest_inspections()
+-- and rebuild_listing_counts() in db.py do the same after bulk loads).
+ALTER TABLE facilities ADD COLUMN inspection_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE facilities ADD COLUMN last_inspection_id INTEGER;
+ALTER TABLE facilities ADD COLUMN last_inspection_date TEXT;
+ALTER TABLE facilities ADD COLUMN last_result TEXT;
+ALTER TABLE facilities ADD COLUMN last_risk TEXT;
+
+UPDATE facilities
+SET inspection_count = s.n, last_inspection_id = s.inspection_id,
+    last_inspection_date = s.inspection_date, last_result = s.result, last_risk = s.risk
+FROM (
+    SELECT license_number, inspection_id, inspection_date, result, risk, n
+    FROM (SELECT license_number, inspection_id, inspection_date, result, risk,
+                 COUNT(*) OVER w AS n,
+                 ROW_NUMBER() OVER (w ORDER BY inspection_date DESC, inspection_id DESC) AS rn
+          FROM inspections
+          WINDOW w AS (PARTITION BY license_number))
+    WHERE rn = 1) s
+WHERE facilities.license_number = s.license_number
+  AND (facilities.inspection_count, facilities.last_inspection_id, facilities.last_inspection_date,
+       facilities.last_result, facilities.last_risk)
+      IS NOT (s.n, s.inspection_id, s.inspection_date, s.result, s.risk);
+
+-- Listing totals for the facilities view, like inspection_counts.
+CREATE TABLE IF NOT EXISTS facility_counts (
+  result  TEXT NOT NULL,
+  risk    TEXT NOT NULL,
+  n       INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (result, risk)
+) WITHOUT ROWID;
+
+INSERT INTO facility_counts (result, risk, n)
+SELECT last_result, last_risk, COUNT(*) FROM facilities
+WHERE last_result IS NOT NULL GROUP BY last_result, last_risk;
+
+CREATE INDEX IF NOT EXISTS idx_facilities_last_date ON facilities (last_inspection_date, license_number);
+CREATE INDEX IF NOT EXISTS idx_facilities_last_result_date ON facilities (last_result, last_inspection_date, license_number);
+
+CREATE TRIGGER IF NOT EXISTS trg_latest_inspection_insert
+AFTER INSERT ON inspections
+FOR EACH ROW BEGIN
+  UPDATE facilities
+  SET inspection_count = inspection_count + 1,
+      (last_inspection_id, last_inspection_date, last_result, last_risk) = (
+        SELECT inspection_id, inspection_date, result, risk FROM inspections
+        WHERE license_number = NEW.license_number
+        ORDER BY inspection_date DESC, inspection_id DESC LIMIT 1)
+  WHERE license_number = NEW.license_number;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_latest_inspection_delete
+AFTER DELETE ON inspections
+FOR EACH ROW BEGIN
+  UPDATE facilities
+  SET inspection_count = inspection_count - 1,
+      (last_inspection_id, last_inspection_date, last_result, last_risk) = (
+        SELECT inspection_id, inspection_date, result, risk FROM inspections
+        WHERE license_number = OLD.license_number
+        ORDER BY inspection_date DESC, inspection_id DESC LIMIT 1)
+  WHERE license_number = OLD.license_number;
+END;
+
+-- Covers both facilities when an inspection moves between them.
+CREATE TRIGGER IF NOT EXISTS trg_latest_inspection_update
+AFTER UPDATE OF license_number, inspection_date, result, risk ON inspections
+FOR EACH ROW BEGIN
+  UPDATE facilities
+  SET inspection_count = inspection_count + (license_number = NEW.license_number)
+                                           - (license_number = OLD.license_number),
+      (last_inspection_id, last_inspection_date, last_result, last_risk) = (
+        SELECT i.inspection_id, i.inspection_date, i.result, i.risk FROM inspections i
+        WHERE i.license_number = facilities.license_number
+        ORDER BY i.inspection_date DESC, i.inspection_id DESC LIMIT 1)
+  WHERE license_number IN (OLD.license_number, NEW.license_number);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_facility_counts_insert
+AFTER INSERT ON facilities
+FOR EACH ROW WHEN NEW.last_result IS NOT NULL BEGIN
+  INSERT INTO facility_counts (result, risk, n) VALUES (NEW.last_result, NEW.last_risk, 1)
+  ON CONFLICT (result, risk) DO UPDATE SET n = n + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_facility_counts_update
+AFTER UPDATE OF last_result, last_risk ON facilities
+FOR EACH ROW WHEN OLD.last_result IS NOT NEW.last_result OR OLD.last_risk IS NOT NEW.last_risk
+BEGIN
+  UPDATE facility_counts SET n = n - 1 WHERE result = OLD.last_result AND risk = OLD.last_risk;
+  INSERT INTO facility_counts (result, risk, n)
+  SELECT NEW.last_result, NEW.last_risk, 1 WHERE NEW.last_result IS NOT NULL
+  ON CONFLICT (result, risk) DO UPDATE SET n = n + 1;
+END;
+
+-- AFTER: a CASCADE has left the facility's last_* as they were.
+CREATE TRIGGER IF NOT EXISTS trg_facility_counts_delete
+AFTER DELETE ON facilities
+FOR EACH ROW WHEN OLD.last_result IS NOT NULL BEGIN
+  UPDATE facility_counts SET n = n - 1 WHERE result = OLD.last_result AND risk = OLD.last_risk;
+END;
@@ -0,0 +1,25 @@
+-- Background import jobs started over HTTP (POST /admin/import, jobs.py).
+-- The worker writes its progress to its row, so any server process can
+-- report it; the partial unique index admits one active job at a time,
+-- across processes.
+CREATE TABLE IF NOT EXISTS import_jobs (
+  id           INTEGER PRIMARY KEY,
+  mode         TEXT NOT NULL CHECK (mode IN ('sample', 'full')),
+  source       TEXT NOT NULL,
+  row_limit    INTEGER,
+  state        TEXT NOT NULL DEFAULT 'queued'
+               CHECK (state IN ('queued', 'running', 'rebuilding', 'succeeded', 'failed')),
+  rows         INTEGER NOT NULL DEFAULT 0,
+  bytes_read   INTEGER NOT NULL DEFAULT 0,
+  bytes_total  INTEGER,
+  stats        TEXT,
+  error        TEXT,
+  owner        TEXT,
+  created_at   TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+  started_at   TEXT,
+  updated_at   TEXT,
+  finished_at  TEXT
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_import_jobs_active ON import_jobs ((1))
+  WHERE state IN ('queued', 'running', 'rebuilding');
@@ -2,7 +2,16 @@
 
 PRAGMA foreign_keys = ON;
 
--- Recreate (dev only)
+-- Recreate (dev only; existing databases are upgraded with migrate.py)
+DROP TABLE IF EXISTS schema_migrations;
+DROP TABLE IF EXISTS import_jobs;
+DROP TABLE IF EXISTS inspection_rollups;
+DROP TABLE IF EXISTS rollup_grains;
+DROP TABLE IF EXISTS listing_counters;
+DROP TABLE IF EXISTS inspection_counts;
+DROP TABLE IF EXISTS facility_counts;
+DROP TABLE IF EXISTS facilities_fts;
+DROP TABLE IF EXISTS facilities_geo;
 DROP TABLE IF EXISTS violations;
 DROP TABLE IF EXISTS inspections;
 DROP TABLE IF EXISTS facilities;
@@ -17,8 +26,19 @@ CREATE TABLE facilities (
   state          TEXT NOT NULL DEFAULT 'IL',
   zip            TEXT NOT NULL CHECK (length(zip) BETWEEN 5 AND 10),
   phone          TEXT,
-  created_at     TEXT NOT NULL DEFAULT (datetime('now')),
-  updated_at     TEXT NOT NULL DEFAULT (datetime('now'))
+  latitude       REAL,                     -- WGS84; NULL when the portal has none
+  longitude      REAL,
+  -- Latest inspection (newest inspection_date, then inspection_id) and the
+  -- number of inspections, kept current by the trg_latest_* triggers below.
+  inspection_count     INTEGER NOT NULL DEFAULT 0,
+  last_inspection_id   INTEGER,
+  last_inspection_date TEXT,
+  last_result          TEXT,
+  last_risk            TEXT,
+  content_hash   TEXT,                     -- importer: digest of the imported fields
+  source_date    TEXT,                     -- importer: date of the row they came from
+  created_at     TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+  updated_at     TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
 );
 
 CREATE TABLE inspections (
@@ -29,8 +49,10 @@ CREATE TABLE inspections (
   risk             TEXT NOT NULL CHECK (risk IN ('High','Medium','Low')),
   result           TEXT NOT NULL CHECK (result IN ('Pass','Fail','Warning','No Entry')),
   violations_text  TEXT,
-  created_at       TEXT NOT NULL DEFAULT (datetime('now')),
-  updated_at       TEXT NOT NULL DEFAULT (datetime('now')),
+  source_id        INTEGER,           -- portal Inspection ID (NULL if entered in the app)
+  content_hash     TEXT,              -- importer: digest of the imported fields
+  created_at       TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+  updated_at       TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
   FOREIGN KEY (license_number) REFERENCES facilities(license_number) ON DELETE CASCADE
 );
 
@@ -43,29 +65,422 @@ CREATE TABLE violations (
   FOREIGN KEY (inspection_id) REFERENCES inspections(inspection_id) ON DELETE CASCADE
 );
 
+-- Listing counters ------------------------------------------------------------
+-- Exact totals for the home() listing, kept current by the triggers below so
+-- unfiltered and result/risk-filtered totals are a primary-key lookup.
+CREATE TABLE inspection_counts (
+  result  TEXT NOT NULL,
+  risk    TEXT NOT NULL,
+  n       INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (result, risk)
+) WITHOUT ROWID;
+
+CREATE TABLE listing_counters (
+  name  TEXT PRIMARY KEY,
+  n     INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+INSERT INTO listing_counters (name, n) VALUES ('uninspected_facilities', 0);
+
+-- The same for the facilities view: inspected facilities by the result and
+-- risk of their latest inspection (trg_facility_counts_* below).
+CREATE TABLE facility_counts (
+  result  TEXT NOT NULL,
+  risk    TEXT NOT NULL,
+  n       INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (result, risk)
+) WITHOUT ROWID;
+
+-- Applied migrations (migrate.py); init_db() marks every migration in
+-- migrations/ as applied, since this file already contains them.
+CREATE TABLE schema_migrations (
+  version      INTEGER PRIMARY KEY,
+  name         TEXT NOT NULL,
+  checksum     TEXT NOT NULL,
+  applied_at   TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+  duration_ms  REAL NOT NULL DEFAULT 0
+);
+
+-- Background imports started from /admin/import (jobs.py, migration 0004):
+-- progress is written here by the worker, so any server process can report
+-- it. idx_import_jobs_active admits one queued or running job at a time.
+CREATE TABLE import_jobs (
+  id           INTEGER PRIMARY KEY,
+  mode         TEXT NOT NULL CHECK (mode IN ('sample', 'full')),
+  source       TEXT NOT NULL,
+  row_limit    INTEGER,                      -- NULL = the whole source
+  state        TEXT NOT NULL DEFAULT 'queued'
+               CHECK (state IN ('queued', 'running', 'rebuilding', 'succeeded', 'failed')),
+  rows         INTEGER NOT NULL DEFAULT 0,   -- CSV rows processed so far
+  bytes_read   INTEGER NOT NULL DEFAULT 0,
+  bytes_total  INTEGER,                      -- NULL when the source size is unknown
+  stats        TEXT,                         -- JSON counts once finished
+  error        TEXT,
+  owner        TEXT,                         -- host:pid:token of the process running it
+  created_at   TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+  started_at   TEXT,
+  updated_at   TEXT,
+  finished_at  TEXT
+);
+
 -- Indexes --------------------------------------------------------------------
 CREATE INDEX IF NOT EXISTS idx_facilities_name ON facilities (dba_name);
 CREATE INDEX IF NOT EXISTS idx_inspections_license_date ON inspections (license_number, inspection_date);
-CREATE INDEX IF NOT EXISTS idx_inspections_result ON inspections (result);
+-- Serves the home() listing order and its keyset (cursor) seeks.
+CREATE INDEX IF NOT EXISTS idx_inspections_date_id ON inspections (inspection_date, inspection_id);
+-- The same order within each result/risk filter (migration 0001).
+CREATE INDEX IF NOT EXISTS idx_inspections_result_date ON inspections (result, inspection_date);
+CREATE INDEX IF NOT EXISTS idx_inspections_result_risk_date ON inspections (result, risk, inspection_date);
+CREATE INDEX IF NOT EXISTS idx_inspections_risk_date ON inspections (risk, inspection_date);
+-- Lets re-imports match portal rows (NULLs, i.e. app-entered rows, never collide).
+CREATE UNIQUE INDEX IF NOT EXISTS idx_inspections_source_id ON inspections (source_id);
+-- "Which inspections had violation #21" without scanning violations_text.
+CREATE INDEX IF NOT EXISTS idx_violations_code ON violations (code, inspection_id);
+CREATE INDEX IF NOT EXISTS idx_violations_inspection ON violations (inspection_id);
+
+-- Conditional GETs: MAX(updated_at) per facility / overall is an index seek.
+CREATE INDEX IF NOT EXISTS idx_inspections_license_updated ON inspections (license_number, updated_at);
+CREATE INDEX IF NOT EXISTS idx_inspections_updated ON inspections (updated_at);
+CREATE INDEX IF NOT EXISTS idx_facilities_updated ON facilities (updated_at);
+
+-- Facility view of home(): newest latest inspection first, unfiltered or by
+-- latest result (migration 0003). Never-inspected facilities have NULL dates.
+CREATE INDEX IF NOT EXISTS idx_facilities_last_date ON facilities (last_inspection_date, license_number);
+CREATE INDEX IF NOT EXISTS idx_facilities_last_result_date ON facilities (last_result, last_inspection_date, license_number);
+
+-- Single-job lock for import_jobs: every active row has the same key.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_import_jobs_active ON import_jobs ((1))
+  WHERE state IN ('queued', 'running', 'rebuilding');
 
 -- Triggers -------------------------------------------------------------------
+-- updated_at has millisecond precision so it can back HTTP ETags.
 CREATE TRIGGER IF NOT EXISTS trg_facilities_updated_at
 AFTER UPDATE ON facilities
 FOR EACH ROW BEGIN
-  UPDATE facilities SET updated_at = datetime('now') WHERE license_number = NEW.license_number;
+  UPDATE facilities SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE license_number = NEW.license_number;
 END;
 
 CREATE TRIGGER IF NOT EXISTS trg_inspections_updated_at
 AFTER UPDATE ON inspections
 FOR EACH ROW BEGIN
-  UPDATE inspections SET updated_at = datetime('now') WHERE inspection_id = NEW.inspection_id;
+  UPDATE inspections SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE inspection_id = NEW.inspection_id;
+END;
+
+-- Removing an inspection from a facility leaves nothing behind whose
+-- updated_at could change, so touch the facility instead (Last-Modified).
+CREATE TRIGGER IF NOT EXISTS trg_facilities_touch_inspection_delete
+AFTER DELETE ON inspections
+FOR EACH ROW BEGIN
+  UPDATE facilities SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE license_number = OLD.license_number;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_facilities_touch_inspection_move
+AFTER UPDATE OF license_number ON inspections
+FOR EACH ROW WHEN OLD.license_number IS NOT NEW.license_number
+BEGIN
+  UPDATE facilities SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE license_number = OLD.license_number;
+END;
+
+-- Counter triggers ------------------------------------------------------------
+CREATE TRIGGER IF NOT EXISTS trg_counts_inspection_insert
+AFTER INSERT ON inspections
+FOR EACH ROW BEGIN
+  INSERT INTO inspection_counts (result, risk, n) VALUES (NEW.result, NEW.risk, 1)
+  ON CONFLICT (result, risk) DO UPDATE SET n = n + 1;
+  UPDATE listing_counters SET n = n - 1
+  WHERE name = 'uninspected_facilities'
+    AND NOT EXISTS (SELECT 1 FROM inspections
+                    WHERE license_number = NEW.license_number
+                      AND inspection_id <> NEW.inspection_id);
+END;
+
+-- During a facility CASCADE the parent row is already gone, so the
+-- EXISTS check keeps a deleted facility from being counted as uninspected.
+CREATE TRIGGER IF NOT EXISTS trg_counts_inspection_delete
+AFTER DELETE ON inspections
+FOR EACH ROW BEGIN
+  UPDATE inspection_counts SET n = n - 1 WHERE result = OLD.result AND risk = OLD.risk;
+  UPDATE listing_counters SET n = n + 1
+  WHERE name = 'uninspected_facilities'
+    AND EXISTS (SELECT 1 FROM facilities WHERE license_number = OLD.license_number)
+    AND NOT EXISTS (SELECT 1 FROM inspections WHERE license_number = OLD.license_number);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counts_inspection_update
+AFTER UPDATE OF result, risk ON inspections
+FOR EACH ROW WHEN OLD.result <> NEW.result OR OLD.risk <> NEW.risk BEGIN
+  UPDATE inspection_counts SET n = n - 1 WHERE result = OLD.result AND risk = OLD.risk;
+  INSERT INTO inspection_counts (result, risk, n) VALUES (NEW.result, NEW.risk, 1)
+  ON CONFLICT (result, risk) DO UPDATE SET n = n + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counts_inspection_move
+AFTER UPDATE OF license_number ON inspections
+FOR EACH ROW WHEN OLD.license_number <> NEW.license_number BEGIN
+  UPDATE listing_counters SET n = n + 1
+  WHERE name = 'uninspected_facilities'
+    AND NOT EXISTS (SELECT 1 FROM inspections WHERE license_number = OLD.license_number);
+  UPDATE listing_counters SET n = n - 1
+  WHERE name = 'uninspected_facilities'
+    AND NOT EXISTS (SELECT 1 FROM inspections
+                    WHERE license_number = NEW.license_number
+                      AND inspection_id <> NEW.inspection_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counts_facility_insert
+AFTER INSERT ON facilities
+FOR EACH ROW BEGIN
+  UPDATE listing_counters SET n = n + 1 WHERE name = 'uninspected_facilities';
+END;
+
+-- BEFORE, so the facility's inspections have not been cascaded away yet.
+CREATE TRIGGER IF NOT EXISTS trg_counts_facility_delete
+BEFORE DELETE ON facilities
+FOR EACH ROW BEGIN
+  UPDATE listing_counters SET n = n - 1
+  WHERE name = 'uninspected_facilities'
+    AND NOT EXISTS (SELECT 1 FROM inspections WHERE license_number = OLD.license_number);
+END;
+
+-- Latest inspection ------------------------------------------------------------
+-- One row per facility with its latest result, without a window function or
+-- a correlated subquery per row at read time. Each trigger re-reads the
+-- newest inspection through idx_inspections_license_date (one index seek),
+-- so inserts, back-dated rows, edits and deletes are all handled alike.
+-- During a facility CASCADE the facility is already gone and nothing matches.
+CREATE TRIGGER IF NOT EXISTS trg_latest_inspection_insert
+AFTER INSERT ON inspections
+FOR EACH ROW BEGIN
+  UPDATE facilities
+  SET inspection_count = inspection_count + 1,
+      (last_inspection_id, last_inspection_date, last_result, last_risk) = (
+        SELECT inspection_id, inspection_date, result, risk FROM inspections
+        WHERE license_number = NEW.license_number
+        ORDER BY inspection_date DESC, inspection_id DESC LIMIT 1)
+  WHERE license_number = NEW.license_number;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_latest_inspection_delete
+AFTER DELETE ON inspections
+FOR EACH ROW BEGIN
+  UPDATE facilities
+  SET inspection_count = inspection_count - 1,
+      (last_inspection_id, last_inspection_date, last_result, last_risk) = (
+        SELECT inspection_id, inspection_date, result, risk FROM inspections
+        WHERE license_number = OLD.license_number
+        ORDER BY inspection_date DESC, inspection_id DESC LIMIT 1)
+  WHERE license_number = OLD.license_number;
+END;
+
+-- Covers both facilities when an inspection moves between them.
+CREATE TRIGGER IF NOT EXISTS trg_latest_inspection_update
+AFTER UPDATE OF license_number, inspection_date, result, risk ON inspections
+FOR EACH ROW BEGIN
+  UPDATE facilities
+  SET inspection_count = inspection_count + (license_number = NEW.license_number)
+                                           - (license_number = OLD.license_number),
+      (last_inspection_id, last_inspection_date, last_result, last_risk) = (
+        SELECT i.inspection_id, i.inspection_date, i.result, i.risk FROM inspections i
+        WHERE i.license_number = facilities.license_number
+        ORDER BY i.inspection_date DESC, i.inspection_id DESC LIMIT 1)
+  WHERE license_number IN (OLD.license_number, NEW.license_number);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_facility_counts_insert
+AFTER INSERT ON facilities
+FOR EACH ROW WHEN NEW.last_result IS NOT NULL BEGIN
+  INSERT INTO facility_counts (result, risk, n) VALUES (NEW.last_result, NEW.last_risk, 1)
+  ON CONFLICT (result, risk) DO UPDATE SET n = n + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_facility_counts_update
+AFTER UPDATE OF last_result, last_risk ON facilities
+FOR EACH ROW WHEN OLD.last_result IS NOT NEW.last_result OR OLD.last_risk IS NOT NEW.last_risk
+BEGIN
+  UPDATE facility_counts SET n = n - 1 WHERE result = OLD.last_result AND risk = OLD.last_risk;
+  INSERT INTO facility_counts (result, risk, n)
+  SELECT NEW.last_result, NEW.last_risk, 1 WHERE NEW.last_result IS NOT NULL
+  ON CONFLICT (result, risk) DO UPDATE SET n = n + 1;
+END;
+
+-- AFTER: a CASCADE has left the facility's last_* as they were.
+CREATE TRIGGER IF NOT EXISTS trg_facility_counts_delete
+AFTER DELETE ON facilities
+FOR EACH ROW WHEN OLD.last_result IS NOT NULL BEGIN
+  UPDATE facility_counts SET n = n - 1 WHERE result = OLD.last_result AND risk = OLD.last_risk;
+END;
+
+-- Chart rollups ----------------------------------------------------------------
+-- Inspection counts per period, kept current by the triggers below, so the
+-- chart endpoint reads a handful of rows per period instead of aggregating
+-- inspections. Periods are prefixes of inspection_date ('YYYY-MM-DD' for day,
+-- 'YYYY-MM' for month); add a grain by adding a row to rollup_grains and
+-- running rebuild_rollups() (db.py).
+CREATE TABLE rollup_grains (
+  grain  TEXT PRIMARY KEY,
+  width  INTEGER NOT NULL               -- length of the inspection_date prefix
+) WITHOUT ROWID;
+
+INSERT INTO rollup_grains (grain, width) VALUES ('day', 10), ('month', 7);
+
+CREATE TABLE inspection_rollups (
+  grain          TEXT NOT NULL,
+  period         TEXT NOT NULL,
+  result         TEXT NOT NULL,
+  risk           TEXT NOT NULL,
+  facility_type  TEXT NOT NULL,
+  zip            TEXT NOT NULL,
+  n              INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (grain, period, result, risk, facility_type, zip)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollups_inspection_insert
+AFTER INSERT ON inspections
+FOR EACH ROW BEGIN
+  INSERT INTO inspection_rollups (grain, period, result, risk, facility_type, zip, n)
+  SELECT g.grain, substr(NEW.inspection_date, 1, g.width), NEW.result, NEW.risk, f.facility_type, f.zip, 1
+  FROM rollup_grains g, facilities f
+  WHERE f.license_number = NEW.license_number
+  ON CONFLICT (grain, period, result, risk, facility_type, zip) DO UPDATE SET n = n + excluded.n;
+END;
+
+-- During a facility CASCADE the parent row is already gone and the join
+-- matches nothing; trg_rollups_facility_delete has already subtracted it.
+CREATE TRIGGER IF NOT EXISTS trg_rollups_inspection_delete
+AFTER DELETE ON inspections
+FOR EACH ROW BEGIN
+  INSERT INTO inspection_rollups (grain, period, result, risk, facility_type, zip, n)
+  SELECT g.grain, substr(OLD.inspection_date, 1, g.width), OLD.result, OLD.risk, f.facility_type, f.zip, -1
+  FROM rollup_grains g, facilities f
+  WHERE f.license_number = OLD.license_number
+  ON CONFLICT (grain, period, result, risk, facility_type, zip) DO UPDATE SET n = n + excluded.n;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollups_inspection_update
+AFTER UPDATE OF inspection_date, result, risk, license_number ON inspections
+FOR EACH ROW BEGIN
+  INSERT INTO inspection_rollups (grain, period, result, risk, facility_type, zip, n)
+  SELECT g.grain, substr(OLD.inspection_date, 1, g.width), OLD.result, OLD.risk, f.facility_type, f.zip, -1
+  FROM rollup_grains g, facilities f
+  WHERE f.license_number = OLD.license_number
+  ON CONFLICT (grain, period, result, risk, facility_type, zip) DO UPDATE SET n = n + excluded.n;
+  INSERT INTO inspection_rollups (grain, period, result, risk, facility_type, zip, n)
+  SELECT g.grain, substr(NEW.inspection_date, 1, g.width), NEW.result, NEW.risk, f.facility_type, f.zip, 1
+  FROM rollup_grains g, facilities f
+  WHERE f.license_number = NEW.license_number
+  ON CONFLICT (grain, period, result, risk, facility_type, zip) DO UPDATE SET n = n + excluded.n;
+END;
+
+-- Moves the facility's whole history to its new facility_type/zip bucket.
+CREATE TRIGGER IF NOT EXISTS trg_rollups_facility_update
+AFTER UPDATE OF facility_type, zip ON facilities
+FOR EACH ROW WHEN OLD.facility_type IS NOT NEW.facility_type OR OLD.zip IS NOT NEW.zip
+BEGIN
+  INSERT INTO inspection_rollups (grain, period, result, risk, facility_type, zip, n)
+  SELECT g.grain, substr(i.inspection_date, 1, g.width), i.result, i.risk, OLD.facility_type, OLD.zip, -COUNT(*)
+  FROM rollup_grains g, inspections i
+  WHERE i.license_number = NEW.license_number
+  GROUP BY 1, 2, 3, 4
+  ON CONFLICT (grain, period, result, risk, facility_type, zip) DO UPDATE SET n = n + excluded.n;
+  INSERT INTO inspection_rollups (grain, period, result, risk, facility_type, zip, n)
+  SELECT g.grain, substr(i.inspection_date, 1, g.width), i.result, i.risk, NEW.facility_type, NEW.zip, COUNT(*)
+  FROM rollup_grains g, inspections i
+  WHERE i.license_number = NEW.license_number
+  GROUP BY 1, 2, 3, 4
+  ON CONFLICT (grain, period, result, risk, facility_type, zip) DO UPDATE SET n = n + excluded.n;
+END;
+
+-- BEFORE, so the facility's inspections have not been cascaded away yet.
+CREATE TRIGGER IF NOT EXISTS trg_rollups_facility_delete
+BEFORE DELETE ON facilities
+FOR EACH ROW BEGIN
+  INSERT INTO inspection_rollups (grain, period, result, risk, facility_type, zip, n)
+  SELECT g.grain, substr(i.inspection_date, 1, g.width), i.result, i.risk, OLD.facility_type, OLD.zip, -COUNT(*)
+  FROM rollup_grains g, inspections i
+  WHERE i.license_number = OLD.license_number
+  GROUP BY 1, 2, 3, 4
+  ON CONFLICT (grain, period, result, risk, facility_type, zip) DO UPDATE SET n = n + excluded.n;
+END;
+
+-- Full-text search -----------------------------------------------------------
+-- External-content FTS5 index over facilities, keyed on the implicit rowid.
+-- VACUUM may renumber that rowid; run
+--   INSERT INTO facilities_fts(facilities_fts) VALUES('rebuild');
+-- afterwards (see rebuild_search_index() in db.py).
+CREATE VIRTUAL TABLE facilities_fts USING fts5(
+  dba_name,
+  address,
+  facility_type,
+  content='facilities',
+  content_rowid='rowid',
+  tokenize='unicode61 remove_diacritics 2',
+  prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_facilities_fts_insert
+AFTER INSERT ON facilities
+FOR EACH ROW BEGIN
+  INSERT INTO facilities_fts (rowid, dba_name, address, facility_type)
+  VALUES (NEW.rowid, NEW.dba_name, NEW.address, NEW.facility_type);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_facilities_fts_delete
+AFTER DELETE ON facilities
+FOR EACH ROW BEGIN
+  INSERT INTO facilities_fts (facilities_fts, rowid, dba_name, address, facility_type)
+  VALUES ('delete', OLD.rowid, OLD.dba_name, OLD.address, OLD.facility_type);
+END;
+
+-- Only fires when an indexed column changes, so the updated_at bump is free.
+CREATE TRIGGER IF NOT EXISTS trg_facilities_fts_update
+AFTER UPDATE OF dba_name, address, facility_type ON facilities
+FOR EACH ROW BEGIN
+  INSERT INTO facilities_fts (facilities_fts, rowid, dba_name, address, facility_type)
+  VALUES ('delete', OLD.rowid, OLD.dba_name, OLD.address, OLD.facility_type);
+  INSERT INTO facilities_fts (rowid, dba_name, address, facility_type)
+  VALUES (NEW.rowid, NEW.dba_name, NEW.address, NEW.facility_type);
+END;
+
+-- Geospatial index --------------------------------------------------------------
+-- R*Tree over facility coordinates (migration 0002), keyed on the facilities
+-- rowid like facilities_fts, so /nearby turns a radius into a bounding-box
+-- lookup and only computes exact distances for the facilities inside it.
+-- Points are stored as zero-size boxes; facilities without coordinates are
+-- left out. VACUUM may renumber rowids: run rebuild_geo_index() (db.py).
+CREATE VIRTUAL TABLE facilities_geo USING rtree(
+  id,
+  min_lat, max_lat,
+  min_lon, max_lon
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_facilities_geo_insert
+AFTER INSERT ON facilities
+FOR EACH ROW WHEN NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL
+BEGIN
+  INSERT INTO facilities_geo (id, min_lat, max_lat, min_lon, max_lon)
+  VALUES (NEW.rowid, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_facilities_geo_update
+AFTER UPDATE OF latitude, longitude ON facilities
+FOR EACH ROW BEGIN
+  DELETE FROM facilities_geo WHERE id = OLD.rowid;
+  INSERT INTO facilities_geo (id, min_lat, max_lat, min_lon, max_lon)
+  SELECT NEW.rowid, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude
+  WHERE NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_facilities_geo_delete
+AFTER DELETE ON facilities
+FOR EACH ROW BEGIN
+  DELETE FROM facilities_geo WHERE id = OLD.rowid;
 END;
 
 -- Seed data ------------------------------------------------------------------
-INSERT INTO facilities (license_number,dba_name,facility_type,address,city,state,zip,phone) VALUES
-('LIC-1001','Sunrise Diner','Restaurant','101 Main St','Chicago','IL','60601','312-555-0101'),
-('LIC-1002','Lotus Express','Restaurant','55 W Lake St','Chicago','IL','60602','312-555-0102'),
-('LIC-1003','Green Grocer','Grocery Store','200 Oak Ave','Chicago','IL','60610','312-555-0103');
+INSERT INTO facilities (license_number,dba_name,facility_type,address,city,state,zip,phone,latitude,longitude) VALUES
+('LIC-1001','Sunrise Diner','Restaurant','101 Main St','Chicago','IL','60601','312-555-0101',41.8847,-87.6233),
+('LIC-1002','Lotus Express','Restaurant','55 W Lake St','Chicago','IL','60602','312-555-0102',41.8857,-87.6306),
+('LIC-1003','Green Grocer','Grocery Store','200 Oak Ave','Chicago','IL','60610','312-555-0103',41.9006,-87.6319);
 
 INSERT INTO inspections (license_number,inspection_date,inspection_type,risk,result,violations_text) VALUES
 ('LIC-1001', DATE('now','-15 days'),'Routine','High','Fail','#21: Inadequate cooling; #6: Hand washing sinks blocked'),
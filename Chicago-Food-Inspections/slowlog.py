@@ -0,0 +1,274 @@
+"""
+Slow-query log with EXPLAIN QUERY PLAN capture.
+
+app.py hands SlowQueryLog.record() to the InstrumentedConnection of each
+request (db.py). Any statement whose execute + fetch time crosses the
+threshold is written as one JSON line to a size-rotated log. Each line holds
+the SQL, its parameters, the duration, the query plan, and any full SCAN of
+a large table the plan contains. Statements are grouped by "shape": the SQL
+with literals and IN-lists normalized. The many filter combinations home()
+builds therefore stay distinguishable, while repeats of one combination
+aggregate.
+
+Run this module to report the worst shapes:
+
+    python slowlog.py                        # top 10 by total time
+    python slowlog.py --sort max --top 20
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import Config
+
+MAX_PARAM_CHARS = 200
+PLAN_CACHE_SIZE = 256
+
+WHITESPACE_RE = re.compile(r"\s+")
+STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL_RE = re.compile(r"(?<![\w.])\d+(?:\.\d+)?\b")
+PLACEHOLDER_LIST_RE = re.compile(r"\?(?:\s*,\s*\?)+")
+# "SCAN inspections", "SCAN i USING COVERING INDEX ...", but not
+# "SCAN facilities_fts VIRTUAL TABLE ..." (an FTS lookup, not a scan).
+SCAN_RE = re.compile(r"^SCAN (\w+)(?! VIRTUAL TABLE)")
+TABLE_ALIAS_RE = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+
+
+def collapse_sql(sql: str) -> str:
+    """SQL on one line with runs of whitespace collapsed."""
+    return WHITESPACE_RE.sub(" ", sql).strip()
+
+
+def query_shape(sql: str) -> str:
+    """Normalized SQL: literals become ? and IN-lists of any length look alike."""
+    shape = STRING_LITERAL_RE.sub("?", collapse_sql(sql))
+    shape = NUMBER_LITERAL_RE.sub("?", shape)
+    return PLACEHOLDER_LIST_RE.sub("?, ...", shape)
+
+
+def shape_id(shape: str) -> str:
+    """Short stable id for a query shape."""
+    return hashlib.blake2b(shape.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def table_aliases(sql: str) -> Dict[str, str]:
+    """Map every table name and alias in FROM/JOIN clauses to its table."""
+    aliases = {}
+    for table, alias in TABLE_ALIAS_RE.findall(sql):
+        aliases[table.lower()] = table.lower()
+        if alias:
+            aliases[alias.lower()] = table.lower()
+    return aliases
+
+
+def format_plan(rows: Iterable[Sequence]) -> List[str]:
+    """EXPLAIN QUERY PLAN rows -> detail lines indented by tree depth."""
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def find_scans(plan: List[str], sql: str, large_tables: Iterable[str]) -> List[str]:
+    """Large tables the plan reads in full (directly or through a whole index)."""
+    large = {t.lower() for t in large_tables}
+    aliases = table_aliases(sql)
+    scans = []
+    for line in plan:
+        match = SCAN_RE.match(line.strip())
+        if match:
+            table = aliases.get(match.group(1).lower(), match.group(1).lower())
+            if table in large and table not in scans:
+                scans.append(table)
+    return scans
+
+
+def json_params(params: Any) -> Any:
+    """Bound parameters in a JSON-safe, size-limited form."""
+    def clean(value):
+        if value is None or isinstance(value, (int, float)):
+            return value
+        text = value if isinstance(value, str) else repr(value)
+        return text if len(text) <= MAX_PARAM_CHARS else text[:MAX_PARAM_CHARS] + "..."
+    if isinstance(params, dict):
+        return {str(k): clean(v) for k, v in params.items()}
+    return [clean(v) for v in params or ()]
+
+
+class SlowQueryLog:
+    """
+    Writes statements slower than `threshold_ms` to a rotating JSON-lines log.
+
+    Plans are cached per SQL text, so a burst of the same slow query does not
+    EXPLAIN it every time.
+    """
+
+    def __init__(self, path: str, threshold_ms: float, max_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 5, large_tables: Iterable[str] = ()):
+        self.path = path
+        self.threshold_ms = threshold_ms
+        self.large_tables = tuple(large_tables)
+        self._plans: Dict[str, Tuple[List[str], Optional[str]]] = {}
+        self._plans_lock = threading.Lock()
+        self._logger = logging.Logger("slow_queries")
+        self._logger.propagate = False
+        self._handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                            encoding="utf-8", delay=True)
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+        self._logger.addHandler(self._handler)
+
+    @property
+    def threshold_seconds(self) -> float:
+        return self.threshold_ms / 1000.0
+
+    def explain(self, conn: sqlite3.Connection, sql: str, params: Any) -> Tuple[List[str], Optional[str]]:
+        """(plan lines, error) for a statement, from the cache when possible."""
+        with self._plans_lock:
+            cached = self._plans.get(sql)
+        if cached is not None:
+            return cached
+        try:
+            result = (format_plan(conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()), None)
+        except sqlite3.Error as e:
+            result = ([], str(e))
+        with self._plans_lock:
+            if len(self._plans) >= PLAN_CACHE_SIZE:
+                self._plans.clear()
+            self._plans[sql] = result
+        return result
+
+    def record(self, conn: sqlite3.Connection, sql: str, params: Any, seconds: float,
+               **context: Any) -> Dict[str, Any]:
+        """
+        Log one slow statement.
+
+        Args:
+            conn: the raw connection it ran on (used for EXPLAIN QUERY PLAN)
+            params: its parameters, or None for executemany()
+            context: extra fields for the entry, e.g. endpoint and path
+
+        Returns:
+            The entry as written
+        """
+        shape = query_shape(sql)
+        if params is None:
+            plan, error = [], "executemany"
+        else:
+            plan, error = self.explain(conn, sql, params)
+        scans = find_scans(plan, sql, self.large_tables)
+        entry = {
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            **context,
+            "duration_ms": round(seconds * 1000, 3),
+            "threshold_ms": self.threshold_ms,
+            "shape": shape_id(shape),
+            "sql": collapse_sql(sql),
+            "params": json_params(params) if params is not None else None,
+            "plan": plan,
+            "scans": scans,
+            "flagged": bool(scans),
+        }
+        if error:
+            entry["plan_error"] = error
+        self._logger.info(json.dumps(entry, default=str))
+        return entry
+
+    def close(self) -> None:
+        self._handler.close()
+
+
+# ==================== REPORT ====================
+
+def read_entries(path: str) -> Iterable[Dict[str, Any]]:
+    """Every entry in the log and its rotated backups (unparseable lines skipped)."""
+    for name in sorted(glob.glob(glob.escape(path) + ".*")) + [path]:
+        if not os.path.exists(name):
+            continue
+        with open(name, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def summarize(entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Aggregate entries per query shape, slowest sample kept for each."""
+    shapes: Dict[str, Dict[str, Any]] = defaultdict(lambda: {"durations": [], "endpoints": set(),
+                                                             "scans": set(), "slowest": None})
+    for entry in entries:
+        shape = shapes[entry.get("shape") or shape_id(query_shape(entry.get("sql", "")))]
+        duration = entry.get("duration_ms", 0.0)
+        shape["durations"].append(duration)
+        shape["scans"].update(entry.get("scans") or ())
+        if entry.get("endpoint"):
+            shape["endpoints"].add(entry["endpoint"])
+        if shape["slowest"] is None or duration > shape["slowest"]["duration_ms"]:
+            shape["slowest"] = entry
+    summary = []
+    for key, shape in shapes.items():
+        durations = sorted(shape["durations"])
+        summary.append({
+            "shape": key,
+            "count": len(durations),
+            "total_ms": sum(durations),
+            "mean_ms": sum(durations) / len(durations),
+            "p95_ms": durations[max(0, -(-95 * len(durations) // 100) - 1)],
+            "max_ms": durations[-1],
+            "endpoints": sorted(shape["endpoints"]),
+            "scans": sorted(shape["scans"]),
+            "slowest": shape["slowest"],
+        })
+    return summary
+
+
+def print_report(summary: List[Dict[str, Any]], sort: str, top: int) -> None:
+    summary.sort(key=lambda s: s[f"{sort}_ms" if sort != "count" else "count"], reverse=True)
+    total = sum(s["count"] for s in summary)
+    print(f"{total:,} slow queries in {len(summary):,} shapes; top {min(top, len(summary))} by {sort}\n")
+    for rank, s in enumerate(summary[:top], 1):
+        slowest = s["slowest"]
+        flag = f"  SCAN: {', '.join(s['scans'])}" if s["scans"] else ""
+        print(f"#{rank} [{s['shape']}] count={s['count']:,} total={s['total_ms']:,.1f}ms "
+              f"mean={s['mean_ms']:.1f}ms p95={s['p95_ms']:.1f}ms max={s['max_ms']:.1f}ms{flag}")
+        if s["endpoints"]:
+            print(f"   endpoints: {', '.join(s['endpoints'])}")
+        print(f"   {slowest['sql']}")
+        print(f"   slowest params: {json.dumps(slowest.get('params'))}")
+        for line in slowest.get("plan") or [f"(no plan: {slowest.get('plan_error')})"]:
+            print(f"     {line}")
+        print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report the worst query shapes in the slow-query log")
+    parser.add_argument("--log", default=str(Config.SLOW_QUERY_LOG), help="log path (backups are read too)")
+    parser.add_argument("--sort", choices=["total", "max", "mean", "p95", "count"], default="total")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--flagged", action="store_true", help="only shapes that scan a large table")
+    args = parser.parse_args(argv)
+
+    summary = summarize(read_entries(args.log))
+    if args.flagged:
+        summary = [s for s in summary if s["scans"]]
+    if not summary:
+        print(f"No slow queries logged in {args.log}")
+        return
+    print_report(summary, args.sort, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Shared fixtures: a small synthetic database (benchmarks/generate_data.py)
+and the Flask app pointed at a fresh copy of it.
+"""
+
+import os
+import shutil
+import sys
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, "benchmarks"))
+
+import app as app_module  # noqa: E402
+import applog  # noqa: E402
+from db import open_connection  # noqa: E402
+from generate_data import generate  # noqa: E402
+
+INSPECTIONS = 6000
+FACILITIES = 900
+
+
+@pytest.fixture(scope="session")
+def generated_db(tmp_path_factory):
+    """Path of a generated database; copy it before writing (see db_path)."""
+    path = str(tmp_path_factory.mktemp("data") / "generated.db")
+    generate(path, INSPECTIONS, FACILITIES, seed=7)
+    return path
+
+
+@pytest.fixture
+def db_path(generated_db, tmp_path):
+    """A private copy of the generated database."""
+    path = str(tmp_path / "app.db")
+    shutil.copy(generated_db, path)
+    return path
+
+
+@pytest.fixture
+def app(db_path, tmp_path):
+    """app.app on db_path, with caching off and logs kept out of the tree."""
+    flask_app = app_module.app
+    saved = dict(flask_app.config)
+    flask_app.config.update(DATABASE_PATH=db_path, RESULT_CACHE_SIZE=0, SESSION_COOKIE_SECURE=False,
+                            LOG_FILE=str(tmp_path / "app.log"), LOG_CONSOLE=False, LOG_ASYNC=False,
+                            SLOW_QUERY_LOG=str(tmp_path / "slow_queries.log"), TESTING=True)
+    applog.configure_logging(flask_app.config, app_module.log_context)
+    yield flask_app
+    flask_app.config.clear()
+    flask_app.config.update(saved)
+    applog.shutdown()
+
+
+@pytest.fixture
+def cached_app(app):
+    """The app with its result cache on (the app fixture turns it off)."""
+    app.config["RESULT_CACHE_SIZE"] = 100
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def edited_db(client, db_path):
+    """
+    db_path after facilities and inspections were created, edited and deleted
+    through the routes, in the ways the counter, latest-inspection and
+    rollup triggers have to handle.
+    """
+    conn = open_connection(db_path)
+
+    def one(sql, *params):
+        return conn.execute(sql, params).fetchone()[0]
+
+    def post(path, **form):
+        assert client.post(path, data=form).status_code == 302
+
+    facility = dict(dba_name="Test Kitchen", facility_type="Restaurant", address="1 Main St",
+                    city="CHICAGO", state="IL", zip="60601")
+    inspection = dict(inspection_type="Canvass", violations_text="")
+
+    # A new facility, inspected twice (the second back-dated), then renamed.
+    post("/facility/new", license_number="TEST-1", **facility)
+    post("/inspection/new", license_number="TEST-1", inspection_date="2024-03-01",
+         risk="High", result="Fail", **inspection)
+    post("/inspection/new", license_number="TEST-1", inspection_date="2020-01-01",
+         risk="Low", result="Pass", **inspection)
+    post("/facility/TEST-1/edit", **dict(facility, dba_name="Test Kitchen II"))
+    # A new facility that is never inspected.
+    post("/facility/new", license_number="TEST-2", **facility)
+
+    # Change the result, risk and date of some facility's latest inspection.
+    latest = one("SELECT last_inspection_id FROM facilities WHERE inspection_count > 1")
+    post(f"/inspection/{latest}/edit", inspection_date="2001-01-01", risk="Medium",
+         result="No Entry", **inspection)
+    # Move an inspected facility to another type and ZIP (its chart rollups follow).
+    moved = one("SELECT license_number FROM facilities WHERE inspection_count > 1 "
+                "AND license_number NOT LIKE 'TEST-%' ORDER BY license_number DESC")
+    post(f"/facility/{moved}/edit", **dict(facility, facility_type="Mobile Food", zip="60699"))
+    # Delete another facility's latest inspection.
+    latest = one("SELECT last_inspection_id FROM facilities WHERE inspection_count > 1 "
+                 "AND last_inspection_id <> ?", latest)
+    post(f"/inspection/{latest}/delete")
+    # Delete a facility's only inspection, then inspect a never-inspected one.
+    only = one("SELECT last_inspection_id FROM facilities WHERE inspection_count = 1")
+    post(f"/inspection/{only}/delete")
+    uninspected = one("SELECT license_number FROM facilities WHERE inspection_count = 0 "
+                      "AND license_number NOT LIKE 'TEST-%'")
+    post("/inspection/new", license_number=uninspected, inspection_date="2023-06-15",
+         risk="Medium", result="Warning", **inspection)
+    # Delete an inspected facility (its inspections cascade) and an uninspected one.
+    inspected = one("SELECT license_number FROM facilities WHERE inspection_count > 2")
+    post(f"/facility/{inspected}/delete")
+    post("/facility/TEST-2/delete")
+
+    assert one("SELECT last_result FROM facilities WHERE license_number = 'TEST-1'") == "Fail"
+    assert one("SELECT zip FROM facilities WHERE license_number = ?", moved) == "60699"
+    assert one("SELECT COUNT(*) FROM facilities WHERE license_number IN (?, 'TEST-2')", inspected) == 0
+    conn.close()
+    return db_path
@@ -0,0 +1,59 @@
+"""asgi.AsgiAdapter driven directly with asyncio (no ASGI server needed)."""
+
+import asyncio
+
+import app as app_module
+from asgi import AsgiAdapter
+from db import ConnectionPool
+
+
+def call(adapter, path, method="GET"):
+    """Run one request through the adapter; returns (status, headers, body)."""
+    path, _, query = path.partition("?")
+    scope = {"type": "http", "method": method, "path": path, "query_string": query.encode(),
+             "headers": [], "http_version": "1.1"}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(adapter(scope, receive, send))
+    start = sent[0]
+    body = b"".join(m.get("body", b"") for m in sent[1:])
+    return start["status"], dict(start["headers"]), body
+
+
+def test_write_callable_output_comes_first():
+    def legacy_app(environ, start_response):
+        write = start_response("200 OK", [("Content-Type", "text/plain")])
+        write(b"written ")
+        return [b"returned"]
+
+    adapter = AsgiAdapter(legacy_app, 1, 1, 8)
+    try:
+        # POST: not a read route, so the adapter does not consult a Flask url_map
+        assert call(adapter, "/", "POST") == (200, {b"content-type": b"text/plain"}, b"written returned")
+    finally:
+        adapter.shutdown()
+
+
+def test_exports_use_the_read_pool(app, monkeypatch):
+    used = []
+    acquire = ConnectionPool.acquire
+
+    def tracking_acquire(self):
+        used.append(self)
+        return acquire(self)
+    monkeypatch.setattr(ConnectionPool, "acquire", tracking_acquire)
+
+    adapter = AsgiAdapter(app, 2, 2, 8)
+    try:
+        status, _, body = call(adapter, "/export.csv?result=Fail&fields=inspection_id,result")
+    finally:
+        adapter.shutdown()
+    assert status == 200
+    assert body.startswith(b"inspection_id,result")
+    assert used and all(pool is app_module.get_read_pool() for pool in used)
@@ -0,0 +1,58 @@
+"""The static build fingerprints and pre-compresses the vendored files."""
+
+import gzip
+import os
+
+import assets
+from config import BASE_DIR
+
+
+def test_chart_js_is_vendored():
+    assert os.path.isfile(os.path.join(BASE_DIR, "static", "vendor", "chart.umd.js"))
+
+
+def test_build_includes_vendored_files(app, client, tmp_path):
+    manifest = assets.build(str(BASE_DIR / "static"), str(tmp_path))
+    hashed = manifest["vendor/chart.umd.js"]
+    assert hashed != "vendor/chart.umd.js"
+    with open(tmp_path / hashed, "rb") as f:
+        data = f.read()
+    with gzip.open(tmp_path / (hashed + ".gz")) as f:
+        assert f.read() == data
+
+    app.config["ASSET_DIR"] = tmp_path
+    page = client.get("/").get_data(as_text=True)
+    assert f"/assets/{hashed}" in page
+    assert assets.VENDOR["vendor/chart.umd.js"] not in page
+    response = client.get(f"/assets/{hashed}", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "immutable" in response.headers["Cache-Control"]
+    response.close()
+
+
+def test_cdn_fallback_is_opt_in(app, tmp_path, monkeypatch):
+    import app as app_module
+    app.config["ASSET_DIR"] = tmp_path  # no build
+    monkeypatch.setitem(assets.VENDOR, "vendor/missing.js", "https://cdn.example/missing.js")
+    monkeypatch.setattr(app_module, "VENDOR", assets.VENDOR)
+    with app.test_request_context():
+        assert app_module.asset_url("vendor/missing.js") == "/static/vendor/missing.js"
+        app.config["ASSET_CDN_FALLBACK"] = True
+        assert app_module.asset_url("vendor/missing.js") == "https://cdn.example/missing.js"
+        assert app_module.asset_url("vendor/chart.umd.js") == "/static/vendor/chart.umd.js"
+
+
+def test_uncommitted_vendor_file_is_linked_from_cdn(app, client, tmp_path):
+    app.config["ASSET_DIR"] = tmp_path  # no build
+    for name in assets.CDN_LINKED:
+        if os.path.exists(os.path.join(BASE_DIR, "static", name)):
+            continue  # fetched with --vendor: served locally
+        assert assets.VENDOR[name] in client.get("/").get_data(as_text=True)
+
+
+def test_missing_static_file_is_a_plain_404(client):
+    response = client.get("/static/vendor/missing.css")
+    assert response.status_code == 404
+    with client.session_transaction() as session:
+        assert not session.get("_flashes")
+    assert client.get("/no-such-page").status_code == 302
@@ -0,0 +1,47 @@
+"""DATABASE_URL parsing, the SQLite-only startup check and the pools."""
+
+import pytest
+
+import backends
+from backends import app_database_path, create_pool, parse_database_url
+
+
+def test_parse_database_url():
+    assert parse_database_url("sqlite:///app.db") == "app.db"
+    assert parse_database_url("sqlite:////var/data/app.db") == "/var/data/app.db"
+    with pytest.raises(ValueError):
+        parse_database_url("sqlite://")
+    for url in ("postgresql://u:p@h/db", "mysql://h/db"):
+        with pytest.raises(ValueError, match="SQLite only"):
+            parse_database_url(url)
+
+
+def test_app_refuses_non_sqlite_urls():
+    assert app_database_path({"DATABASE_URL": None, "DATABASE_PATH": "/tmp/x.db"}) == "/tmp/x.db"
+    assert app_database_path({"DATABASE_URL": "sqlite:///y.db", "DATABASE_PATH": "x.db"}) == "y.db"
+    with pytest.raises(ValueError, match="SQLite only"):
+        app_database_path({"DATABASE_URL": "postgresql://h/db", "DATABASE_PATH": "x.db"})
+
+
+def test_app_pool_refuses_postgres_url(app):
+    import app as app_module
+    app.config["DATABASE_URL"] = "postgresql://localhost/chicago"
+    with pytest.raises(ValueError, match="SQLite only"):
+        app_module.get_pool()
+
+
+def test_sqlite_pool_reuses_connections(db_path):
+    pool = create_pool(f"sqlite:///{db_path}", {"busy_timeout": 1000}, size=2)
+    assert isinstance(pool, backends.SQLitePool)
+    conn = pool.acquire()
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 1000
+    pool.release(conn)
+    assert pool.acquire() is conn
+    pool.close_all()
+
+
+def test_read_only_pool(db_path):
+    pool = create_pool(f"sqlite:///{db_path}", size=1, read_only=True)
+    with pool.connection() as conn:
+        with pytest.raises(Exception, match="readonly|read-only|query_only"):
+            conn.execute("DELETE FROM inspections")
@@ -0,0 +1,52 @@
+"""The result cache: writes through the app stale it, and it follows the database URL."""
+
+import shutil
+
+import app as app_module
+from db import open_connection
+
+LICENSE = "1000000"
+NAME = "Zzyzx Fresh Kitchen"
+FACILITY = dict(dba_name=NAME, facility_type="Restaurant", address="1 Main St",
+                city="CHICAGO", state="IL", zip="60601")
+LINK = f"/facility/{LICENSE}\""  # a result row (the search box echoes the query)
+
+
+def page(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    return response.get_data(as_text=True)
+
+
+def test_write_bumps_generation_and_next_read_is_fresh(cached_app, client):
+    listing = f"/?view=facilities&q={NAME}"
+    assert LINK not in page(client, listing)
+    assert NAME not in page(client, f"/facility/{LICENSE}")
+    cache = app_module.get_cache()
+    hits = cache.stats()["hits"]
+    page(client, listing)
+    assert cache.stats()["hits"] == hits + 1  # served from the cache
+
+    generation = cache.generation
+    response = client.post(f"/facility/{LICENSE}/edit", data=FACILITY)
+    assert response.status_code == 302
+    assert app_module.get_cache() is cache
+    assert cache.generation > generation
+    assert LINK in page(client, listing)
+    assert NAME in page(client, f"/facility/{LICENSE}")
+
+
+def test_cache_follows_database_url(cached_app, client, db_path, tmp_path):
+    other = str(tmp_path / "other.db")
+    shutil.copy(db_path, other)
+    conn = open_connection(other)
+    with conn:
+        conn.execute("UPDATE facilities SET dba_name = ? WHERE license_number = ?", (NAME, LICENSE))
+    conn.close()
+
+    listing = f"/?view=facilities&q={NAME}"
+    assert LINK not in page(client, listing)
+    cache = app_module.get_cache()
+    cached_app.config["DATABASE_URL"] = f"sqlite:///{other}"
+    assert app_module.get_cache() is not cache
+    assert LINK in page(client, listing)
@@ -0,0 +1,48 @@
+"""Conditional GETs: ETag / Last-Modified validators and 304 responses."""
+
+import pytest
+
+from db import open_connection
+
+LICENSE = "1000000"
+
+
+def rename(db_path, name):
+    """Write from a second connection, as another worker or the importer would."""
+    conn = open_connection(db_path)
+    with conn:
+        conn.execute("UPDATE facilities SET dba_name = ? WHERE license_number = ?", (name, LICENSE))
+    conn.close()
+
+
+@pytest.mark.parametrize("path", [f"/facility/{LICENSE}", "/chart/monthly-fails.json"])
+def test_if_none_match_gets_304(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    again = client.get(path, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert client.get(path, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+@pytest.mark.parametrize("path", [f"/facility/{LICENSE}", "/chart/monthly-fails.json"])
+def test_if_modified_since_gets_304(client, path):
+    last_modified = client.get(path).headers["Last-Modified"]
+    assert client.get(path, headers={"If-Modified-Since": last_modified}).status_code == 304
+    earlier = "Mon, 01 Jan 2001 00:00:00 GMT"
+    assert client.get(path, headers={"If-Modified-Since": earlier}).status_code == 200
+
+
+def test_out_of_band_write_changes_etag_and_body(cached_app, client, db_path):
+    path = f"/facility/{LICENSE}"
+    first = client.get(path)
+    etag = first.headers["ETag"]
+    assert client.get(path).headers["ETag"] == etag  # served from the cache
+
+    rename(db_path, "Renamed Elsewhere")
+    response = client.get(path, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert "Renamed Elsewhere" in response.get_data(as_text=True)
+    assert client.get(path, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
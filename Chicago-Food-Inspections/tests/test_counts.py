@@ -0,0 +1,38 @@
+"""Listing totals: the trigger-maintained counters agree with a full count."""
+
+import pytest
+
+from app import counter_total, scan_total
+from db import open_connection
+
+RESULTS = ["All", "Pass", "Fail", "Warning", "No Entry"]
+RISKS = ["All", "High", "Medium", "Low"]
+
+
+def assert_counters_match(path):
+    conn = open_connection(path)
+    try:
+        for view in ("inspections", "facilities"):
+            for result in RESULTS:
+                for risk in RISKS:
+                    assert counter_total(conn, result, risk, view) == \
+                        scan_total(conn, None, result, risk, view), (view, result, risk)
+    finally:
+        conn.close()
+
+
+def test_counters_match_scan(generated_db):
+    assert_counters_match(generated_db)
+
+
+def test_counters_match_scan_after_edits(edited_db):
+    assert_counters_match(edited_db)
+
+
+@pytest.mark.parametrize("view", ["inspections", "facilities"])
+def test_home_shows_exact_total(client, db_path, view):
+    conn = open_connection(db_path)
+    total = scan_total(conn, None, "Fail", "High", view)
+    conn.close()
+    page = client.get(f"/?result=Fail&risk=High&view={view}").get_data(as_text=True)
+    assert f"{total:,} results" in page
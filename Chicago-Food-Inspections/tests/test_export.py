@@ -0,0 +1,84 @@
+"""The /export.csv and /export.ndjson streams: fields, filters, batching and gzip."""
+
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+import app as app_module
+from app import EXPORT_FIELDS
+from db import open_connection
+
+
+def count(db_path, where="1=1", *params):
+    conn = open_connection(db_path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM inspections WHERE {where}", params).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def csv_rows(text):
+    return list(csv.reader(io.StringIO(text)))
+
+
+def ndjson_rows(text):
+    return [json.loads(line) for line in text.splitlines()]
+
+
+def test_csv_has_every_field_and_row_newest_first(client, db_path):
+    response = client.get("/export.csv")
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert "attachment; filename=inspections.csv" in response.headers["Content-Disposition"]
+    header, *rows = csv_rows(response.get_data(as_text=True))
+    assert header == list(EXPORT_FIELDS)
+    assert len(rows) == count(db_path)
+    dates = [row[header.index("inspection_date")] for row in rows]
+    assert dates == sorted(dates, reverse=True)
+
+
+def test_ndjson_returns_only_requested_fields(client, db_path):
+    response = client.get("/export.ndjson?fields=license_number,result&result=Fail")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    rows = ndjson_rows(response.get_data(as_text=True))
+    assert len(rows) == count(db_path, "result = ?", "Fail")
+    assert all(list(row) == ["license_number", "result"] for row in rows)
+    assert {row["result"] for row in rows} == {"Fail"}
+
+
+def test_csv_columns_follow_fields_order(client):
+    header, *rows = csv_rows(client.get("/export.csv?fields=zip,inspection_id").get_data(as_text=True))
+    assert header == ["zip", "inspection_id"]
+    assert all(len(row) == 2 and row[1].isdigit() for row in rows)
+
+
+@pytest.mark.parametrize("path", ["/export.csv", "/export.ndjson"])
+def test_unknown_field_is_rejected(client, path):
+    response = client.get(f"{path}?fields=result,password")
+    assert response.status_code == 400
+    assert "fields must be" in response.get_json()["error"]
+
+
+@pytest.mark.parametrize("path, parse", [("/export.csv", csv_rows), ("/export.ndjson", ndjson_rows)])
+def test_gzip_body_matches_plain_body(client, path, parse):
+    plain = client.get(path).get_data(as_text=True)
+    response = client.get(path, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert parse(gzip.decompress(response.get_data()).decode("utf-8")) == parse(plain)
+
+
+@pytest.mark.parametrize("path, header_lines", [("/export.csv", 1), ("/export.ndjson", 0)])
+def test_export_is_streamed_in_batches(client, db_path, monkeypatch, path, header_lines):
+    monkeypatch.setattr(app_module, "EXPORT_BATCH_ROWS", 500)
+    response = client.get(path, buffered=False)
+    assert response.is_streamed
+    chunks = [chunk for chunk in response.response if chunk]
+    response.close()
+    assert chunks[0].count(b"\n") == header_lines + 500
+    assert sum(chunk.count(b"\n") for chunk in chunks) == header_lines + count(db_path)
+    assert len(chunks) >= count(db_path) // 500
@@ -0,0 +1,116 @@
+"""Incremental imports: unchanged rows are skipped, changed rows updated, legacy rows adopted."""
+
+import csv
+import sqlite3
+
+import pytest
+
+from bench_import import fresh_db, table_dump, write_portal_csv
+from config import Config
+from import_chicago_data import import_data
+from migrate import migrate
+from test_migrate import BASELINE_SCHEMA
+
+ROWS = 600
+
+
+@pytest.fixture
+def portal_csv(tmp_path):
+    path = str(tmp_path / "portal.csv")
+    write_portal_csv(path, ROWS)
+    return path
+
+
+@pytest.fixture
+def imported_db(tmp_path, portal_csv):
+    path = str(tmp_path / "imported.db")
+    fresh_db(path)
+    stats = import_data(limit=None, source=portal_csv, db_path=path, workers=1)
+    assert stats["inspections_added"] == ROWS
+    return path
+
+
+def inspection_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT source_id, result, content_hash, updated_at FROM inspections "
+                            "ORDER BY source_id").fetchall()
+    finally:
+        conn.close()
+
+
+def edit_csv(path, source_id, **changes):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        fieldnames, rows = reader.fieldnames, list(reader)
+    for row in rows:
+        if int(row["Inspection ID"]) == source_id:
+            row.update(changes)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_reimporting_same_rows_is_a_no_op(imported_db, portal_csv):
+    before_dump, before_rows = table_dump(imported_db), inspection_rows(imported_db)
+    stats = import_data(limit=None, source=portal_csv, db_path=imported_db, workers=1)
+    assert stats["inspections_added"] == stats["inspections_updated"] == 0
+    assert stats["facilities_added"] == stats["facilities_updated"] == 0
+    assert stats["inspections_unchanged"] == ROWS
+    assert table_dump(imported_db) == before_dump
+    assert inspection_rows(imported_db) == before_rows
+
+
+def test_changed_row_updates_it(imported_db, portal_csv):
+    before = {row[0]: row for row in inspection_rows(imported_db)}
+    source_id = min(before)
+    new_result = "Pass" if before[source_id][1] != "Pass" else "Fail"
+    edit_csv(portal_csv, source_id, Results=new_result)
+
+    stats = import_data(limit=None, source=portal_csv, db_path=imported_db, workers=1)
+    assert stats["inspections_added"] == 0
+    assert stats["inspections_updated"] == 1
+    assert stats["inspections_unchanged"] == ROWS - 1
+    after = {row[0]: row for row in inspection_rows(imported_db)}
+    assert after[source_id][1] == new_result
+    assert after[source_id][2] != before[source_id][2]
+    assert {k: v for k, v in after.items() if k != source_id} == \
+        {k: v for k, v in before.items() if k != source_id}
+
+
+def test_legacy_rows_get_source_ids_instead_of_duplicates(tmp_path, imported_db, portal_csv):
+    """Rows imported into the original schema (no Inspection ID) are matched, not re-added."""
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    with open(BASELINE_SCHEMA, "r", encoding="utf-8") as f:
+        conn.executescript(f.read())
+    conn.execute("ATTACH DATABASE ? AS imported", (imported_db,))
+    with conn:
+        conn.execute("DELETE FROM facilities")
+        conn.execute("INSERT INTO facilities (license_number, dba_name, facility_type, address, "
+                     "city, state, zip) SELECT license_number, dba_name, facility_type, address, "
+                     "city, state, zip FROM imported.facilities")
+        conn.execute("INSERT INTO inspections (license_number, inspection_date, inspection_type, "
+                     "risk, result, violations_text) SELECT license_number, inspection_date, "
+                     "inspection_type, risk, result, violations_text FROM imported.inspections "
+                     "ORDER BY inspection_id")
+    conn.execute("DETACH DATABASE imported")
+    migrate(conn, str(Config.MIGRATIONS_DIR))
+    conn.close()
+
+    stats = import_data(limit=None, source=portal_csv, db_path=path, workers=1)
+    assert stats["inspections_added"] == 0
+    assert stats["inspections_updated"] == ROWS
+    legacy, fresh = table_dump(path), table_dump(imported_db)
+    for table in (1, 2):  # inspections and violations, minus inspection_id
+        assert [row[1:] for row in legacy[table]] == [row[1:] for row in fresh[table]]
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM inspections WHERE source_id IS NULL").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+    stats = import_data(limit=None, source=portal_csv, db_path=path, workers=1)
+    assert stats["inspections_added"] == stats["inspections_updated"] == 0
+    assert stats["inspections_unchanged"] == ROWS
@@ -0,0 +1,106 @@
+"""Admin-triggered imports (jobs.py) running inside the web process."""
+
+import threading
+import time
+
+import pytest
+
+import app as app_module
+import import_chicago_data
+import jobs
+from bench_import import write_portal_csv
+
+TOKEN = {"Authorization": "Bearer test-token"}
+
+
+@pytest.fixture
+def portal_csv(tmp_path):
+    path = str(tmp_path / "portal.csv")
+    write_portal_csv(path, 3000)
+    return path
+
+
+@pytest.fixture
+def admin(app, portal_csv):
+    app.config.update(ADMIN_TOKEN="test-token", IMPORT_JOB_BATCH_SIZE=500,
+                      IMPORT_SOURCES={"file": portal_csv, "stream": portal_csv})
+    return app
+
+
+def wait_for(client, location, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(location, headers=TOKEN).get_json()["job"]
+        if job["state"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job still {job['state']}")
+
+
+def test_importer_connection_uses_app_pragmas(app, db_path):
+    conn = import_chicago_data.get_db(db_path, app_module.pragmas_from_config(app.config))
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == app.config["SQLITE_BUSY_TIMEOUT"]
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+    conn = import_chicago_data.get_db(db_path)
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == import_chicago_data.DB_PRAGMAS["busy_timeout"]
+    conn.close()
+
+
+def test_job_waits_out_concurrent_writes(admin, client, db_path):
+    """A site write holding the lock delays the job instead of failing it."""
+    writer = app_module.open_db()
+    locked = threading.Event()
+
+    def hold_write_lock():
+        writer.execute("BEGIN IMMEDIATE")
+        writer.execute("UPDATE facilities SET phone = phone WHERE rowid = 1")
+        locked.set()
+        time.sleep(1.0)
+        writer.commit()
+    holder = threading.Thread(target=hold_write_lock)
+    holder.start()
+    locked.wait(5)
+    try:
+        response = client.post("/admin/import", json={"mode": "full"}, headers=TOKEN)
+        assert response.status_code == 202, response.get_json()
+    finally:
+        holder.join()
+        writer.close()
+    job = wait_for(client, response.headers["Location"])
+    assert job["state"] == "succeeded", job["error"]
+    assert job["rows"] == 3000
+
+
+def test_one_active_job_at_a_time(admin, client):
+    first = client.post("/admin/import", json={"mode": "full"}, headers=TOKEN)
+    second = client.post("/admin/import", json={"mode": "sample"}, headers=TOKEN)
+    assert first.status_code == 202
+    if second.status_code == 202:  # the first job already finished
+        pytest.skip("first job finished before the second request")
+    assert second.status_code == 409
+    assert second.get_json()["job"]["id"] == first.get_json()["job"]["id"]
+    assert wait_for(client, first.headers["Location"])["state"] == "succeeded"
+    third = client.post("/admin/import", json={"mode": "sample", "limit": 10}, headers=TOKEN)
+    assert third.status_code == 202
+    job = wait_for(client, third.headers["Location"])
+    assert (job["state"], job["rows"], job["percent"]) == ("succeeded", 10, 100.0)
+
+
+def test_abandoned_job_is_reaped(admin, client, db_path):
+    conn = app_module.open_db()
+    with conn:
+        conn.execute("INSERT INTO import_jobs (mode, source, state, owner) VALUES ('full', 'x', 'running', ?)",
+                     (f"{jobs.socket.gethostname()}:{2 ** 22 + 1}:gone",))
+    conn.close()
+    job = client.get("/admin/import", headers=TOKEN).get_json()["job"]
+    assert job["state"] == "failed"
+    assert "exited" in job["error"]
+    assert client.post("/admin/import", json={"limit": 5}, headers=TOKEN).status_code == 202
+
+
+def test_admin_endpoints_need_the_token(admin, client):
+    assert client.get("/admin/import").status_code == 401
+    assert client.get("/admin/import", headers={"Authorization": "Bearer nope"}).status_code == 401
+    admin.config["ADMIN_TOKEN"] = None
+    assert client.get("/admin/import", headers=TOKEN).status_code == 403
@@ -0,0 +1,125 @@
+"""
+Schema migrations: databases built from schema.sql are stamped like
+init_db's, and a database from the original schema.sql (tests/data) is
+migrated to the same schema.
+"""
+
+import os
+import re
+import sqlite3
+
+import pytest
+
+from bench_import import fresh_db
+from config import Config
+from db import rebuild_latest_inspections, rebuild_listing_counts, rebuild_rollups
+from migrate import BASELINE_VERSION, discover, migrate
+
+BASELINE_SCHEMA = os.path.join(os.path.dirname(__file__), "data", "baseline_schema.sql")
+MIGRATIONS_DIR = str(Config.MIGRATIONS_DIR)
+
+
+def schema_objects(conn):
+    """type, name -> normalized SQL of every table, index and trigger."""
+    objects = {}
+    for kind, name, sql in conn.execute("SELECT type, name, sql FROM sqlite_master "
+                                        "WHERE name NOT LIKE 'sqlite_%'"):
+        if sql and kind != "table":
+            sql = re.sub(r"\s+", " ", re.sub(r"--[^\n]*", "", sql))
+            sql = sql.replace(" IF NOT EXISTS", "").strip()
+        objects[kind, name] = sql if kind != "table" else None
+    return objects
+
+
+def columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """A database built from the original schema.sql (with its seed rows), migrated."""
+    path = str(tmp_path / "baseline.db")
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    with open(BASELINE_SCHEMA, "r", encoding="utf-8") as f:
+        conn.executescript(f.read())
+    applied = migrate(conn, MIGRATIONS_DIR)
+    conn.close()
+    assert [m.version for m, _ in applied] == [m.version for m in discover(MIGRATIONS_DIR)]
+    return path
+
+
+def test_fresh_db_is_stamped(tmp_path):
+    path = str(tmp_path / "fresh.db")
+    fresh_db(path)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    try:
+        assert migrate(conn, MIGRATIONS_DIR) == []
+        versions = {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+    finally:
+        conn.close()
+    assert versions == {m.version for m in discover(MIGRATIONS_DIR)}
+
+
+def test_generated_db_is_stamped(generated_db):
+    conn = sqlite3.connect(generated_db)
+    conn.row_factory = sqlite3.Row
+    try:
+        assert migrate(conn, MIGRATIONS_DIR) == []
+    finally:
+        conn.close()
+
+
+def test_baseline_is_recorded_on_current_schema(tmp_path):
+    """Databases stamped before 0000_baseline existed get it recorded, not run."""
+    path = str(tmp_path / "fresh.db")
+    fresh_db(path)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    try:
+        with conn:
+            conn.execute("DELETE FROM schema_migrations WHERE version = ?", (BASELINE_VERSION,))
+        assert migrate(conn, MIGRATIONS_DIR) == []
+        assert conn.execute("SELECT 1 FROM schema_migrations WHERE version = ?",
+                            (BASELINE_VERSION,)).fetchone()
+    finally:
+        conn.close()
+
+
+def test_baseline_db_migrates_to_current_schema(db_path):
+    migrated = sqlite3.connect(db_path)
+    current = sqlite3.connect(":memory:")
+    with open(Config.SCHEMA_PATH, "r", encoding="utf-8") as f:
+        current.executescript(f.read())
+    try:
+        assert schema_objects(migrated) == schema_objects(current)
+        for table in ("facilities", "inspections", "violations"):
+            assert columns(migrated, table) == columns(current, table)
+    finally:
+        migrated.close()
+        current.close()
+
+
+def test_baseline_db_backfills_derived_data(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        def snapshot():
+            return [sorted(conn.execute(f"SELECT * FROM {table}").fetchall())
+                    for table in ("inspection_counts", "listing_counters", "inspection_rollups")]
+
+        migrated = snapshot()
+        rebuild_latest_inspections(conn)
+        rebuild_listing_counts(conn)
+        rebuild_rollups(conn)
+        assert snapshot() == migrated
+        assert conn.execute("SELECT COUNT(*) FROM facilities_fts WHERE facilities_fts MATCH 'sunrise'"
+                            ).fetchone()[0] == 1
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("path", ["/", "/?q=sun", "/?view=facilities", "/chart/monthly-fails.json",
+                                  "/facility/LIC-1001"])
+def test_app_serves_migrated_baseline_db(client, path):
+    assert client.get(path).status_code == 200
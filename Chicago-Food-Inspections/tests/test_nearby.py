@@ -0,0 +1,68 @@
+"""/nearby: the radius filter, nearest-first order and argument validation."""
+
+import pytest
+
+from app import haversine_m
+from db import open_connection
+
+
+@pytest.fixture
+def located(db_path):
+    """license_number -> (lat, lon) for every facility with coordinates."""
+    conn = open_connection(db_path)
+    try:
+        return {row[0]: (row[1], row[2]) for row in conn.execute(
+            "SELECT license_number, latitude, longitude FROM facilities "
+            "WHERE latitude IS NOT NULL AND longitude IS NOT NULL")}
+    finally:
+        conn.close()
+
+
+def brute_force(located, lat, lon, radius):
+    distances = {lic: haversine_m(lat, lon, *point) for lic, point in located.items()}
+    return sorted((d, lic) for lic, d in distances.items() if d <= radius)
+
+
+@pytest.mark.parametrize("radius", [300, 1000, 5000])
+def test_returns_every_facility_within_radius_nearest_first(client, located, radius):
+    lat, lon = sorted(located.values())[len(located) // 2]
+    response = client.get("/nearby", query_string={"lat": lat, "lon": lon, "radius": radius,
+                                                   "limit": 200})
+    assert response.status_code == 200
+    data = response.get_json()
+    expected = brute_force(located, lat, lon, radius)[:200]
+    assert expected, "pick a point with facilities around it"
+    assert data["count"] == len(data["facilities"]) == len(expected)
+    distances = [f["distance_m"] for f in data["facilities"]]
+    assert distances == sorted(distances)
+    assert all(d <= radius for d in distances)
+    assert {f["license_number"] for f in data["facilities"]} == {lic for _, lic in expected}
+
+
+def test_limit_keeps_the_nearest(client, located):
+    lat, lon = next(iter(located.values()))
+    data = client.get("/nearby", query_string={"lat": lat, "lon": lon, "radius": 5000,
+                                               "limit": 5}).get_json()
+    expected = brute_force(located, lat, lon, 5000)[:5]
+    assert [f["license_number"] for f in data["facilities"]] == [lic for _, lic in expected]
+    assert data["facilities"][0]["distance_m"] == 0
+
+
+def test_nothing_nearby_is_an_empty_list(client):
+    data = client.get("/nearby?lat=0&lon=0").get_json()
+    assert data["count"] == 0 and data["facilities"] == []
+
+
+@pytest.mark.parametrize("query", [
+    "", "lat=41.88", "lon=-87.63", "lat=abc&lon=-87.63", "lat=41.88&lon=",
+    "lat=91&lon=-87.63", "lat=-90.5&lon=-87.63", "lat=41.88&lon=181", "lat=41.88&lon=-180.01",
+    "lat=nan&lon=-87.63", "lat=41.88&lon=inf",
+    "lat=41.88&lon=-87.63&radius=0", "lat=41.88&lon=-87.63&radius=-5",
+    "lat=41.88&lon=-87.63&radius=5001", "lat=41.88&lon=-87.63&radius=far",
+    "lat=41.88&lon=-87.63&limit=many",
+])
+def test_bad_arguments_are_rejected(client, query):
+    response = client.get(f"/nearby?{query}")
+    assert response.status_code == 400
+    data = response.get_json()
+    assert data["error"] and data["facilities"] == []
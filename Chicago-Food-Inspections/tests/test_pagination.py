@@ -0,0 +1,80 @@
+"""Keyset pagination: walking the listing by cursor, forwards and backwards."""
+
+import pytest
+
+from app import (build_fts_query, decode_cursor, encode_cursor, fetch_listing_page,
+                 listing_rows, scan_total)
+from db import open_connection
+
+PER_PAGE = 7  # small, so even the narrowest filter spans several pages
+
+FILTERS = [
+    (None, "All", "All"),
+    (None, "Fail", "All"),
+    (None, "All", "High"),
+    (None, "Pass", "Low"),
+    ("pizza", "All", "All"),
+    ("pizza", "Fail", "All"),
+]
+
+
+def row_key(row):
+    return (row["inspection_id"], row["license_number"])
+
+
+def walk_forward(conn, match, result, risk, view):
+    """Every page, following next cursors from the first."""
+    pages = []
+    rows, has_prev, has_next = fetch_listing_page(conn, match, result, risk, PER_PAGE, view=view)
+    assert not has_prev
+    pages.append(rows)
+    while has_next:
+        after = decode_cursor(encode_cursor(rows[-1], view), view)
+        rows, has_prev, has_next = fetch_listing_page(conn, match, result, risk, PER_PAGE,
+                                                      after=after, view=view)
+        assert has_prev
+        pages.append(rows)
+    return pages
+
+
+@pytest.fixture
+def conn(generated_db):
+    conn = open_connection(generated_db)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("view", ["inspections", "facilities"])
+@pytest.mark.parametrize("match,result,risk", FILTERS)
+def test_forward_walk_covers_listing(conn, match, result, risk, view):
+    match = build_fts_query(match) if match else None
+    pages = walk_forward(conn, match, result, risk, view)
+    walked = [row_key(row) for page in pages for row in page]
+    expected = [row_key(row) for row in listing_rows(conn, match, result, risk, 10 ** 9, view=view)]
+
+    assert len(pages) > 1
+    assert all(len(page) == PER_PAGE for page in pages[:-1])
+    assert walked == expected
+    assert len(set(walked)) == len(walked) == scan_total(conn, match, result, risk, view)
+
+
+@pytest.mark.parametrize("view", ["inspections", "facilities"])
+@pytest.mark.parametrize("match,result,risk", FILTERS)
+def test_backward_walk_matches_forward(conn, match, result, risk, view):
+    match = build_fts_query(match) if match else None
+    pages = walk_forward(conn, match, result, risk, view)
+
+    for i in range(len(pages) - 1, 0, -1):
+        before = decode_cursor(encode_cursor(pages[i][0], view), view)
+        rows, has_prev, has_next = fetch_listing_page(conn, match, result, risk, PER_PAGE,
+                                                      before=before, view=view)
+        assert [row_key(row) for row in rows] == [row_key(row) for row in pages[i - 1]]
+        assert has_next
+        assert has_prev or i == 1
+
+
+def test_uninspected_tail_is_paged(conn):
+    pages = walk_forward(conn, None, "All", "All", "inspections")
+    tail = [row for page in pages for row in page if row["inspection_id"] is None]
+    assert tail and pages[-1][-1]["inspection_id"] is None
+    assert [row["license_number"] for row in tail] == sorted(row["license_number"] for row in tail)
@@ -0,0 +1,61 @@
+"""Full-text search: prefix terms, quoted phrases, relevance order and hostile input."""
+
+import pytest
+
+from app import build_fts_query
+
+FACILITY = dict(facility_type="Restaurant", city="CHICAGO", state="IL", zip="60601")
+# QUOKKA-NAME has the word in its name, QUOKKA-ADDR only in its address,
+# and QUOKKA-REV has both words of the phrase in the other order.
+FACILITIES = {
+    "QUOKKA-NAME": dict(dba_name="Quokka Cafe", address="1 Main St"),
+    "QUOKKA-ADDR": dict(dba_name="Corner Grill", address="9 Quokka Ln"),
+    "QUOKKA-REV": dict(dba_name="Cafe Quokkas", address="2 Main St"),
+}
+
+
+@pytest.fixture
+def search(client):
+    for license_number, fields in FACILITIES.items():
+        form = dict(FACILITY, license_number=license_number, **fields)
+        assert client.post("/facility/new", data=form).status_code == 302
+
+    def run(q, sort="date"):
+        response = client.get("/", query_string={"q": q, "sort": sort, "view": "facilities"})
+        assert response.status_code == 200
+        body = response.get_data(as_text=True)
+        assert "Error loading data" not in body
+        found = [lic for lic in FACILITIES if f"/facility/{lic}\"" in body]
+        return sorted(found, key=lambda lic: body.index(f"/facility/{lic}\""))
+    return run
+
+
+def test_build_fts_query():
+    assert build_fts_query("sun din") == '"sun"* "din"*'
+    assert build_fts_query('"sunrise diner" chi') == '"sunrise diner" "chi"*'
+    assert build_fts_query('say "hi') == '"say"* """hi"*'
+    assert build_fts_query("  - * \"\" ") is None
+
+
+def test_prefix_terms_match(search):
+    assert set(search("quok")) == set(FACILITIES)
+    assert set(search("quok caf")) == {"QUOKKA-NAME", "QUOKKA-REV"}
+    assert search("quokkaz") == []
+
+
+def test_quoted_phrase_matches_in_order(search):
+    assert search('"quokka cafe"') == ["QUOKKA-NAME"]
+    assert search('"cafe quokkas"') == ["QUOKKA-REV"]
+
+
+def test_relevance_ranks_name_matches_above_address_matches(search):
+    ranked = search("quokka", sort="relevance")
+    assert ranked.index("QUOKKA-NAME") < ranked.index("QUOKKA-ADDR")
+
+
+@pytest.mark.parametrize("q", ['"', '""', '"quokka', 'quokka"', "-", "-quokka", "quokka-cafe",
+                               "*", "quok*", "**quok", "quokka AND", "OR", "NEAR(quokka", "^quokka",
+                               "quokka:cafe", "(quokka", "'", "%_"])
+def test_punctuation_does_not_break_search(search, q):
+    for sort in ("date", "relevance"):
+        search(q, sort)
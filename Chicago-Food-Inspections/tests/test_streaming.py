@@ -0,0 +1,41 @@
+"""Streamed listing pages must reach the client before the query is drained."""
+
+import db
+
+
+def test_first_chunk_sent_before_cursor_is_drained(app, client, monkeypatch):
+    fetched = []
+    fetchmany = db.TimedCursor.fetchmany
+
+    def counting_fetchmany(self, size=1):
+        rows = fetchmany(self, size)
+        fetched.append(len(rows))
+        return rows
+    monkeypatch.setattr(db.TimedCursor, "fetchmany", counting_fetchmany)
+    assert app.config["SLOW_QUERY_MS"] > 0 or app.config["METRICS_ENABLED"]
+
+    per_page = app.config["MAX_ITEMS_PER_PAGE"]
+    response = client.get(f"/?per_page={per_page}&page=2", buffered=False)
+    assert response.status_code == 200
+    body = iter(response.response)
+    first = next(body)
+    assert b"<table" in first or b"<html" in first
+    assert sum(fetched) < per_page
+
+    rest = b"".join(body)
+    response.close()
+    assert sum(fetched) >= per_page
+    assert (first + rest).count(b"<tr>") == per_page + 1  # header row + page
+
+
+def test_timed_cursor_iterates_in_batches(db_path):
+    conn = db.InstrumentedConnection(db.open_connection(db_path))
+    cursor = conn.execute("SELECT inspection_id FROM inspections ORDER BY inspection_id")
+    rows = iter(cursor)
+    next(rows)
+    assert cursor.raw.fetchone() is not None  # the rest was not fetched up front
+    remaining = sum(1 for _ in rows)
+    total = conn.execute("SELECT COUNT(*) FROM inspections").fetchone()[0]
+    assert remaining == total - 2  # all but the two rows taken above
+    assert conn.seconds > 0
+    conn.close()
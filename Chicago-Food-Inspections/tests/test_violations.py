@@ -0,0 +1,97 @@
+"""Violation parsing, the violations table and /violations/top.json."""
+
+from collections import Counter, defaultdict
+
+import pytest
+
+from db import open_connection, parse_violations
+
+PORTAL_TEXT = ("21. PROPER HOT HOLDING TEMPERATURES - Comments: FOUND RICE AT 120F | "
+               "55. PHYSICAL FACILITIES INSTALLED, MAINTAINED & CLEAN - Comments: WALLS | "
+               "no code here")
+
+
+def test_parse_violations():
+    assert parse_violations(PORTAL_TEXT) == [
+        ("#21", "PROPER HOT HOLDING TEMPERATURES", 1),
+        ("#55", "PHYSICAL FACILITIES INSTALLED, MAINTAINED & CLEAN", 0),
+    ]
+    assert parse_violations("#3: Hand washing; #38: Insects present") == [
+        ("#3", "Hand washing", 1), ("#38", "Insects present", 0)]
+    assert parse_violations(None) == parse_violations("") == []
+
+
+def scan(db_path, date_from, date_to, zip_code=None):
+    """code -> (violations, facilities) from parsing violations_text, no index involved."""
+    conn = open_connection(db_path)
+    try:
+        rows = conn.execute("""
+            SELECT i.license_number, i.violations_text FROM inspections i
+            JOIN facilities f ON f.license_number = i.license_number
+            WHERE i.inspection_date BETWEEN ? AND ? AND (? IS NULL OR f.zip = ?)
+        """, (date_from, date_to, zip_code, zip_code)).fetchall()
+    finally:
+        conn.close()
+    counts, facilities = Counter(), defaultdict(set)
+    for license_number, text in rows:
+        for code, _, _ in parse_violations(text):
+            counts[code] += 1
+            facilities[code].add(license_number)
+    return {code: (n, len(facilities[code])) for code, n in counts.items()}
+
+
+def busiest_zip(db_path):
+    conn = open_connection(db_path)
+    try:
+        return conn.execute("SELECT zip FROM facilities GROUP BY zip ORDER BY COUNT(*) DESC").fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("with_zip", [False, True])
+def test_top_violations_match_a_text_scan(client, db_path, with_zip):
+    zip_code = busiest_zip(db_path) if with_zip else None
+    query = {"from": "2015-01-01", "to": "2019-12-31", "limit": 100}
+    if zip_code:
+        query["zip"] = zip_code
+    response = client.get("/violations/top.json", query_string=query)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["zip"] == zip_code
+
+    expected = scan(db_path, "2015-01-01", "2019-12-31", zip_code)
+    assert expected
+    codes = data["codes"]
+    assert {c["code"]: (c["violations"], c["facilities"]) for c in codes} == expected
+    assert [c["violations"] for c in codes] == sorted((c["violations"] for c in codes), reverse=True)
+    assert all(c["critical"] == int(int(c["code"][1:]) <= 29) for c in codes)
+
+
+def test_limit_keeps_the_most_frequent(client):
+    everything = client.get("/violations/top.json?from=2010-01-01&limit=100").get_json()["codes"]
+    top = client.get("/violations/top.json?from=2010-01-01&limit=3").get_json()["codes"]
+    assert top == everything[:3]
+
+
+def test_edited_inspection_is_found_by_code(client, db_path):
+    conn = open_connection(db_path)
+    inspection_id = conn.execute("SELECT MAX(inspection_id) FROM inspections").fetchone()[0]
+    conn.close()
+    form = dict(inspection_date="2003-03-03", inspection_type="Canvass", risk="High", result="Fail",
+                violations_text="#4: Employee health policy missing; #61: Summary report not posted")
+    assert client.post(f"/inspection/{inspection_id}/edit", data=form).status_code == 302
+
+    data = client.get("/violations/top.json?from=2003-03-03&to=2003-03-03").get_json()
+    codes = {c["code"]: c for c in data["codes"]}
+    assert codes["#4"]["violations"] >= 1 and codes["#4"]["critical"] == 1
+    assert codes["#61"]["violations"] >= 1 and codes["#61"]["critical"] == 0
+    assert scan(db_path, "2003-03-03", "2003-03-03") == {
+        code: (c["violations"], c["facilities"]) for code, c in codes.items()}
+
+
+@pytest.mark.parametrize("query", ["from=2020-13-01", "to=yesterday", "from=2020-01-01&zip=abc",
+                                   "limit=ten"])
+def test_bad_arguments_are_rejected(client, query):
+    response = client.get(f"/violations/top.json?{query}")
+    assert response.status_code == 400
+    assert response.get_json()["codes"] == []